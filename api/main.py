@@ -1,10 +1,14 @@
 import asyncio
-import httpx
 import os
+import time
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+# Imported first so the startup report times everything below
+from api.services import startup
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from api.routers import stock, market
+from fastapi.middleware.gzip import GZipMiddleware
+from api.routers import stock, market, stream
+from api.services import cache, cache_backend, executors, http_cache, http_client, metrics, snapshot_service, stock_service, upstream
 
 # Keep-alive background task
 async def keep_alive():
@@ -18,19 +22,32 @@ async def keep_alive():
             # On Render, set APP_URL to your public URL (e.g., https://trade-only.onrender.com)
             app_url = os.getenv("APP_URL", "http://localhost:8000")
             
-            async with httpx.AsyncClient() as client:
-                print(f"Keeping server alive: Pinging {app_url}/")
-                await client.get(f"{app_url}/")
+            print(f"Keeping server alive: Pinging {app_url}/")
+            await http_client.get_client().get(f"{app_url}/")
         except Exception as e:
             print(f"Keep-alive ping failed: {e}")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: Start the keep-alive task
-    task = asyncio.create_task(keep_alive())
+    # Startup: Start the keep-alive task, the cache sweeper, the market
+    # snapshot scheduler and the warm-up (shared HTTP client, symbol index,
+    # lazily imported modules)
+    startup.mark("server")
+    tasks = [asyncio.create_task(keep_alive()), asyncio.create_task(cache.run_sweeper())]
+    if snapshot_service.SNAPSHOT_SCHEDULER:
+        tasks.append(asyncio.create_task(snapshot_service.run_scheduler()))
+    if startup.WARMUP:
+        tasks.append(asyncio.create_task(startup.warm_up()))
+    startup.mark("lifespan")
+    print(f"Startup: {startup.report()['phases_ms']} ms")
     yield
-    # Shutdown: Cancel the task (optional, as server is dying anyway)
-    task.cancel()
+    # Shutdown: Cancel the tasks (optional, as server is dying anyway)
+    for task in tasks:
+        task.cancel()
+    await http_client.close()
+    await cache_backend.close()
+    for executor in executors.registry:
+        executor.shutdown()
 
 app = FastAPI(title="Trade Only API", lifespan=lifespan)
 
@@ -49,12 +66,68 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let the frontend read the validators for conditional requests
+    expose_headers=["ETag"],
 )
 
+# Large JSON (history, indicators, dashboards) goes out gzipped; SSE streams are left alone
+app.add_middleware(GZipMiddleware, minimum_size=http_cache.COMPRESS_MIN_SIZE)
+
+def _route_template(request: Request):
+    """/api/stock/AAPL/history -> /api/stock/{symbol}/history, raw paths would be unbounded labels."""
+    if request.scope.get("route") is None:
+        return "unmatched"
+    params = {str(value): name for name, value in request.path_params.items()}
+    return "/".join("{%s}" % params[part] if part in params else part for part in request.url.path.split("/"))
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    startup.response_sent()
+    metrics.request_latency.observe(
+        time.perf_counter() - started,
+        method=request.method,
+        route=_route_template(request),
+        status=response.status_code,
+    )
+    return response
+
 # Include routers
 app.include_router(stock.router, prefix="/api/stock", tags=["stock"])
 app.include_router(market.router, prefix="/api/market", tags=["market"])
+app.include_router(stream.router, prefix="/api/stream", tags=["stream"])
 
 @app.get("/")
 async def root():
     return {"message": "Welcome to Tradex API"}
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    return [c.stats() for c in cache.registry]
+
+@app.get("/api/executors/stats")
+async def executor_stats():
+    return [e.stats() for e in executors.registry]
+
+@app.get("/api/upstreams/stats")
+async def upstream_stats():
+    return [u.stats() for u in upstream.registry]
+
+@app.get("/api/quote-strategies/stats")
+async def quote_strategy_stats():
+    return stock_service.quote_strategy_stats
+
+@app.get("/api/snapshot/stats")
+async def snapshot_stats():
+    return snapshot_service.stats()
+
+@app.get("/api/startup/stats")
+async def startup_stats():
+    return startup.report()
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+startup.mark("import")
@@ -1,46 +1,56 @@
-from fastapi import APIRouter, HTTPException
-from api.services import market_service
+from fastapi import APIRouter, HTTPException, Request
+from api.services import http_cache, market_service, snapshot_service
 
 router = APIRouter()
 
+# Dashboard endpoints answer from the precomputed snapshot when it has the
+# view, and only compute it on the request path otherwise. Both publish to
+# market_cache under the same key, so the response is encoded once per entry
+# and its caching headers follow that entry.
+async def _serve(request, key, compute):
+    view = snapshot_service.get(key)
+    if view is None:
+        view = await compute()
+    return http_cache.respond(request, view, market_service.market_cache, key)
+
 @router.get("/overview")
-async def get_market_overview():
+async def get_market_overview(request: Request):
     try:
-        return await market_service.get_overview()
+        return await _serve(request, "global_overview", market_service.get_overview)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/movers")
-async def get_market_movers(type: str = "gainers"):
+async def get_market_movers(request: Request, type: str = "gainers"):
     try:
-        return await market_service.get_movers(type)
+        return await _serve(request, f"global_movers_{type}", lambda: market_service.get_movers(type))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/indian/overview")
-async def get_indian_market_overview():
+async def get_indian_market_overview(request: Request):
     try:
-        return await market_service.get_indian_overview()
+        return await _serve(request, "indian_overview", market_service.get_indian_overview)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/indian/movers")
-async def get_indian_market_movers(type: str = "gainers"):
+async def get_indian_market_movers(request: Request, type: str = "gainers"):
     try:
-        return await market_service.get_indian_movers(type)
+        return await _serve(request, f"indian_movers_{type}", lambda: market_service.get_indian_movers(type))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/sector/{sector_name}")
-async def get_sector_data(sector_name: str):
+async def get_sector_data(request: Request, sector_name: str):
     try:
-        return await market_service.get_sector_data(sector_name)
+        return await _serve(request, f"sector_{sector_name}", lambda: market_service.get_sector_data(sector_name))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/indian/sector/{sector_name}")
-async def get_indian_sector_data(sector_name: str):
+async def get_indian_sector_data(request: Request, sector_name: str):
     try:
-        return await market_service.get_indian_sector_data(sector_name)
+        return await _serve(request, f"indian_sector_{sector_name}", lambda: market_service.get_indian_sector_data(sector_name))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,25 +1,86 @@
-from fastapi import APIRouter, HTTPException
-from api.services import stock_service
+from fastapi import APIRouter, HTTPException, Request
+from api.services import http_cache, stock_service, history_codec
+from api.services import indicators as indicator_service
 
 router = APIRouter()
 
 @router.get("/search")
-async def search_stocks(q: str):
+async def search_stocks(request: Request, q: str):
     try:
-        return await stock_service.search_stocks(q)
+        results = await stock_service.search_stocks(q)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return http_cache.respond(request, results, stock_service.search_cache, stock_service.search_key(q))
+
+@router.get("/quotes")
+async def get_stock_quotes(request: Request, symbols: str):
+    try:
+        quotes = await stock_service.get_quotes(symbols.split(","))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return http_cache.respond(request, quotes)
 
 @router.get("/{symbol}")
-async def get_stock_quote(symbol: str):
+async def get_stock_quote(request: Request, symbol: str):
     try:
-        return await stock_service.get_quote(symbol)
+        quote = await stock_service.get_quote(symbol)
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e))
+    # Degraded and offline quotes must not be cached downstream for as long as full ones
+    return http_cache.respond(request, quote, stock_service.quote_cache_for(symbol, quote), symbol)
 
 @router.get("/{symbol}/history")
-async def get_stock_history(symbol: str, period: str = "1mo", interval: str = "1d"):
+async def get_stock_history(request: Request, symbol: str, period: str = "1mo", interval: str = "1d", format: str = "json", max_points: int = None, mode: str = "candle"):
+    if format not in history_codec.FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format, expected one of {history_codec.FORMATS}")
+    if mode not in history_codec.MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown mode, expected one of {history_codec.MODES}")
+    if max_points is not None and max_points < 2:
+        raise HTTPException(status_code=400, detail="max_points must be at least 2")
+    try:
+        data = await stock_service.get_history(symbol, period, interval, format, max_points, mode)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Only downsampled histories are cached, full ones must be revalidated
+    key = stock_service.history_key(symbol, period, interval, format, max_points, mode)
+    media_type = history_codec.BINARY_MEDIA_TYPE if format == "binary" else http_cache.JSON_MEDIA_TYPE
+    return http_cache.respond(request, data, stock_service.history_cache if max_points else None, key, media_type)
+
+@router.get("/{symbol}/indicators")
+async def get_stock_indicators(
+    request: Request,
+    symbol: str,
+    period: str = "6mo",
+    interval: str = "1d",
+    indicators: str = "sma,ema,rsi,macd,bollinger,vwap",
+    sma_window: int = 20,
+    ema_span: int = 20,
+    rsi_period: int = 14,
+    macd_fast: int = 12,
+    macd_slow: int = 26,
+    macd_signal: int = 9,
+    bb_window: int = 20,
+    bb_k: float = 2.0,
+):
+    names = list(dict.fromkeys(name.strip().lower() for name in indicators.split(",") if name.strip()))
+    unknown = [name for name in names if name not in indicator_service.INDICATORS]
+    if not names or unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown indicators {unknown}, expected some of {list(indicator_service.INDICATORS)}")
+    params = {
+        "sma_window": sma_window,
+        "ema_span": ema_span,
+        "rsi_period": rsi_period,
+        "macd_fast": macd_fast,
+        "macd_slow": macd_slow,
+        "macd_signal": macd_signal,
+        "bb_window": bb_window,
+    }
+    if min(params.values()) < 1 or bb_k <= 0:
+        raise HTTPException(status_code=400, detail="Indicator windows and bb_k must be positive")
+    params["bb_k"] = bb_k
     try:
-        return await stock_service.get_history(symbol, period, interval)
+        data = await stock_service.get_indicators(symbol, period, interval, names, params)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+    key = stock_service.indicator_key(symbol, period, interval, names, params)
+    return http_cache.respond(request, data, stock_service.indicator_cache, key)
@@ -0,0 +1,96 @@
+import asyncio
+import json
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from api.services import stream_service
+from api.services.stream_service import hub
+
+router = APIRouter()
+
+def parse_symbols(symbols):
+    parsed = list(dict.fromkeys(s.strip() for s in (symbols or []) if s and s.strip()))
+    if len(parsed) > stream_service.MAX_SYMBOLS_PER_CLIENT:
+        raise ValueError(f"Too many symbols, max is {stream_service.MAX_SYMBOLS_PER_CLIENT}")
+    return parsed
+
+@router.websocket("/quotes")
+async def stream_quotes(websocket: WebSocket, symbols: str = ""):
+    """Quote stream over WebSocket.
+
+    Clients may pass ?symbols=A,B and/or send
+    {"action": "subscribe" | "unsubscribe", "symbols": [...]} messages.
+    The server sends one "snapshot" per symbol, then "update" messages
+    holding only the fields that changed.
+    """
+    await websocket.accept()
+    try:
+        initial = parse_symbols(symbols.split(","))
+    except ValueError as e:
+        await websocket.send_json({"type": "error", "error": str(e)})
+        await websocket.close(code=1008)
+        return
+
+    queue = hub.new_queue()
+    subscribed = set()
+
+    async def writer():
+        while True:
+            message = await queue.get()
+            await websocket.send_json(message)
+
+    writer_task = asyncio.create_task(writer())
+    try:
+        hub.subscribe(queue, initial)
+        subscribed.update(initial)
+
+        while True:
+            message = await websocket.receive_json()
+            try:
+                requested = parse_symbols(message.get("symbols"))
+                if message.get("action") == "unsubscribe":
+                    hub.unsubscribe(queue, requested)
+                    subscribed.difference_update(requested)
+                else:
+                    if len(subscribed | set(requested)) > stream_service.MAX_SYMBOLS_PER_CLIENT:
+                        raise ValueError(f"Too many symbols, max is {stream_service.MAX_SYMBOLS_PER_CLIENT}")
+                    hub.subscribe(queue, requested)
+                    subscribed.update(requested)
+            except (ValueError, AttributeError) as e:
+                await websocket.send_json({"type": "error", "error": str(e)})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        writer_task.cancel()
+        hub.unsubscribe(queue, subscribed)
+
+@router.get("/quotes/sse")
+async def stream_quotes_sse(request: Request, symbols: str):
+    """Server-sent events variant of the quote stream for EventSource clients."""
+    try:
+        requested = parse_symbols(symbols.split(","))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not requested:
+        raise HTTPException(status_code=400, detail="No symbols given")
+
+    queue = hub.new_queue()
+    hub.subscribe(queue, requested)
+
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {message['type']}\ndata: {json.dumps(message)}\n\n"
+        finally:
+            hub.unsubscribe(queue, requested)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
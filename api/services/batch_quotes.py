@@ -0,0 +1,143 @@
+import os
+from api.services import executors, metrics, movers, startup, upstream
+from api.services.cache import AsyncCache
+from api.services.fetcher import fetch_all
+
+pd = startup.lazy_import("pandas")
+yf = startup.lazy_import("yfinance")
+
+# Batched multi-symbol quote engine.
+# Prices come from one yf.download round trip for all requested symbols,
+# names come from a long-lived metadata cache so .info is only hit once a day.
+quote_cache = AsyncCache(ttl_seconds=int(os.getenv("BATCH_QUOTE_TTL", "60")), max_entries=5000, name="batch_quote_cache")
+metadata_cache = AsyncCache(ttl_seconds=int(os.getenv("METADATA_TTL", "86400")), max_entries=5000, name="metadata_cache") # 1 day cache
+# Symbols whose name lookup failed recently, so we don't retry .info on every load
+name_miss_cache = AsyncCache(ttl_seconds=600, max_entries=5000, name="name_miss_cache")
+
+# Max tickers per bulk request, Yahoo starts failing on very long URLs
+BATCH_SIZE = int(os.getenv("BATCH_QUOTE_SIZE", "100"))
+
+def _download(symbols):
+    # 5 days of daily bars is enough to always have the previous close
+    with metrics.track("yfinance", "download"):
+        return yf.download(
+            symbols,
+            period="5d",
+            interval="1d",
+            group_by="ticker",
+            auto_adjust=False,
+            threads=True,
+            progress=False,
+        )
+
+def _frame_for(df, symbol):
+    if isinstance(df.columns, pd.MultiIndex):
+        if symbol not in df.columns.get_level_values(0):
+            return None
+        return df[symbol]
+    return df
+
+def _parse_download(df, symbols):
+    quotes = {}
+    if df is None or df.empty:
+        return quotes
+
+    for symbol in symbols:
+        frame = _frame_for(df, symbol)
+        if frame is None:
+            continue
+        frame = frame.dropna(subset=["Close"])
+        if frame.empty:
+            continue
+
+        last = frame.iloc[-1]
+        price = float(last["Close"])
+        prev_close = float(frame["Close"].iloc[-2]) if len(frame) > 1 else float(last["Open"])
+        change = price - prev_close
+
+        quotes[symbol] = {
+            "price": price,
+            "previous_close": prev_close,
+            "change": change,
+            "percent_change": (change / prev_close) * 100 if prev_close else 0,
+            "volume": int(last["Volume"]) if pd.notna(last["Volume"]) else 0,
+            "open": float(last["Open"]),
+            "day_high": float(last["High"]),
+            "day_low": float(last["Low"]),
+        }
+    return quotes
+
+async def get_quotes(symbols):
+    """Return {symbol: quote} for every symbol that could be priced.
+
+    Cached symbols are served directly, the rest are fetched together in
+    bulk requests of up to BATCH_SIZE tickers.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    results = await quote_cache.get_many(symbols)
+    missing = [symbol for symbol in symbols if symbol not in results]
+
+    for i in range(0, len(missing), BATCH_SIZE):
+        chunk = missing[i:i + BATCH_SIZE]
+        try:
+            df = await upstream.yahoo.call(lambda: executors.yahoo.run(_download, chunk))
+            fetched = _parse_download(df, chunk)
+        except Exception as e:
+            print(f"Batch download error: {e}")
+            continue
+
+        await quote_cache.set_many(fetched)
+        movers.observe(fetched)
+        results.update(fetched)
+
+    return {symbol: results[symbol] for symbol in symbols if symbol in results}
+
+def _get_metadata(symbol):
+    with metrics.track("yfinance", "info"):
+        info = yf.Ticker(symbol).info
+    if not info.get("shortName"):
+        return None
+    return {
+        "name": info.get("shortName"),
+        "currency": info.get("currency"),
+        "exchange": info.get("exchange"),
+        "timezone": info.get("exchangeTimezoneName"),
+        "type": info.get("quoteType"),
+        # Valuation fields the bulk download lacks, a day old is close enough
+        "market_cap": info.get("marketCap"),
+        "pe_ratio": info.get("trailingPE"),
+        "eps": info.get("trailingEps"),
+    }
+
+async def get_metadata(symbols):
+    """Return {symbol: metadata} for the slow-changing fields of each symbol.
+
+    Symbols whose lookup fails are left out and retried after a short backoff.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    metadata = await metadata_cache.get_many(symbols)
+    unknown = [symbol for symbol in symbols if symbol not in metadata]
+    recent_misses = await name_miss_cache.get_many(unknown)
+    missing = [symbol for symbol in unknown if symbol not in recent_misses]
+
+    refused = set()
+
+    async def fetch_one(symbol):
+        try:
+            return await upstream.yahoo.call(lambda: executors.yahoo.run(_get_metadata, symbol), operation="info")
+        except upstream.UpstreamUnavailable:
+            # Not a miss, Yahoo just wasn't asked this time
+            refused.add(symbol)
+            raise
+
+    fetched = await fetch_all(missing, fetch_one)
+    await metadata_cache.set_many(fetched)
+    await name_miss_cache.set_many({symbol: True for symbol in missing if symbol not in fetched and symbol not in refused})
+    metadata.update(fetched)
+
+    return metadata
+
+async def get_names(symbols):
+    """Return {symbol: shortName}, falling back to the symbol itself."""
+    metadata = await get_metadata(symbols)
+    return {symbol: metadata[symbol]["name"] if symbol in metadata else symbol for symbol in symbols}
@@ -0,0 +1,195 @@
+import mmap
+import os
+import numpy as np
+
+# Memory-mapped reader for NSE bhavcopy / price-volume-deliverable CSV dumps.
+#
+# Handles both layouts NSE publishes:
+#   - fully quoted rows with Indian digit grouping ("23,11,495") and padded
+#     headers ("Prev Close  "), as in the deliverable position reports
+#   - plain comma separated rows with space padded headers (" PREV_CLOSE"),
+#     as in the full bhavcopy
+# The file is cleaned with numpy over the mapped bytes, numeric columns are
+# converted to float64 arrays in one pass, and rows are grouped into a
+# symbol -> row range index.
+
+QUOTE = ord('"')
+COMMA = ord(",")
+CR = ord("\r")
+BOM = b"\xef\xbb\xbf"
+
+# Normalized header (upper case, letters and digits only) -> column name.
+# Names follow the nselib DataFrame columns used by get_nselib_quote.
+COLUMN_ALIASES = {
+    "SYMBOL": "Symbol",
+    "SERIES": "Series",
+    "DATE": "Date",
+    "DATE1": "Date",
+    "PREVCLOSE": "PrevClose",
+    "OPENPRICE": "OpenPrice",
+    "HIGHPRICE": "HighPrice",
+    "LOWPRICE": "LowPrice",
+    "LASTPRICE": "LastPrice",
+    "CLOSEPRICE": "ClosePrice",
+    "AVERAGEPRICE": "AveragePrice",
+    "AVGPRICE": "AveragePrice",
+    "TOTALTRADEDQUANTITY": "TotalTradedQuantity",
+    "TTLTRDQNTY": "TotalTradedQuantity",
+    "TURNOVERINRS": "TurnoverInRs",
+    "TURNOVERLACS": "TurnoverLacs",
+    "NOOFTRADES": "NoOfTrades",
+    "DELIVERABLEQTY": "DeliverableQty",
+    "DELIVQTY": "DeliverableQty",
+    "DLYQTTOTRADEDQTY": "DeliveryPercent",
+    "DELIVPER": "DeliveryPercent",
+}
+TEXT_COLUMNS = {"Symbol", "Series", "Date"}
+
+def normalize_header(name: str):
+    key = "".join(ch for ch in name.upper() if ch.isalnum())
+    return COLUMN_ALIASES.get(key, key)
+
+def _clean(buf: np.ndarray):
+    """Strip quotes and grouping commas, leaving plain comma separated bytes."""
+    quotes = buf == QUOTE
+    if not quotes.any():
+        return buf[buf != CR]
+    # A comma is a grouping comma when an odd number of quotes precede it
+    # (uint8 accumulation wraps, but parity survives)
+    inside = (np.cumsum(quotes, dtype=np.uint8) & 1).astype(bool)
+    keep = ~quotes & (buf != CR) & ~((buf == COMMA) & inside)
+    return buf[keep]
+
+def to_float(column: np.ndarray):
+    """Convert a bytes column to float64, "-" and blanks become NaN."""
+    column = np.char.strip(column)
+    column = np.where((column == b"-") | (column == b""), b"nan", column)
+    return column.astype(np.float64)
+
+class BhavcopyTable:
+    def __init__(self, columns: dict, index: dict, path=None, mtime=None):
+        self.columns = columns
+        self.index = index # symbol -> (start, stop) row range
+        self.path = path
+        self.mtime = mtime
+
+    def __len__(self):
+        return len(self.columns["Symbol"]) if "Symbol" in self.columns else 0
+
+    def __contains__(self, symbol):
+        return symbol in self.index
+
+    def rows(self, symbol: str):
+        """Column slices for every row of symbol, in file order."""
+        start, stop = self.index[symbol]
+        return {name: values[start:stop] for name, values in self.columns.items()}
+
+    def latest(self, symbol: str):
+        """The last row for symbol as a dict, preferring the EQ series."""
+        rows = self.rows(symbol)
+        position = len(rows["Symbol"]) - 1
+        if "Series" in rows:
+            eq = np.flatnonzero(rows["Series"] == "EQ")
+            if len(eq):
+                position = eq[-1]
+        return {name: values[position].item() for name, values in rows.items()}
+
+def parse(data) -> BhavcopyTable:
+    """Parse a bhavcopy CSV held in any buffer (bytes, mmap)."""
+    buf = np.frombuffer(data, dtype=np.uint8)
+    if bytes(buf[:3]) == BOM:
+        buf = buf[3:]
+    text = _clean(buf).tobytes()
+
+    header, _, body = text.partition(b"\n")
+    names = [normalize_header(h.decode("utf-8", "replace")) for h in header.split(b",")]
+    width = len(names)
+
+    lines = body.rstrip(b"\n")
+    if not lines:
+        return BhavcopyTable({name: np.array([]) for name in names}, {})
+    cells = np.array(lines.replace(b"\n", b",").split(b","))
+    if len(cells) % width:
+        raise ValueError("Malformed bhavcopy file: ragged rows")
+    cells = cells.reshape(-1, width)
+
+    columns = {}
+    for i, name in enumerate(names):
+        if name in TEXT_COLUMNS:
+            columns[name] = np.char.strip(cells[:, i]).astype(str)
+        else:
+            columns[name] = to_float(cells[:, i])
+
+    # Group rows by symbol; a stable sort keeps each symbol's rows in file order
+    index = {}
+    if "Symbol" in columns:
+        order = np.argsort(columns["Symbol"], kind="stable")
+        columns = {name: values[order] for name, values in columns.items()}
+        symbols, starts, counts = np.unique(columns["Symbol"], return_index=True, return_counts=True)
+        index = {
+            symbol: (int(start), int(start + count))
+            for symbol, start, count in zip(symbols.tolist(), starts, counts)
+        }
+    return BhavcopyTable(columns, index)
+
+def load(path: str) -> BhavcopyTable:
+    """Memory-map and parse a bhavcopy CSV file."""
+    with open(path, "rb") as f:
+        mtime = os.fstat(f.fileno()).st_mtime
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            table = parse(mm)
+    table.path = path
+    table.mtime = mtime
+    return table
+
+# Offline quote source for get_quote, configured with BHAVCOPY_PATH
+# (one or more files separated by os.pathsep, later files win).
+_tables = {}
+
+def _offline_tables():
+    paths = [p for p in os.getenv("BHAVCOPY_PATH", "").split(os.pathsep) if p]
+    tables = []
+    for path in paths:
+        try:
+            mtime = os.stat(path).st_mtime
+            table = _tables.get(path)
+            if table is None or table.mtime != mtime:
+                table = _tables[path] = load(path)
+            tables.append(table)
+        except Exception as e:
+            print(f"Bhavcopy load error for {path}: {e}")
+    return tables
+
+def get_offline_quote(symbol: str):
+    """Quote from the configured bhavcopy files, shaped like get_nselib_quote."""
+    clean_symbol = symbol.replace(".NS", "")
+    for table in reversed(_offline_tables()):
+        if clean_symbol not in table:
+            continue
+        row = table.latest(clean_symbol)
+        price = row.get("LastPrice", row.get("ClosePrice"))
+        prev_close = row.get("PrevClose")
+        if price is None or np.isnan(price) or not prev_close:
+            continue
+        change = price - prev_close
+        return {
+            "symbol": symbol,
+            "name": clean_symbol,
+            "price": price,
+            "change": change,
+            "percent_change": (change / prev_close) * 100,
+            "volume": int(np.nan_to_num(row.get("TotalTradedQuantity", 0))),
+            "market_cap": 0,
+            "pe_ratio": None,
+            "eps": None,
+            "day_high": row.get("HighPrice", price),
+            "day_low": row.get("LowPrice", price),
+            "open": row.get("OpenPrice", price),
+            "previous_close": prev_close,
+            "currency": "INR",
+            "exchange": "NSE",
+            "timezone": "Asia/Kolkata",
+            "type": "EQUITY",
+            "market_state": "CLOSED", # End of day data
+        }
+    return None
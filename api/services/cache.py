@@ -0,0 +1,336 @@
+import asyncio
+import os
+import sys
+import time
+from collections import OrderedDict
+from api.services import cache_backend
+from api.services.singleflight import SingleFlight
+
+# Every AsyncCache registers itself here so its stats can be reported
+registry = []
+
+# Cross-process single-flight: with a shared backend, the process that takes
+# a key's lock fetches it and the others wait for the value to show up.
+# The lock expires after CACHE_LOCK_TTL in case its holder dies mid-fetch.
+LOCK_TTL = float(os.getenv("CACHE_LOCK_TTL", "30"))
+LOCK_WAIT = float(os.getenv("CACHE_LOCK_WAIT", "10"))
+LOCK_POLL_INTERVAL = 0.05
+
+# How often run_sweeper() checks whether a cache is due for a sweep
+SWEEP_TICK = 10
+
+def approx_size(value):
+    """Rough deep size in bytes of JSON-like data (dicts, lists, scalars)."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(approx_size(k) + approx_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(approx_size(v) for v in value)
+    return size
+
+class CacheEntry:
+    __slots__ = ("value", "timestamp", "hits", "size", "body", "etag")
+
+    def __init__(self, value, timestamp, size):
+        self.value = value
+        self.timestamp = timestamp
+        self.hits = 0
+        self.size = size
+        # Encoded response and its HTTP validator, built on first use (see http_cache)
+        self.body = None
+        self.etag = None
+
+# Simple in-memory cache with TTL
+#
+# ttl_seconds is the soft TTL: entries younger than it are fresh.
+# stale_ttl_seconds is the hard TTL: between the two, get_or_fetch serves the
+# stale value immediately and refreshes it in the background. It defaults to
+# ttl_seconds, which turns stale-while-revalidate off.
+# refresh_ahead (a fraction of the soft TTL) refreshes hot keys, ones read at
+# least hot_hits times since they were set, shortly before they go stale.
+#
+# The cache is bounded: past max_entries or max_bytes (approximate) the least
+# recently used entries are evicted, and entries past the hard TTL are swept
+# out every sweep_interval seconds instead of waiting for a read, by writes
+# and by the run_sweeper() task the app starts, so idle caches shrink too.
+#
+# When a shared backend is configured (see cache_backend) it acts as an L2
+# behind this in-process L1: local misses and stale entries are looked up
+# there, and every set() is written through to it. name is the key namespace
+# in the backend, so it must be unique per cache. shared=False keeps a cache
+# local for values that aren't JSON (numpy arrays) or are cheap to rebuild.
+class AsyncCache:
+    def __init__(self, ttl_seconds=60, stale_ttl_seconds=None, refresh_ahead=None, hot_hits=3,
+                 max_entries=1024, max_bytes=None, sweep_interval=60, name="cache", backend=None, shared=True):
+        self.cache = OrderedDict()
+        self.ttl = ttl_seconds
+        self.stale_ttl = max(stale_ttl_seconds or ttl_seconds, ttl_seconds)
+        self.refresh_ahead = refresh_ahead
+        self.hot_hits = hot_hits
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self.name = name
+        self.backend = backend
+        self.shared = shared
+        self.flight = SingleFlight(name)
+        self.refreshing = set() # background refresh tasks, kept so they aren't GC'd
+
+        self.bytes = 0
+        self.last_sweep = time.time()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.l2_hits = 0
+        self.l2_misses = 0
+        self.lock_waits = 0
+        registry.append(self)
+
+    def _l2(self):
+        if not self.shared:
+            return None
+        return self.backend or cache_backend.get_backend()
+
+    def _remove(self, key):
+        entry = self.cache.pop(key)
+        self.bytes -= entry.size
+
+    def _entry(self, key):
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry.timestamp >= self.stale_ttl:
+            self._remove(key)
+            self.expirations += 1
+            return None
+        self.cache.move_to_end(key)
+        return entry
+
+    def peek(self, key):
+        """The local entry for key as is, without touching stats, LRU order or the backend."""
+        return self.cache.get(key)
+
+    def attach_body(self, key, entry, body, etag):
+        """Keep the encoded response for entry's value on it, counted against max_bytes.
+
+        Only the live entry for key is counted; one that has been evicted or
+        replaced meanwhile isn't in self.bytes any more.
+        """
+        size = len(body) - (len(entry.body) if entry.body is not None else 0)
+        entry.body = body
+        entry.etag = etag
+        entry.size += size
+        if self.cache.get(key) is entry:
+            self.bytes += size
+            self._evict()
+
+    def purge_expired(self):
+        """Drop every entry past the hard TTL."""
+        now = time.time()
+        self.last_sweep = now
+        expired = [key for key, entry in self.cache.items() if now - entry.timestamp >= self.stale_ttl]
+        for key in expired:
+            self._remove(key)
+        self.expirations += len(expired)
+
+    def _evict(self):
+        while self.cache and (
+            (self.max_entries and len(self.cache) > self.max_entries)
+            or (self.max_bytes and self.bytes > self.max_bytes)
+        ):
+            key = next(iter(self.cache))
+            self._remove(key)
+            self.evictions += 1
+
+    def _store(self, key, value, timestamp):
+        if key in self.cache:
+            self._remove(key)
+        entry = CacheEntry(value, timestamp, approx_size(key) + approx_size(value))
+        self.cache[key] = entry
+        self.bytes += entry.size
+
+        if time.time() - self.last_sweep >= self.sweep_interval:
+            self.purge_expired()
+        self._evict()
+        return entry
+
+    async def _load_many(self, keys):
+        """Pull keys from the shared backend into the local cache, {key: entry}."""
+        backend = self._l2()
+        if backend is None or not keys:
+            return {}
+        found = await backend.get_many(self.name, keys)
+        now = time.time()
+        entries = {}
+        for key in keys:
+            item = found.get(key)
+            if item is None or now - item[1] >= self.stale_ttl:
+                self.l2_misses += 1
+                continue
+            local = self.cache.get(key)
+            if local is not None and local.timestamp >= item[1]:
+                continue
+            self.l2_hits += 1
+            entries[key] = self._store(key, item[0], item[1])
+        return entries
+
+    async def _lookup(self, key, ttl):
+        """Freshest entry for key; the backend is only asked when the local one is older than ttl."""
+        entry = self._entry(key)
+        if entry is None or time.time() - entry.timestamp >= ttl:
+            loaded = (await self._load_many([key])).get(key)
+            if loaded is not None:
+                entry = loaded
+        return entry
+
+    async def get(self, key, max_age=None):
+        """Return the fresh value for key; max_age tightens the soft TTL for this read."""
+        ttl = self.ttl if max_age is None else min(max_age, self.ttl)
+        entry = await self._lookup(key, ttl)
+        if entry and time.time() - entry.timestamp < ttl:
+            entry.hits += 1
+            self.hits += 1
+            return entry.value
+        self.misses += 1
+        return None
+
+    async def get_many(self, keys):
+        """{key: fresh value} for the keys that have one, with one backend round trip."""
+        now = time.time()
+        values = {}
+        missing = []
+        for key in keys:
+            entry = self._entry(key)
+            if entry and now - entry.timestamp < self.ttl:
+                values[key] = entry
+            else:
+                missing.append(key)
+        for key, entry in (await self._load_many(missing)).items():
+            if now - entry.timestamp < self.ttl:
+                values[key] = entry
+
+        self.hits += len(values)
+        self.misses += len(keys) - len(values)
+        for entry in values.values():
+            entry.hits += 1
+        return {key: values[key].value for key in keys if key in values}
+
+    async def get_stale(self, key):
+        """Return the value for key even if past its soft TTL, as a last resort."""
+        entry = await self._lookup(key, self.stale_ttl)
+        return entry.value if entry else None
+
+    async def set(self, key, value):
+        await self.set_many({key: value})
+
+    async def set_many(self, items):
+        now = time.time()
+        for key, value in items.items():
+            self._store(key, value, now)
+        backend = self._l2()
+        if backend is not None:
+            await backend.set_many(self.name, {key: (value, now) for key, value in items.items()}, self.stale_ttl)
+
+    async def _fetch_shared(self, key, fetch, wait=True):
+        """Run fetch() unless another process holds the key's lock.
+
+        Waiters poll the backend for the value the lock holder stores and
+        only fetch themselves if it doesn't show up. Background refreshes
+        (wait=False) just skip the key.
+        """
+        backend = self._l2()
+        if backend is None:
+            return await fetch()
+        token = await backend.acquire_lock(self.name, key, LOCK_TTL)
+        if token:
+            try:
+                return await fetch()
+            finally:
+                await backend.release_lock(self.name, key, token)
+        if not wait:
+            return None
+
+        self.lock_waits += 1
+        deadline = time.time() + LOCK_WAIT
+        while True:
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+            entry = (await self._load_many([key])).get(key)
+            if entry and time.time() - entry.timestamp < self.ttl:
+                return entry.value
+            if time.time() >= deadline or not await backend.is_locked(self.name, key):
+                break
+        # The holder gave up, died or chose not to cache its result
+        entry = (await self._load_many([key])).get(key)
+        if entry and time.time() - entry.timestamp < self.ttl:
+            return entry.value
+        return await fetch()
+
+    async def fetch(self, key, fetch):
+        """Run fetch() for key now, coalesced within and across processes."""
+        return await self.flight.do(key, lambda: self._fetch_shared(key, fetch))
+
+    def _refresh(self, key, fetch):
+        if self.flight.inflight.get(key):
+            return
+        task = asyncio.ensure_future(self.flight.do(key, lambda: self._fetch_shared(key, fetch, wait=False)))
+        self.refreshing.add(task)
+        task.add_done_callback(self._refresh_done)
+
+    def _refresh_done(self, task):
+        self.refreshing.discard(task)
+        if not task.cancelled() and task.exception():
+            print(f"Background refresh failed for {self.flight.name}: {task.exception()}")
+
+    async def get_or_fetch(self, key, fetch):
+        """Return the cached value for key, or coalesce concurrent misses onto one fetch().
+
+        fetch is responsible for calling set() itself, so it can decide not to
+        cache fallback results. Stale entries are returned straight away while
+        fetch runs in the background.
+        """
+        entry = await self._lookup(key, self.ttl)
+        # Empty results ([], {}) are valid cached values too
+        if entry is not None:
+            age = time.time() - entry.timestamp
+            entry.hits += 1
+            if age >= self.ttl:
+                self.stale_hits += 1
+                self._refresh(key, fetch)
+            else:
+                self.hits += 1
+                if self.refresh_ahead and entry.hits >= self.hot_hits and age >= self.ttl * self.refresh_ahead:
+                    self._refresh(key, fetch)
+            return entry.value
+        self.misses += 1
+        return await self.fetch(key, fetch)
+
+    def stats(self):
+        backend = self._l2()
+        return {
+            "name": self.name,
+            "entries": len(self.cache),
+            "max_entries": self.max_entries,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "l2_hits": self.l2_hits,
+            "l2_misses": self.l2_misses,
+            "lock_waits": self.lock_waits,
+            "backend": backend.stats() if backend else {"backend": "memory"},
+            "singleflight": self.flight.stats(),
+        }
+
+async def run_sweeper():
+    """Sweep every cache on its sweep_interval, whether or not it is written to."""
+    while True:
+        await asyncio.sleep(SWEEP_TICK)
+        now = time.time()
+        for cache in registry:
+            if now - cache.last_sweep >= cache.sweep_interval:
+                cache.purge_expired()
@@ -0,0 +1,130 @@
+import json
+import os
+import uuid
+
+# Shared second-level cache behind the in-process AsyncCache.
+#
+# CACHE_BACKEND=memory (the default) keeps every cache local to its process.
+# CACHE_BACKEND=redis shares cached values between uvicorn workers and
+# instances through any Redis-protocol server at REDIS_URL; each process
+# still keeps its own in-memory L1 in front of it. The redis package is only
+# needed when the redis backend is selected.
+#
+# Values are stored as JSON together with the time they were set, so every
+# process sees the same entry age. Backend errors are logged and treated as
+# misses: a Redis outage degrades to per-process caching, never to errors.
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_PREFIX = os.getenv("REDIS_PREFIX", "tradex")
+
+# Compare-and-delete so a process only ever releases its own lock
+RELEASE_LOCK = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+def _json_default(value):
+    # numpy scalars from pandas frames
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+class RedisBackend:
+    def __init__(self, url=REDIS_URL, prefix=REDIS_PREFIX, client=None):
+        if client is None:
+            import redis.asyncio as redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+        self.errors = 0
+
+    def _key(self, namespace, key):
+        return f"{self.prefix}:{namespace}:{key}"
+
+    def _lock_key(self, namespace, key):
+        return f"{self.prefix}:lock:{namespace}:{key}"
+
+    async def get_many(self, namespace, keys):
+        """{key: (value, timestamp)} for the keys present, in one MGET."""
+        keys = list(keys)
+        if not keys:
+            return {}
+        try:
+            raw = await self.client.mget([self._key(namespace, key) for key in keys])
+        except Exception as e:
+            self.errors += 1
+            print(f"Cache backend get error for {namespace}: {e}")
+            return {}
+        found = {}
+        for key, data in zip(keys, raw):
+            if data is not None:
+                item = json.loads(data)
+                found[key] = (item["v"], item["t"])
+        return found
+
+    async def set_many(self, namespace, items, ttl):
+        """Store {key: (value, timestamp)} in one pipelined round trip."""
+        if not items:
+            return
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for key, (value, timestamp) in items.items():
+                    data = json.dumps({"v": value, "t": timestamp}, default=_json_default)
+                    pipe.set(self._key(namespace, key), data, px=max(int(ttl * 1000), 1))
+                await pipe.execute()
+        except Exception as e:
+            self.errors += 1
+            print(f"Cache backend set error for {namespace}: {e}")
+
+    async def acquire_lock(self, namespace, key, ttl):
+        """Token if this process now holds the fetch lock for key, else None."""
+        token = uuid.uuid4().hex
+        try:
+            if await self.client.set(self._lock_key(namespace, key), token, nx=True, px=int(ttl * 1000)):
+                return token
+            return None
+        except Exception as e:
+            self.errors += 1
+            print(f"Cache backend lock error for {namespace}: {e}")
+            # Without the shared lock, fall back to fetching locally
+            return "local"
+
+    async def is_locked(self, namespace, key):
+        try:
+            return bool(await self.client.exists(self._lock_key(namespace, key)))
+        except Exception:
+            self.errors += 1
+            return False
+
+    async def release_lock(self, namespace, key, token):
+        if token == "local":
+            return
+        try:
+            await self.client.eval(RELEASE_LOCK, 1, self._lock_key(namespace, key), token)
+        except Exception as e:
+            self.errors += 1
+            print(f"Cache backend unlock error for {namespace}: {e}")
+
+    async def close(self):
+        await self.client.aclose()
+
+    def stats(self):
+        return {"backend": "redis", "errors": self.errors}
+
+_backend = None
+
+def get_backend():
+    """The shared backend selected by CACHE_BACKEND, or None for memory only."""
+    global _backend
+    if _backend is None and CACHE_BACKEND == "redis":
+        _backend = RedisBackend()
+    return _backend
+
+async def close():
+    global _backend
+    if _backend is not None:
+        await _backend.close()
+        _backend = None
@@ -0,0 +1,126 @@
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Dedicated thread pools per upstream instead of the shared default executor.
+# A slow NSE scrape keeps its thread busy even after the caller's wait_for
+# fires, so each upstream gets its own bounded pool: a bad upstream can only
+# exhaust its own threads. Once a pool's queue is full, new work is shed
+# right away with ExecutorOverloaded, which callers treat like any other
+# upstream failure and fall back from.
+
+class ExecutorOverloaded(Exception):
+    pass
+
+# Every BoundedExecutor registers itself here so its stats can be reported
+registry = []
+
+class BoundedExecutor:
+    def __init__(self, name, max_workers, max_queue):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-worker")
+        self.lock = threading.Lock()
+
+        # A running job holds its slot until the thread finishes, even if the
+        # caller gave up; a job the caller gave up on while queued is dropped
+        self.pending = 0 # queued + running
+        self.running = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.exec_total = 0.0
+        self.exec_max = 0.0
+        registry.append(self)
+
+    @property
+    def queued(self):
+        return self.pending - self.running
+
+    def _call(self, fn, submitted_at):
+        started = time.perf_counter()
+        wait = started - submitted_at
+        with self.lock:
+            self.running += 1
+            self.queue_wait_total += wait
+            self.queue_wait_max = max(self.queue_wait_max, wait)
+        ok = False
+        try:
+            result = fn()
+            ok = True
+            return result
+        finally:
+            elapsed = time.perf_counter() - started
+            with self.lock:
+                self.running -= 1
+                self.pending -= 1
+                self.exec_total += elapsed
+                self.exec_max = max(self.exec_max, elapsed)
+                if ok:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+
+    async def run(self, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) on this pool, like asyncio.to_thread."""
+        with self.lock:
+            if self.pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise ExecutorOverloaded(f"{self.name} executor is overloaded")
+            self.pending += 1
+            self.submitted += 1
+
+        ctx = contextvars.copy_context()
+        call = functools.partial(ctx.run, fn, *args, **kwargs)
+        try:
+            future = self.pool.submit(self._call, call, time.perf_counter())
+        except RuntimeError:
+            # Pool already shut down, the job never started; release its slot
+            with self.lock:
+                self.pending -= 1
+            raise
+        future.add_done_callback(self._release_if_cancelled)
+        # If the caller gives up while the job is still queued, the job is dropped
+        return await asyncio.wrap_future(future)
+
+    def _release_if_cancelled(self, future):
+        if future.cancelled():
+            with self.lock:
+                self.pending -= 1
+
+    def stats(self):
+        with self.lock:
+            finished = self.completed + self.failed
+            return {
+                "name": self.name,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": self.running,
+                "queued": self.pending - self.running,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "avg_queue_wait": self.queue_wait_total / finished if finished else 0.0,
+                "max_queue_wait": self.queue_wait_max,
+                "avg_exec_time": self.exec_total / finished if finished else 0.0,
+                "max_exec_time": self.exec_max,
+            }
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+# NSE scrapes are slow and rate limited, keep that pool small
+nse = BoundedExecutor("nse", int(os.getenv("NSE_WORKERS", "4")), int(os.getenv("NSE_QUEUE", "8")))
+# yfinance calls: .info, fast_info, history, bulk downloads
+yahoo = BoundedExecutor("yahoo", int(os.getenv("YAHOO_WORKERS", "16")), int(os.getenv("YAHOO_QUEUE", "64")))
+# CPU bound parsing: HTML scrapes, bhavcopy files
+parse = BoundedExecutor("parse", int(os.getenv("PARSE_WORKERS", "2")), int(os.getenv("PARSE_QUEUE", "16")))
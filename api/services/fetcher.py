@@ -0,0 +1,33 @@
+import asyncio
+import os
+
+# Shared bounded-concurrency fan-out for per-symbol upstream lookups.
+# Defaults can be tuned per deployment through environment variables.
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "8"))
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", "10"))
+
+async def fetch_all(symbols, fetch_one, concurrency=None, timeout=None):
+    """Run fetch_one(symbol) for every symbol, at most `concurrency` at a time.
+
+    Returns a dict of {symbol: result} in the order of `symbols`. Symbols whose
+    lookup raises, times out or returns None are left out, so callers always
+    get whatever partial data could be fetched.
+    """
+    concurrency = concurrency or FETCH_CONCURRENCY
+    timeout = timeout or FETCH_TIMEOUT
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(symbol):
+        async with semaphore:
+            try:
+                return await asyncio.wait_for(fetch_one(symbol), timeout=timeout)
+            except asyncio.TimeoutError:
+                print(f"Fetch timeout for {symbol}")
+            except Exception as e:
+                print(f"Fetch error for {symbol}: {e}")
+            return None
+
+    # Dedupe while keeping the caller's order
+    unique = list(dict.fromkeys(symbols))
+    results = await asyncio.gather(*(run(symbol) for symbol in unique))
+    return {symbol: result for symbol, result in zip(unique, results) if result is not None}
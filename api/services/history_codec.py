@@ -0,0 +1,156 @@
+import numpy as np
+from api.services import startup
+
+pd = startup.lazy_import("pandas")
+
+# Vectorized encoders for OHLCV history frames.
+# Every format is built from whole columns, there is no per-row Python loop.
+
+FIELDS = ["open", "high", "low", "close", "volume"]
+FORMATS = ["json", "columnar", "binary"]
+# Downsampling modes: "candle" aggregates OHLCV buckets, "line" picks bars with LTTB
+MODES = ["candle", "line"]
+
+# Binary layout, all little-endian:
+#   4 bytes  magic b"OHLC"
+#   uint32   number of bars (n)
+#   int64[n] bar timestamps, epoch seconds (UTC)
+#   float64[n] open, high, low, close, volume (one block per field, in order)
+BINARY_MAGIC = b"OHLC"
+BINARY_MEDIA_TYPE = "application/octet-stream"
+
+def _columns(history: "pd.DataFrame"):
+    return {
+        "open": history["Open"].to_numpy(dtype=np.float64),
+        "high": history["High"].to_numpy(dtype=np.float64),
+        "low": history["Low"].to_numpy(dtype=np.float64),
+        "close": history["Close"].to_numpy(dtype=np.float64),
+        "volume": history["Volume"].to_numpy(dtype=np.float64),
+    }
+
+def _format_offset(seconds):
+    sign = "+" if seconds >= 0 else "-"
+    minutes = abs(int(seconds)) // 60
+    return f"{sign}{minutes // 60:02d}:{minutes % 60:02d}"
+
+def iso_dates(index: "pd.DatetimeIndex"):
+    """isoformat() for a whole DatetimeIndex, e.g. 2024-01-02T09:15:00+05:30."""
+    index = index.as_unit("ns")
+    local = index.tz_localize(None) if index.tz is not None else index
+    dates = np.datetime_as_string(local.values, unit="s")
+    if index.tz is None:
+        return dates
+    # UTC offset per bar; there are only ever a couple of distinct ones (DST)
+    offsets = (local.asi8 - index.asi8) // 10**9
+    unique, inverse = np.unique(offsets, return_inverse=True)
+    suffixes = np.array([_format_offset(o) for o in unique])
+    return np.char.add(dates, suffixes[inverse])
+
+def epoch_seconds(index: "pd.DatetimeIndex"):
+    # asi8 is UTC-based for tz-aware indexes; naive ones are taken as UTC
+    return index.as_unit("ns").asi8 // 10**9
+
+def json_column(values: np.ndarray):
+    # NaN is not valid JSON, send null instead
+    column = values.astype(object)
+    column[np.isnan(values)] = None
+    return column
+
+def to_records(history: "pd.DataFrame"):
+    """[{date, open, high, low, close, volume}, ...] as the API has always returned."""
+    if history.empty:
+        return []
+    columns = _columns(history)
+    frame = pd.DataFrame({"date": np.asarray(iso_dates(history.index), dtype=object)})
+    for field in FIELDS:
+        frame[field] = json_column(columns[field])
+    return frame.to_dict(orient="records")
+
+def to_columnar(history: "pd.DataFrame"):
+    """Parallel arrays: {"timestamps": [...], "open": [...], ..., "volume": [...]}."""
+    if history.empty:
+        return {"timestamps": [], **{field: [] for field in FIELDS}}
+    columns = _columns(history)
+    data = {"timestamps": epoch_seconds(history.index).tolist()}
+    for field in FIELDS:
+        data[field] = json_column(columns[field]).tolist()
+    return data
+
+def to_binary(history: "pd.DataFrame"):
+    """Packed int64/float64 buffer, see the layout above."""
+    count = len(history)
+    header = BINARY_MAGIC + np.array([count], dtype="<u4").tobytes()
+    if not count:
+        return header
+    columns = _columns(history)
+    timestamps = np.asarray(epoch_seconds(history.index), dtype="<i8")
+    values = np.concatenate([columns[field] for field in FIELDS]).astype("<f8", copy=False)
+    return header + timestamps.tobytes() + values.tobytes()
+
+def aggregate_ohlc(history: "pd.DataFrame", max_points: int):
+    """max_points candles, each merging a run of consecutive bars.
+
+    A bucket opens at its first bar's open and time, closes at its last
+    bar's close, spans the highest high and lowest low and sums the volume.
+    """
+    count = len(history)
+    columns = _columns(history)
+    starts = np.arange(max_points) * count // max_points
+    ends = np.append(starts[1:], count) - 1
+    return pd.DataFrame({
+        "Open": columns["open"][starts],
+        "High": np.maximum.reduceat(columns["high"], starts),
+        "Low": np.minimum.reduceat(columns["low"], starts),
+        "Close": columns["close"][ends],
+        "Volume": np.add.reduceat(np.nan_to_num(columns["volume"]), starts),
+    }, index=history.index[starts])
+
+def lttb(history: "pd.DataFrame", max_points: int):
+    """max_points of the bars, picked with Largest-Triangle-Three-Buckets on the close.
+
+    The first and last bars are kept; every bucket in between keeps the bar
+    forming the largest triangle with the bar kept before it and the average
+    of the next bucket, which preserves peaks and troughs of the line.
+    """
+    count = len(history)
+    if max_points < 3:
+        return history.iloc[[0, count - 1][:max_points]]
+    x = epoch_seconds(history.index).astype(np.float64)
+    y = history["Close"].to_numpy(dtype=np.float64)
+
+    # Buckets over the bars between the first and the last one
+    bounds = 1 + np.arange(max_points - 1) * (count - 2) // (max_points - 2)
+    sizes = np.diff(bounds)
+    avg_x = np.append(np.add.reduceat(x[1:-1], bounds[:-1] - 1) / sizes, x[-1])
+    avg_y = np.append(np.add.reduceat(y[1:-1], bounds[:-1] - 1) / sizes, y[-1])
+
+    picked = np.empty(max_points, dtype=np.int64)
+    picked[0] = 0
+    picked[-1] = count - 1
+    a = 0
+    for i in range(max_points - 2):
+        lo, hi = bounds[i], bounds[i + 1]
+        # Twice the triangle area, for every bar of the bucket at once
+        area = np.abs((x[a] - avg_x[i + 1]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y[i + 1] - y[a]))
+        a = lo + int(np.argmax(area))
+        picked[i + 1] = a
+    return history.iloc[picked]
+
+def downsample(history: "pd.DataFrame", max_points: int, mode: str = "candle"):
+    """At most max_points bars of history, see aggregate_ohlc and lttb."""
+    # Failed fetches come back as a bare pd.DataFrame()
+    if history.empty or "Close" not in history:
+        return history
+    history = history.dropna(subset=["Close"])
+    if not max_points or len(history) <= max_points:
+        return history
+    if mode == "line":
+        return lttb(history, max_points)
+    return aggregate_ohlc(history, max_points)
+
+def encode(history: "pd.DataFrame", fmt: str):
+    if fmt == "columnar":
+        return to_columnar(history)
+    if fmt == "binary":
+        return to_binary(history)
+    return to_records(history)
@@ -0,0 +1,229 @@
+import numpy as np
+import os
+import sqlite3
+import time
+from api.services import executors, metrics, startup
+from api.services.singleflight import SingleFlight
+
+pd = startup.lazy_import("pandas")
+yf = startup.lazy_import("yfinance")
+
+# Persistent OHLCV store keyed by (symbol, interval).
+# Once a range is stored only the tail since the last stored bar is requested
+# from Yahoo; every period is answered by slicing the local store. The store
+# lives in SQLite and survives restarts.
+#
+# Yahoo's bars are adjusted for splits and dividends as of download time, so
+# past bars only stay valid until the next corporate action. When a refresh
+# sees a split or dividend newer than the last sync, the series is dropped
+# and downloaded again.
+
+DB_PATH = os.getenv("HISTORY_DB_PATH", os.path.join(os.path.dirname(os.path.dirname(__file__)), ".cache", "history.sqlite3"))
+# How long the stored tail is trusted before asking Yahoo for newer bars
+REFRESH_SECONDS = float(os.getenv("HISTORY_REFRESH_SECONDS", "60"))
+
+history_flight = SingleFlight("history")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bars (
+    symbol TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    open REAL, high REAL, low REAL, close REAL, volume REAL,
+    PRIMARY KEY (symbol, interval, ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS series (
+    symbol TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    tz TEXT,
+    covered_from INTEGER, -- earliest time the stored bars are complete from, -1 for "max"
+    last_fetch REAL,
+    PRIMARY KEY (symbol, interval)
+);
+"""
+
+_initialized = False
+
+def _connect():
+    global _initialized
+    if not _initialized:
+        os.makedirs(os.path.dirname(DB_PATH) or ".", exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, timeout=10)
+    if not _initialized:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        _initialized = True
+    return conn
+
+def session_count(period: str):
+    """N for an "Nd" period (the last N sessions, like Yahoo), None for any other."""
+    if period.endswith("d") and period[:-1].isdigit():
+        return int(period[:-1])
+    return None
+
+def required_start(period: str, now: "pd.Timestamp"):
+    """Epoch seconds the store must cover from to answer period, None for "max"."""
+    if period == "max":
+        return None
+    if period == "ytd":
+        start = pd.Timestamp(year=now.year, month=1, day=1, tz="UTC")
+    elif period.endswith("mo"):
+        start = now - pd.DateOffset(months=int(period[:-2]))
+    elif period.endswith("y"):
+        start = now - pd.DateOffset(years=int(period[:-1]))
+    elif session_count(period):
+        days = session_count(period)
+        # Leave room for weekends and holidays, "Nd" means N sessions
+        start = now - pd.Timedelta(days=days + 2 * (days // 5) + 4)
+    else:
+        raise ValueError(f"Unsupported period: {period}")
+    return int(start.timestamp())
+
+def _load_series(conn, symbol, interval):
+    return conn.execute(
+        "SELECT tz, covered_from, last_fetch FROM series WHERE symbol = ? AND interval = ?",
+        (symbol, interval),
+    ).fetchone()
+
+def _store(conn, symbol, interval, history, covered_from, now):
+    history = history.dropna(subset=["Close"])
+    tz = str(history.index.tz) if len(history) and history.index.tz is not None else None
+    if len(history):
+        ts = history.index.as_unit("ns").asi8 // 10**9
+        rows = zip(
+            [symbol] * len(history), [interval] * len(history), ts.tolist(),
+            history["Open"].tolist(), history["High"].tolist(), history["Low"].tolist(),
+            history["Close"].tolist(), history["Volume"].astype(float).tolist(),
+        )
+        conn.executemany("INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    existing = _load_series(conn, symbol, interval)
+    if existing:
+        tz = tz or existing[0]
+        if covered_from is None:
+            covered_from = existing[1]
+        elif existing[1] is not None and (existing[1] == -1 or existing[1] < covered_from):
+            covered_from = existing[1]
+    conn.execute(
+        "INSERT OR REPLACE INTO series VALUES (?, ?, ?, ?, ?)",
+        (symbol, interval, tz, covered_from, now),
+    )
+    conn.commit()
+
+def _coverage(period, start, history):
+    """covered_from for a full download of period, from the bars Yahoo actually returned."""
+    history = history.dropna(subset=["Close"])
+    if not len(history):
+        return None
+    if start is None:
+        return -1
+    if session_count(period):
+        # start is padded for weekends and holidays, only the returned sessions are known
+        return int(history.index[0].timestamp())
+    # Yahoo sent every bar it has since start
+    return start
+
+def _covered(conn, symbol, interval, period, start, covered_from):
+    if covered_from is None:
+        return False
+    if covered_from == -1:
+        return True
+    sessions = session_count(period)
+    if sessions:
+        stored = conn.execute(
+            "SELECT COUNT(DISTINCT ts / 86400) FROM bars WHERE symbol = ? AND interval = ? AND ts >= ?",
+            (symbol, interval, covered_from),
+        ).fetchone()[0]
+        return stored >= sessions
+    return start is not None and covered_from <= start
+
+def _has_corporate_action(history, since):
+    """True if history has a split or dividend on a bar after epoch seconds since."""
+    columns = [c for c in ("Dividends", "Stock Splits") if c in history.columns]
+    if not columns or not len(history):
+        return False
+    flagged = (history[columns].fillna(0) != 0).any(axis=1).to_numpy()
+    ts = history.index.as_unit("ns").asi8 // 10**9
+    return bool((flagged & (ts > since)).any())
+
+def _drop_series(conn, symbol, interval):
+    conn.execute("DELETE FROM bars WHERE symbol = ? AND interval = ?", (symbol, interval))
+    conn.execute("DELETE FROM series WHERE symbol = ? AND interval = ?", (symbol, interval))
+    conn.commit()
+
+def _last_ts(conn, symbol, interval):
+    row = conn.execute(
+        "SELECT MAX(ts) FROM bars WHERE symbol = ? AND interval = ?", (symbol, interval)
+    ).fetchone()
+    return row[0]
+
+def _read(conn, symbol, interval, period, start, tz):
+    query = "SELECT ts, open, high, low, close, volume FROM bars WHERE symbol = ? AND interval = ?"
+    params = [symbol, interval]
+    if start is not None:
+        query += " AND ts >= ?"
+        params.append(start)
+    rows = conn.execute(query + " ORDER BY ts", params).fetchall()
+    if not rows:
+        return pd.DataFrame(columns=["Open", "High", "Low", "Close", "Volume"])
+
+    data = np.array(rows, dtype=np.float64)
+    index = pd.to_datetime(data[:, 0].astype(np.int64), unit="s", utc=True)
+    if tz:
+        index = index.tz_convert(tz)
+    frame = pd.DataFrame(data[:, 1:], index=index, columns=["Open", "High", "Low", "Close", "Volume"])
+
+    # "Nd" periods mean the last N sessions, like Yahoo
+    sessions = session_count(period)
+    if sessions:
+        dates = frame.index.normalize()
+        keep = dates.unique()[-sessions:]
+        frame = frame[dates.isin(keep)]
+    return frame
+
+def _yahoo_history(symbol, **kwargs):
+    with metrics.track("yfinance", "history"):
+        return yf.Ticker(symbol).history(**kwargs)
+
+def _sync_history(symbol, period, interval):
+    now = pd.Timestamp.now(tz="UTC")
+    start = required_start(period, now)
+    conn = _connect()
+    try:
+        series = _load_series(conn, symbol, interval)
+        covered = series is not None and _covered(conn, symbol, interval, period, start, series[1])
+
+        if covered and time.time() - (series[2] or 0) >= REFRESH_SECONDS:
+            # Only ask for bars since the last stored one; it may have been partial
+            last = _last_ts(conn, symbol, interval)
+            try:
+                history = _yahoo_history(
+                    symbol, start=pd.Timestamp(last, unit="s", tz="UTC").to_pydatetime(), interval=interval
+                )
+            except Exception as e:
+                # e.g. intraday tail older than Yahoo keeps, refetch the period
+                print(f"History tail fetch failed for {symbol} {interval}: {e}")
+                history = _yahoo_history(symbol, period=period, interval=interval)
+            if _has_corporate_action(history, series[2] or 0):
+                # The stored bars are on the scale from before it
+                print(f"Split or dividend for {symbol}, refetching its {interval} history")
+                _drop_series(conn, symbol, interval)
+                covered = False
+            else:
+                _store(conn, symbol, interval, history, None, time.time())
+
+        if not covered:
+            # First request for this range: download the whole period once
+            history = _yahoo_history(symbol, period=period, interval=interval)
+            _store(conn, symbol, interval, history, _coverage(period, start, history), time.time())
+
+        tz = (_load_series(conn, symbol, interval) or (None,))[0]
+        return _read(conn, symbol, interval, period, start, tz)
+    finally:
+        conn.close()
+
+async def get_history_frame(symbol: str, period: str, interval: str):
+    """OHLCV DataFrame for a yfinance symbol, served from the local store."""
+    return await history_flight.do(
+        (symbol, period, interval), lambda: executors.yahoo.run(_sync_history, symbol, period, interval)
+    )
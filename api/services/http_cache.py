@@ -0,0 +1,91 @@
+import hashlib
+import os
+import time
+import orjson
+from fastapi import Request, Response
+
+# HTTP responses for cached API data.
+#
+# respond() encodes a value with orjson and returns the bytes as a raw
+# Response, skipping FastAPI's jsonable_encoder and the stdlib json module.
+# When the value was served from an AsyncCache entry, the encoded body is
+# kept on that entry, so every later hit sends the same bytes without
+# encoding anything.
+#
+# Each response carries a content-hash ETag, and a matching If-None-Match
+# gets a bare 304. The ETag is weak: the same tag goes out on the identity and
+# the gzipped encoding of a body. Responses served from a cache entry get a
+# Cache-Control max-age equal to the entry's remaining soft TTL, plus
+# stale-while-revalidate for the rest of its hard TTL, so browsers and CDNs
+# expire them exactly when we would. Values that belong to a cache but weren't
+# served from its entry get the cache's full TTLs; responses with no cache
+# must be revalidated.
+#
+# Responses of at least COMPRESS_MIN_SIZE bytes are gzipped by the
+# middleware registered in main.py.
+
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+JSON_MEDIA_TYPE = "application/json"
+
+# numpy arrays and scalars are encoded natively; NaN and Infinity become null
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+def _default(value):
+    # pandas scalars (Timestamp, NA, ...) and anything else orjson doesn't know
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+def encode(value):
+    """JSON bytes for value; bytes (binary payloads) are sent as is."""
+    if isinstance(value, bytes):
+        return value
+    return orjson.dumps(value, default=_default, option=ORJSON_OPTIONS)
+
+def compute_etag(body: bytes):
+    return 'W/"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+def _matches(request: Request, etag: str):
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as If-None-Match requires
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+def cache_control(cache, entry=None):
+    if cache is None:
+        return "no-cache"
+    age = time.time() - entry.timestamp if entry is not None else 0.0
+    control = f"public, max-age={max(0, int(cache.ttl - age))}"
+    stale = int(cache.stale_ttl - max(age, cache.ttl))
+    if stale > 0:
+        control += f", stale-while-revalidate={stale}"
+    return control
+
+def respond(request: Request, value, cache=None, key=None, media_type=JSON_MEDIA_TYPE):
+    """Response with value's encoded body, ETag and Cache-Control, or a bare 304.
+
+    Pass the cache and key value was served from to reuse that entry's
+    encoding and tie the caching headers to it.
+    """
+    entry = cache.peek(key) if cache is not None else None
+    if entry is not None and entry.value is not value:
+        # An older or unrelated entry, not the one being served
+        entry = None
+    if entry is not None:
+        if entry.body is None:
+            body = encode(value)
+            cache.attach_body(key, entry, body, compute_etag(body))
+        body, etag = entry.body, entry.etag
+    else:
+        body = encode(value)
+        etag = compute_etag(body)
+    headers = {"ETag": etag, "Cache-Control": cache_control(cache, entry)}
+    if _matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type=media_type, headers=headers)
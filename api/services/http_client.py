@@ -0,0 +1,43 @@
+import httpx
+import os
+from api.services import startup
+
+# One app-wide async HTTP client for every direct outbound call.
+# Connections are pooled and kept alive per host, so repeated calls to Yahoo
+# or Google skip the TCP/TLS handshake. HTTP/2 is used when h2 is installed.
+try:
+    import h2 # noqa: F401
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "5"))
+
+_client = None
+
+# Building the client's SSL context is slow enough to leave to the warm-up
+@startup.add_warmup
+def get_client():
+    """Return the shared client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=HTTP2,
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+            timeout=TIMEOUT,
+            follow_redirects=True,
+        )
+    return _client
+
+async def close():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
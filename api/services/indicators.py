@@ -0,0 +1,227 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from api.services import history_codec, startup
+
+pd = startup.lazy_import("pandas")
+# scipy.signal alone is over a second of import time
+signal = startup.lazy_import("scipy.signal")
+
+# Technical indicators over OHLCV history, computed server side.
+#
+# Every indicator is a function (bars, params, start, previous) -> {field: array}.
+# With start == 0 it computes the whole series; otherwise it only computes
+# bars[start:] and continues from the previous result: running EMAs restart
+# from their value at start - 1, rolling windows only look back window - 1
+# bars and VWAP continues the session's running sums. Rolling means and
+# EMAs are vectorized (cumsum, lfilter), there is no per-bar Python loop.
+#
+# Fields starting with "_" are internal state kept for the next update and
+# are not sent to clients.
+
+DEFAULT_PARAMS = {
+    "sma_window": 20,
+    "ema_span": 20,
+    "rsi_period": 14,
+    "macd_fast": 12,
+    "macd_slow": 26,
+    "macd_signal": 9,
+    "bb_window": 20,
+    "bb_k": 2.0,
+}
+
+def _rolling_mean(x, window):
+    out = np.full(len(x), np.nan)
+    if len(x) >= window:
+        total = np.cumsum(np.insert(x, 0, 0.0))
+        out[window - 1:] = (total[window:] - total[:-window]) / window
+    return out
+
+def _rolling_std(x, window):
+    out = np.full(len(x), np.nan)
+    if len(x) >= window:
+        out[window - 1:] = sliding_window_view(x, window).std(axis=1)
+    return out
+
+def _window_tail(fn, x, window, start):
+    """fn(x, window)[start:], only looking at the bars the tail depends on."""
+    lo = max(0, start - window + 1)
+    return fn(x[lo:], window)[start - lo:]
+
+def _ema(x, alpha, prev=None):
+    """EMA of x continuing from prev, the EMA value just before x[0]."""
+    if not len(x):
+        return np.empty(0)
+    seed = x[0] if prev is None or np.isnan(prev) else prev
+    # y[n] = alpha * x[n] + (1 - alpha) * y[n - 1]
+    y, _ = signal.lfilter([alpha], [1.0, alpha - 1.0], x, zi=[(1.0 - alpha) * seed])
+    return y
+
+def _last(previous, field, start):
+    return previous[field][start - 1] if previous is not None and start > 0 else None
+
+def _join(previous, field, start, tail):
+    if previous is None or start == 0:
+        return tail
+    return np.concatenate([previous[field][:start], tail])
+
+def sma(bars, params, start, previous):
+    tail = _window_tail(_rolling_mean, bars["close"], params["sma_window"], start)
+    return {"sma": _join(previous, "sma", start, tail)}
+
+def ema(bars, params, start, previous):
+    alpha = 2.0 / (params["ema_span"] + 1)
+    tail = _ema(bars["close"][start:], alpha, _last(previous, "ema", start))
+    return {"ema": _join(previous, "ema", start, tail)}
+
+def rsi(bars, params, start, previous):
+    # Wilder's RSI: smoothed average gain / loss with alpha = 1 / period
+    close = bars["close"]
+    period = params["rsi_period"]
+    lo = max(start, 1) # the first bar has no change
+    delta = np.diff(close[lo - 1:])
+    alpha = 1.0 / period
+    gain = _ema(np.clip(delta, 0, None), alpha, _last(previous, "_gain", lo))
+    loss = _ema(np.clip(-delta, 0, None), alpha, _last(previous, "_loss", lo))
+    if lo > start:
+        gain = np.insert(gain, 0, np.nan)
+        loss = np.insert(loss, 0, np.nan)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = 100.0 - 100.0 / (1.0 + gain / loss)
+    values = np.where(loss == 0, np.where(gain == 0, 50.0, 100.0), values)
+    # Not meaningful until a full period of changes has been seen
+    values[np.arange(start, len(close)) < period] = np.nan
+    return {
+        "rsi": _join(previous, "rsi", start, values),
+        "_gain": _join(previous, "_gain", start, gain),
+        "_loss": _join(previous, "_loss", start, loss),
+    }
+
+def macd(bars, params, start, previous):
+    close = bars["close"][start:]
+    fast = _ema(close, 2.0 / (params["macd_fast"] + 1), _last(previous, "_fast", start))
+    slow = _ema(close, 2.0 / (params["macd_slow"] + 1), _last(previous, "_slow", start))
+    line = fast - slow
+    signal_line = _ema(line, 2.0 / (params["macd_signal"] + 1), _last(previous, "signal", start))
+    return {
+        "macd": _join(previous, "macd", start, line),
+        "signal": _join(previous, "signal", start, signal_line),
+        "histogram": _join(previous, "histogram", start, line - signal_line),
+        "_fast": _join(previous, "_fast", start, fast),
+        "_slow": _join(previous, "_slow", start, slow),
+    }
+
+def bollinger(bars, params, start, previous):
+    close = bars["close"]
+    window = params["bb_window"]
+    middle = _window_tail(_rolling_mean, close, window, start)
+    std = _window_tail(_rolling_std, close, window, start)
+    return {
+        "middle": _join(previous, "middle", start, middle),
+        "upper": _join(previous, "upper", start, middle + params["bb_k"] * std),
+        "lower": _join(previous, "lower", start, middle - params["bb_k"] * std),
+    }
+
+def _session_cumsum(x, new_session, carry):
+    """Running sum of x that restarts where new_session is set, the first session continues from carry."""
+    total = np.cumsum(x) + carry
+    session_start = np.maximum.accumulate(np.where(new_session, np.arange(len(x)), 0))
+    base = np.where(new_session[session_start], (total - x)[session_start], 0.0)
+    return total - base
+
+def vwap(bars, params, start, previous):
+    # Volume weighted typical price, reset every trading day
+    sessions = bars["session"]
+    tail_sessions = sessions[start:]
+    if not len(tail_sessions):
+        return previous
+    typical = (bars["high"][start:] + bars["low"][start:] + bars["close"][start:]) / 3.0
+    volume = np.nan_to_num(bars["volume"][start:])
+
+    new_session = np.empty(len(tail_sessions), dtype=bool)
+    new_session[0] = start == 0 or sessions[start - 1] != tail_sessions[0]
+    new_session[1:] = tail_sessions[1:] != tail_sessions[:-1]
+    carry_pv = 0.0 if new_session[0] else previous["_pv"][start - 1]
+    carry_v = 0.0 if new_session[0] else previous["_v"][start - 1]
+
+    pv = _session_cumsum(typical * volume, new_session, carry_pv)
+    v = _session_cumsum(volume, new_session, carry_v)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = np.where(v > 0, pv / v, np.nan)
+    return {
+        "vwap": _join(previous, "vwap", start, values),
+        "_pv": _join(previous, "_pv", start, pv),
+        "_v": _join(previous, "_v", start, v),
+    }
+
+INDICATORS = {
+    "sma": sma,
+    "ema": ema,
+    "rsi": rsi,
+    "macd": macd,
+    "bollinger": bollinger,
+    "vwap": vwap,
+}
+
+def bars_from_history(history: "pd.DataFrame"):
+    history = history.dropna(subset=["Close"])
+    index = history.index
+    # Trading day of each bar in the exchange's timezone, for VWAP resets
+    local = index.tz_localize(None) if index.tz is not None else index
+    return {
+        "timestamps": np.asarray(history_codec.epoch_seconds(index)),
+        "session": local.as_unit("ns").normalize().asi8 // (86400 * 10**9),
+        "open": history["Open"].to_numpy(dtype=np.float64),
+        "high": history["High"].to_numpy(dtype=np.float64),
+        "low": history["Low"].to_numpy(dtype=np.float64),
+        "close": history["Close"].to_numpy(dtype=np.float64),
+        "volume": history["Volume"].to_numpy(dtype=np.float64),
+    }
+
+def _resume_index(bars, previous):
+    """(first bar to (re)compute, bars dropped from the head since previous), None if nothing changed."""
+    if previous is None:
+        return 0, 0
+    old = previous["bars"]
+    ts = bars["timestamps"]
+    # Rolling periods drop bars from the head as new ones come in; the stored
+    # series carry on from where the new history starts
+    offset = int(np.searchsorted(old["timestamps"], ts[0])) if len(ts) else 0
+    count = len(old["timestamps"]) - offset # stored bars still in the history
+    # The last stored bar may have been partial, so it is always recomputed
+    if count <= 0 or len(ts) < count or not np.array_equal(ts[:count], old["timestamps"][offset:]):
+        return 0, 0 # history was re-based (window grew backwards, split adjustment), start over
+    if offset == 0 and len(ts) == count and all(np.array_equal(bars[f][-1:], old[f][-1:], equal_nan=True) for f in ("open", "high", "low", "close", "volume")):
+        return None
+    return count - 1, offset
+
+def _json_series(values):
+    return history_codec.json_column(values).tolist()
+
+def compute(history: "pd.DataFrame", names, params, previous=None):
+    """Indicator state for history: {"bars", "series", "response", "updated_from"}.
+
+    previous is the state returned for an earlier version of the same
+    history; only bars from the first changed one onwards are recomputed.
+    Bars kept from previous after the head of the window moved keep their
+    values, which were warmed up on the bars that dropped out.
+    """
+    bars = bars_from_history(history)
+    resume = _resume_index(bars, previous)
+    if resume is None:
+        return previous
+    start, offset = resume
+
+    series = {}
+    for name in names:
+        before = None
+        if start:
+            before = {field: values[offset:] for field, values in previous["series"][name].items()}
+        series[name] = INDICATORS[name](bars, params, start, before)
+
+    response = {"timestamps": bars["timestamps"].tolist()}
+    for name, fields in series.items():
+        public = {field: _json_series(values) for field, values in fields.items() if not field.startswith("_")}
+        # Single-series indicators are sent as a plain array
+        response[name] = public[name] if list(public) == [name] else public
+    return {"bars": bars, "series": series, "response": response, "updated_from": start}
@@ -1,109 +1,157 @@
-import yfinance as yf
 import asyncio
-from nselib import capital_market
-from functools import lru_cache
-from datetime import datetime, timedelta
-import time
 import os
+import time
+from api.services.fetcher import fetch_all
+from api.services.cache import AsyncCache
+from api.services.singleflight import SingleFlight
+from api.services import batch_quotes, executors, metrics, movers, startup, upstream
 
-# Simple in-memory cache with TTL
-class AsyncCache:
-    def __init__(self, ttl_seconds=60):
-        self.cache = {}
-        self.ttl = ttl_seconds
+yf = startup.lazy_import("yfinance")
+capital_market = startup.lazy_import("nselib.capital_market")
 
-    async def get(self, key):
-        if key in self.cache:
-            data, timestamp = self.cache[key]
-            if time.time() - timestamp < self.ttl:
-                return data
-            else:
-                del self.cache[key]
-        return None
+# Initialize caches
+# 5 minutes fresh; stale data is served while a background refresh runs
+market_cache = AsyncCache(
+    ttl_seconds=300,
+    stale_ttl_seconds=int(os.getenv("MARKET_STALE_TTL", "1800")),
+    refresh_ahead=0.8,
+    max_entries=256,
+    name="market_cache",
+)
 
-    async def set(self, key, value):
-        self.cache[key] = (value, time.time())
+# Helper for per-symbol lookups; runs in a worker thread
+def _get_info(symbol):
+    with metrics.track("yfinance", "info"):
+        return yf.Ticker(symbol).info
 
-# Initialize caches
-market_cache = AsyncCache(ttl_seconds=300) # 5 minutes cache
+# Symbols shown on the dashboards
+GLOBAL_INDICES = ["^GSPC", "^DJI", "^IXIC", "^RUT"]
+# Simulated list of active stocks to filter from
+GLOBAL_MOVER_SYMBOLS = [
+    "NVDA", "TSLA", "AAPL", "MSFT", "AMD", "AMZN", "GOOGL", "META", "NFLX", "INTC",
+    "PLTR", "COIN", "MARA", "RIOT", "DKNG", "UBER", "ABNB", "HOOD", "PYPL", "SQ",
+    "PFE", "MRNA", "JNJ", "LLY", "UNH", "XOM", "CVX", "JPM", "BAC", "WFC"
+]
+# Predefined lists for requested sectors
+SECTORS = {
+    "tech": ["AAPL", "MSFT", "NVDA", "ORCL", "ADBE"],
+    "health": ["UNH", "JNJ", "LLY", "MRK", "ABBV"],
+    "pharma": ["PFE", "BMY", "GILD", "AMGN", "BIIB"]
+}
+
+# Indian indices as named by nselib, and their yfinance fallbacks
+NSE_TARGET_INDICES = ["NIFTY 50", "NIFTY BANK", "NIFTY IT", "NIFTY NEXT 50", "SENSEX"]
+INDIAN_INDICES = ["^NSEI", "^NSEBANK", "^CNXIT", "^BSESN"]
+# Popular Indian stocks (Nifty 50 components) for the movers fallback
+INDIAN_MOVER_SYMBOLS = [
+    "RELIANCE.NS", "TCS.NS", "HDFCBANK.NS", "ICICIBANK.NS", "INFY.NS", 
+    "HINDUNILVR.NS", "ITC.NS", "SBIN.NS", "BHARTIARTL.NS", "KOTAKBANK.NS",
+    "LT.NS", "AXISBANK.NS", "TATAMOTORS.NS", "MARUTI.NS", "SUNPHARMA.NS",
+    "BAJFINANCE.NS", "ASIANPAINT.NS", "HCLTECH.NS", "TITAN.NS", "M&M.NS"
+]
+# Predefined lists for Indian sectors
+INDIAN_SECTORS = {
+    "tech": ["INFY.NS", "TCS.NS", "HCLTECH.NS", "TECHM.NS", "WIPRO.NS"],
+    "health": ["APOLLOHOSP.NS", "MAXHEALTH.NS", "LALPATHLAB.NS", "SYNGENE.NS", "METROPOLIS.NS"],
+    "pharma": ["SUNPHARMA.NS", "DRREDDY.NS", "CIPLA.NS", "DIVISLAB.NS", "LUPIN.NS"]
+}
+
+# Movers universes, overridable with a symbols file (one per line)
+MOVERS_COUNT = int(os.getenv("MOVERS_COUNT", "5"))
+# How often the whole universe is re-quoted; quote fetches elsewhere keep
+# individual symbols current in between
+MOVERS_REFRESH_SECONDS = float(os.getenv("MOVERS_REFRESH_SECONDS", "60"))
+
+def _universe_symbols(env, default):
+    path = os.getenv(env)
+    return movers.load_symbols(path) if path else default
 
-# Global variable to track last NSE request time
-last_nse_request_time = 0
-NSE_REQUEST_DELAY = 60 # 60 seconds delay
+global_movers = movers.MoversUniverse("global", _universe_symbols("MOVERS_GLOBAL_SYMBOLS_FILE", GLOBAL_MOVER_SYMBOLS))
+indian_movers = movers.MoversUniverse("indian", _universe_symbols("MOVERS_INDIAN_SYMBOLS_FILE", INDIAN_MOVER_SYMBOLS), currency="INR")
+movers_flight = SingleFlight("movers")
+
+async def _load_universe(universe):
+    quotes, names = await asyncio.gather(
+        batch_quotes.get_quotes(universe.symbols),
+        batch_quotes.get_names(universe.symbols),
+    )
+    # Fetched quotes were already observed, this covers the cached ones
+    universe.update_many(quotes)
+    universe.update_names(names)
+    universe.refreshed_at = time.time()
+
+async def _refresh_universe(universe):
+    if time.time() - universe.refreshed_at >= MOVERS_REFRESH_SECONDS:
+        await movers_flight.do(universe.name, lambda: _load_universe(universe))
+
+# Build mover/sector rows for a symbol list from one batched quote fetch
+async def _batch_rows(symbols, currency=None):
+    quotes, names = await asyncio.gather(
+        batch_quotes.get_quotes(symbols),
+        batch_quotes.get_names(symbols),
+    )
+    return _rows(symbols, quotes, names, currency)
+
+def _rows(symbols, quotes, names, currency=None):
+    rows = []
+    for symbol in symbols:
+        quote = quotes.get(symbol)
+        if quote is None:
+            continue
+        row = {
+            "symbol": symbol.replace(".NS", ""), # Remove .NS extension
+            "name": names.get(symbol, symbol),
+            "price": quote["price"],
+            "change": quote["change"],
+            "percent_change": quote["percent_change"]
+        }
+        if currency:
+            row["currency"] = currency
+        rows.append(row)
+    return rows
 
 async def get_overview():
+    return await market_cache.get_or_fetch("global_overview", _fetch_overview)
+
+async def _fetch_overview():
     cache_key = "global_overview"
-    cached_data = await market_cache.get(cache_key)
-    if cached_data:
-        return cached_data
 
-    # Common indices
-    indices = ["^GSPC", "^DJI", "^IXIC", "^RUT"]
-    data = []
-    
-    for symbol in indices:
-        try:
-            ticker = await asyncio.to_thread(yf.Ticker, symbol)
-            info = await asyncio.to_thread(lambda: ticker.info)
-            data.append({
-                "symbol": symbol,
-                "name": info.get("shortName", symbol),
-                "price": info.get("regularMarketPrice", 0),
-                "change": info.get("regularMarketChange", 0),
-                "percent_change": info.get("regularMarketChangePercent", 0)
-            })
-        except Exception:
-            continue
-            
-    await market_cache.set(cache_key, data)
+    async def fetch_one(symbol):
+        info = await upstream.yahoo.call(lambda: executors.yahoo.run(_get_info, symbol))
+        return {
+            "symbol": symbol,
+            "name": info.get("shortName", symbol),
+            "price": info.get("regularMarketPrice", 0),
+            "change": info.get("regularMarketChange", 0),
+            "percent_change": info.get("regularMarketChangePercent", 0)
+        }
+
+    data = list((await fetch_all(GLOBAL_INDICES, fetch_one)).values())
+    # Nothing at all means every lookup failed, don't cache that
+    if data:
+        await market_cache.set(cache_key, data)
     return data
 
 async def get_indian_overview():
+    return await market_cache.get_or_fetch("indian_overview", _fetch_indian_overview)
+
+async def _fetch_indian_overview():
     cache_key = "indian_overview"
-    cached_data = await market_cache.get(cache_key)
-    if cached_data:
-        return cached_data
-
-    # Check for rate limiting
-    global last_nse_request_time
-    current_time = time.time()
-    if current_time - last_nse_request_time < NSE_REQUEST_DELAY:
-        print("Rate limit: Serving fallback or cached data for Indian Overview")
-        # If cache missed but rate limited, try to get stale cache or fallback
-        # Since we don't have stale cache logic, go to fallback
-        return await get_indian_overview_fallback()
 
     # Indian indices using nselib
     try:
-        last_nse_request_time = time.time()
-        # Fetch indices data using nselib
+        # Fetch indices data using nselib, skipped instantly while NSE is
+        # rate limited or its circuit is open
         # The correct function in nselib 2.x+ is market_watch_all_indices()
-        df = await asyncio.to_thread(capital_market.market_watch_all_indices)
-        
-        # Target indices to display
-        target_indices = ["NIFTY 50", "NIFTY BANK", "NIFTY IT", "NIFTY NEXT 50", "SENSEX"]
-        results = []
+        df = await upstream.nse.call(lambda: executors.nse.run(metrics.timed("nselib", "indices", capital_market.market_watch_all_indices)))
         
-        # Iterate through dataframe rows
-        for index, row in df.iterrows():
-            # The column name is 'indexSymbol'
-            # nselib might return different casing, so be careful
-            if row['index'] in target_indices:
-                results.append({
-                    "symbol": row['index'],
-                    "name": row['index'], # Use symbol as name to match frontend expectation
-                    "price": float(str(row['last']).replace(',', '')),
-                    "change": float(str(row['variation']).replace(',', '')),
-                    "percent_change": float(str(row['percentChange']).replace(',', '')),
-                    "currency": "INR"
-                })
+        results = _parse_nse_indices(df)
         
         # Explicitly fetch Sensex if not found in nselib (nselib mainly covers NSE)
         # SENSEX is BSE, so we use fallback/yfinance for it
         if not any(r['symbol'] == 'SENSEX' for r in results):
              try:
-                ticker = await asyncio.to_thread(yf.Ticker, "^BSESN")
-                info = await asyncio.to_thread(lambda: ticker.info)
+                info = await upstream.yahoo.call(lambda: executors.yahoo.run(_get_info, "^BSESN"))
                 results.append({
                     "symbol": "SENSEX",
                     "name": "S&P BSE SENSEX",
@@ -117,90 +165,63 @@ async def get_indian_overview():
 
         await market_cache.set(cache_key, results)
         return results
+    except upstream.UpstreamUnavailable as e:
+        print(f"Serving fallback data for Indian Overview: {e}")
+        return await get_indian_overview_fallback()
     except Exception as e:
         print(f"NSE Indices Error: {e}")
         # Fallback to yfinance if nselib fails
         return await get_indian_overview_fallback()
 
-async def get_indian_overview_fallback():
-    # Fallback to yfinance
-    indices = ["^NSEI", "^NSEBANK", "^CNXIT", "^BSESN"]
-    data = []
-    for symbol in indices:
-        try:
-            ticker = await asyncio.to_thread(yf.Ticker, symbol)
-            info = await asyncio.to_thread(lambda: ticker.info)
-            data.append({
-                "symbol": "SENSEX" if symbol == "^BSESN" else symbol.replace("^", "").replace(".NS", ""), # Normalize names
-                "name": info.get("shortName", symbol).replace("^", "").replace(".NS", ""),
-                "price": info.get("regularMarketPrice", 0),
-                "change": info.get("regularMarketChange", 0),
-                "percent_change": info.get("regularMarketChangePercent", 0),
+def _parse_nse_indices(df):
+    results = []
+    
+    # Iterate through dataframe rows
+    for index, row in df.iterrows():
+        # The column name is 'indexSymbol'
+        # nselib might return different casing, so be careful
+        if row['index'] in NSE_TARGET_INDICES:
+            results.append({
+                "symbol": row['index'],
+                "name": row['index'], # Use symbol as name to match frontend expectation
+                "price": float(str(row['last']).replace(',', '')),
+                "change": float(str(row['variation']).replace(',', '')),
+                "percent_change": float(str(row['percentChange']).replace(',', '')),
                 "currency": "INR"
             })
-        except Exception:
-            continue
-    return data
+    return results
+
+def _indian_index_symbol(symbol):
+    return "SENSEX" if symbol == "^BSESN" else symbol.replace("^", "").replace(".NS", "") # Normalize names
+
+async def get_indian_overview_fallback():
+    # Fallback to yfinance
+    metrics.fallbacks.inc(endpoint="indian_overview", fallback="yfinance")
+    async def fetch_one(symbol):
+        info = await upstream.yahoo.call(lambda: executors.yahoo.run(_get_info, symbol))
+        return {
+            "symbol": _indian_index_symbol(symbol),
+            "name": info.get("shortName", symbol).replace("^", "").replace(".NS", ""),
+            "price": info.get("regularMarketPrice", 0),
+            "change": info.get("regularMarketChange", 0),
+            "percent_change": info.get("regularMarketChangePercent", 0),
+            "currency": "INR"
+        }
+
+    return list((await fetch_all(INDIAN_INDICES, fetch_one)).values())
 
 async def get_movers(mover_type: str = "gainers"):
-    cache_key = f"global_movers_{mover_type}"
-    cached_data = await market_cache.get(cache_key)
-    if cached_data:
-        return cached_data
-
-    # Simulated list of active stocks to filter from
-    symbols = [
-        "NVDA", "TSLA", "AAPL", "MSFT", "AMD", "AMZN", "GOOGL", "META", "NFLX", "INTC",
-        "PLTR", "COIN", "MARA", "RIOT", "DKNG", "UBER", "ABNB", "HOOD", "PYPL", "SQ",
-        "PFE", "MRNA", "JNJ", "LLY", "UNH", "XOM", "CVX", "JPM", "BAC", "WFC"
-    ]
-    
-    movers = []
-    
-    # Fallback to Yahoo
-    for symbol in symbols:
-        try:
-            ticker = await asyncio.to_thread(yf.Ticker, symbol)
-            info = await asyncio.to_thread(lambda: ticker.info)
-            change_percent = info.get("regularMarketChangePercent", 0) * 100
-            
-            movers.append({
-                "symbol": symbol,
-                "name": info.get("shortName", symbol),
-                "price": info.get("currentPrice", 0),
-                "change": info.get("regularMarketChange", 0),
-                "percent_change": change_percent
-            })
-        except Exception:
-            continue
-    
-    # Filter and sort based on type
-    if mover_type == "gainers":
-        filtered = [m for m in movers if m["percent_change"] > 0]
-        filtered.sort(key=lambda x: x["percent_change"], reverse=True)
-    else: # losers
-        filtered = [m for m in movers if m["percent_change"] < 0]
-        filtered.sort(key=lambda x: x["percent_change"]) # Most negative first
-        
-    result = filtered[:5] # Return top 5
-    await market_cache.set(cache_key, result)
-    return result
+    # Gainers and losers are both answered from the shared universe
+    await _refresh_universe(global_movers)
+    return global_movers.top(mover_type, MOVERS_COUNT)
 
 async def get_indian_movers(mover_type: str = "gainers"):
+    return await market_cache.get_or_fetch(f"indian_movers_{mover_type}", lambda: _fetch_indian_movers(mover_type))
+
+async def _fetch_indian_movers(mover_type: str):
     cache_key = f"indian_movers_{mover_type}"
-    cached_data = await market_cache.get(cache_key)
-    if cached_data:
-        return cached_data
-
-    # Check for rate limiting
-    global last_nse_request_time
-    current_time = time.time()
-    if current_time - last_nse_request_time < NSE_REQUEST_DELAY:
-        print(f"Rate limit: Serving fallback data for Indian Movers ({mover_type})")
-        return await get_indian_movers_fallback(mover_type)
 
     try:
-        last_nse_request_time = time.time()
         # Using nselib for top gainers/losers
         # 'to_get' parameter accepts 'gainers' or 'loosers' (note the spelling in nselib)
         # Note: nselib top_gainers_or_losers() might not take arguments in newer versions or arguments might differ
@@ -214,179 +235,160 @@ async def get_indian_movers(mover_type: str = "gainers"):
         # If the library changed, we should wrap this in try-except
         
         if mover_type == "gainers":
-             df = await asyncio.to_thread(capital_market.top_gainers_or_losers) # This might return both or we need to filter?
+             df = await upstream.nse.call(lambda: executors.nse.run(metrics.timed("nselib", "movers", capital_market.top_gainers_or_losers))) # This might return both or we need to filter?
              # Actually top_gainers_or_losers is usually for Nifty 50 by default
         else:
-             df = await asyncio.to_thread(capital_market.top_gainers_or_losers)
+             df = await upstream.nse.call(lambda: executors.nse.run(metrics.timed("nselib", "movers", capital_market.top_gainers_or_losers)))
 
-        # nselib's top_gainers_or_losers typically returns a DataFrame.
-        # We need to see its columns. Usually 'symbol', 'ltp', 'pChange' etc.
-        
-        results = []
-        # Columns: symbol, series, open_price, high_price, low_price, ltp, prev_price, net_price, trade_quantity, turnover, market_type, ca_ex_dt, ca_purpose, perChange, legend
-        
-        for index, row in df.iterrows():
-            # Filter for gainers/losers manually if the API returns mixed or specific set
-            p_change = float(str(row['pChange']).replace(',', ''))
-            
-            if (mover_type == "gainers" and p_change > 0) or (mover_type == "losers" and p_change < 0):
-                results.append({
-                    "symbol": f"{row['symbol']}.NS", # Append .NS for compatibility with yfinance details
-                    "name": row['symbol'], # Use symbol as name if full name not available in this view
-                    "price": float(str(row['ltp']).replace(',', '')),
-                    "change": float(str(row['ltp']).replace(',', '')) - float(str(row['previousPrice']).replace(',', '')), 
-                    "percent_change": p_change,
-                    "currency": "INR"
-                })
-            
-        if not results:
+        result = _parse_nse_movers(df, mover_type)
+        if not result:
              # Trigger fallback if nselib returns empty list but no exception
              return await get_indian_movers_fallback(mover_type)
 
-        # Sort results
-        if mover_type == "gainers":
-            results.sort(key=lambda x: x["percent_change"], reverse=True)
-        else:
-            results.sort(key=lambda x: x["percent_change"])
-
-        result = results[:5] # Return top 5
         await market_cache.set(cache_key, result)
         return result
+    except upstream.UpstreamUnavailable as e:
+        print(f"Serving fallback data for Indian Movers ({mover_type}): {e}")
+        return await get_indian_movers_fallback(mover_type)
     except Exception as e:
         print(f"NSE Movers Error: {e}")
         return await get_indian_movers_fallback(mover_type)
 
-async def get_indian_movers_fallback(mover_type: str = "gainers"):
-    # Fallback using a predefined list of popular Indian stocks (Nifty 50 components)
-    symbols = [
-        "RELIANCE.NS", "TCS.NS", "HDFCBANK.NS", "ICICIBANK.NS", "INFY.NS", 
-        "HINDUNILVR.NS", "ITC.NS", "SBIN.NS", "BHARTIARTL.NS", "KOTAKBANK.NS",
-        "LT.NS", "AXISBANK.NS", "TATAMOTORS.NS", "MARUTI.NS", "SUNPHARMA.NS",
-        "BAJFINANCE.NS", "ASIANPAINT.NS", "HCLTECH.NS", "TITAN.NS", "M&M.NS"
-    ]
+def _parse_nse_movers(df, mover_type):
+    # nselib's top_gainers_or_losers typically returns a DataFrame.
+    # We need to see its columns. Usually 'symbol', 'ltp', 'pChange' etc.
     
-    movers = []
+    results = []
+    # Columns: symbol, series, open_price, high_price, low_price, ltp, prev_price, net_price, trade_quantity, turnover, market_type, ca_ex_dt, ca_purpose, perChange, legend
     
-    for symbol in symbols:
-        try:
-            ticker = await asyncio.to_thread(yf.Ticker, symbol)
-            # Use fast_info if available, it's generally more robust and lighter than .info
-            # fast_info provides: last_price, previous_close, etc.
-            try:
-                fast_info = await asyncio.to_thread(lambda: ticker.fast_info)
-                price = fast_info.last_price
-                prev_close = fast_info.previous_close
-                change = price - prev_close
-                percent_change = (change / prev_close) * 100
-                
-                # Fetch name from info if possible, otherwise use symbol
-                # We do this in a separate try/except so if info fails we still have price data
-                name = symbol
-                try:
-                    info = await asyncio.to_thread(lambda: ticker.info)
-                    name = info.get("shortName", symbol)
-                except:
-                    pass
-
-                movers.append({
-                    "symbol": symbol.replace(".NS", ""), # Remove .NS extension
-                    "name": name,
-                    "price": price,
-                    "change": change,
-                    "percent_change": percent_change,
-                    "currency": "INR"
-                })
-            except Exception:
-                # If fast_info fails, try regular info
-                info = await asyncio.to_thread(lambda: ticker.info)
-                change_percent = info.get("regularMarketChangePercent", 0) * 100
-                
-                movers.append({
-                    "symbol": symbol.replace(".NS", ""), # Remove .NS extension
-                    "name": info.get("shortName", symbol),
-                    "price": info.get("currentPrice", 0),
-                    "change": info.get("regularMarketChange", 0),
-                    "percent_change": change_percent,
-                    "currency": "INR"
-                })
+    for index, row in df.iterrows():
+        # Filter for gainers/losers manually if the API returns mixed or specific set
+        p_change = float(str(row['pChange']).replace(',', ''))
+        
+        if (mover_type == "gainers" and p_change > 0) or (mover_type == "losers" and p_change < 0):
+            results.append({
+                "symbol": f"{row['symbol']}.NS", # Append .NS for compatibility with yfinance details
+                "name": row['symbol'], # Use symbol as name if full name not available in this view
+                "price": float(str(row['ltp']).replace(',', '')),
+                "change": float(str(row['ltp']).replace(',', '')) - float(str(row['previousPrice']).replace(',', '')), 
+                "percent_change": p_change,
+                "currency": "INR"
+            })
 
-        except Exception as e:
-            # print(f"Fallback error for {symbol}: {e}")
-            continue
-    
-    # Filter and sort based on type
+    # Sort results
     if mover_type == "gainers":
-        filtered = [m for m in movers if m["percent_change"] > 0]
-        filtered.sort(key=lambda x: x["percent_change"], reverse=True)
-    else: # losers
-        filtered = [m for m in movers if m["percent_change"] < 0]
-        filtered.sort(key=lambda x: x["percent_change"]) # Most negative first
-        
-    return filtered[:5]
+        results.sort(key=lambda x: x["percent_change"], reverse=True)
+    else:
+        results.sort(key=lambda x: x["percent_change"])
+
+    return results[:MOVERS_COUNT]
+
+async def get_indian_movers_fallback(mover_type: str = "gainers"):
+    # Fallback using the Indian universe, popular Nifty 50 components by default
+    metrics.fallbacks.inc(endpoint="indian_movers", fallback="yfinance")
+    await _refresh_universe(indian_movers)
+    return indian_movers.top(mover_type, MOVERS_COUNT)
 
 async def get_sector_data(sector: str):
+    return await market_cache.get_or_fetch(f"sector_{sector}", lambda: _fetch_sector_data(sector))
+
+async def _fetch_sector_data(sector: str):
     cache_key = f"sector_{sector}"
-    cached_data = await market_cache.get(cache_key)
-    if cached_data:
-        return cached_data
-
-    # Predefined lists for requested sectors
-    sectors = {
-        "tech": ["AAPL", "MSFT", "NVDA", "ORCL", "ADBE"],
-        "health": ["UNH", "JNJ", "LLY", "MRK", "ABBV"],
-        "pharma": ["PFE", "BMY", "GILD", "AMGN", "BIIB"]
-    }
-    
-    symbols = sectors.get(sector, [])
-    results = []
-    
-    for symbol in symbols:
-        try:
-            ticker = await asyncio.to_thread(yf.Ticker, symbol)
-            info = await asyncio.to_thread(lambda: ticker.info)
-            results.append({
-                "symbol": symbol,
-                "name": info.get("shortName", symbol),
-                "price": info.get("currentPrice", 0),
-                "change": info.get("regularMarketChange", 0),
-                "percent_change": info.get("regularMarketChangePercent", 0) * 100
-            })
-        except Exception:
-            continue
-            
-    await market_cache.set(cache_key, results)
+
+    symbols = SECTORS.get(sector, [])
+    results = await _batch_rows(symbols)
+
+    if results or not symbols:
+        await market_cache.set(cache_key, results)
     return results
 
 async def get_indian_sector_data(sector: str):
+    return await market_cache.get_or_fetch(f"indian_sector_{sector}", lambda: _fetch_indian_sector_data(sector))
+
+async def _fetch_indian_sector_data(sector: str):
     cache_key = f"indian_sector_{sector}"
-    cached_data = await market_cache.get(cache_key)
-    if cached_data:
-        return cached_data
-
-    # Predefined lists for Indian sectors
-    sectors = {
-        "tech": ["INFY.NS", "TCS.NS", "HCLTECH.NS", "TECHM.NS", "WIPRO.NS"],
-        "health": ["APOLLOHOSP.NS", "MAXHEALTH.NS", "LALPATHLAB.NS", "SYNGENE.NS", "METROPOLIS.NS"],
-        "pharma": ["SUNPHARMA.NS", "DRREDDY.NS", "CIPLA.NS", "DIVISLAB.NS", "LUPIN.NS"]
-    }
-    
-    symbols = sectors.get(sector, [])
-    results = []
-    
+
+    symbols = INDIAN_SECTORS.get(sector, [])
+    results = await _batch_rows(symbols, currency="INR")
+
+    if results or not symbols:
+        await market_cache.set(cache_key, results)
+    return results
+
+# Precomputed dashboard views, built by the snapshot scheduler from one
+# batched quote fetch. Keys match the market_cache keys of the endpoints.
+
+def dashboard_symbols(region: str):
+    """Every yfinance symbol the region's dashboard needs."""
+    if region == "indian":
+        groups = [INDIAN_INDICES, indian_movers.symbols, *INDIAN_SECTORS.values()]
+    else:
+        groups = [GLOBAL_INDICES, global_movers.symbols, *SECTORS.values()]
+    return list(dict.fromkeys(symbol for group in groups for symbol in group))
+
+def _index_rows(symbols, quotes, names):
+    rows = []
     for symbol in symbols:
-        try:
-            ticker = await asyncio.to_thread(yf.Ticker, symbol)
-            info = await asyncio.to_thread(lambda: ticker.info)
-            results.append({
-                "symbol": symbol.replace(".NS", ""), # Remove .NS extension
-                "name": info.get("shortName", symbol),
-                "price": info.get("currentPrice", 0),
-                "change": info.get("regularMarketChange", 0),
-                "percent_change": info.get("regularMarketChangePercent", 0) * 100,
-                "currency": "INR"
-            })
-        except Exception:
+        quote = quotes.get(symbol)
+        if quote is None:
             continue
-            
-    await market_cache.set(cache_key, results)
-    return results
+        rows.append({
+            "symbol": _indian_index_symbol(symbol),
+            "name": names.get(symbol, symbol).replace("^", "").replace(".NS", ""),
+            "price": quote["price"],
+            "change": quote["change"],
+            "percent_change": quote["percent_change"],
+            "currency": "INR"
+        })
+    return rows
+
+async def _nse_snapshot_views():
+    """Indian overview and movers from nselib, {} for whatever NSE couldn't give."""
+    views = {}
+    try:
+        df = await upstream.nse.call(lambda: executors.nse.run(metrics.timed("nselib", "indices", capital_market.market_watch_all_indices)))
+        views["indian_overview"] = _parse_nse_indices(df)
+    except Exception as e:
+        print(f"Snapshot: NSE indices unavailable: {e}")
+    try:
+        df = await upstream.nse.call(lambda: executors.nse.run(metrics.timed("nselib", "movers", capital_market.top_gainers_or_losers)))
+        for mover_type in ["gainers", "losers"]:
+            rows = _parse_nse_movers(df, mover_type)
+            if rows:
+                views[f"indian_movers_{mover_type}"] = rows
+    except Exception as e:
+        print(f"Snapshot: NSE movers unavailable: {e}")
+    return views
+
+def _update_universe(universe, quotes, names):
+    # The snapshot pass quoted the whole universe, no separate refresh needed
+    universe.update_many(quotes)
+    universe.update_names(names)
+    universe.refreshed_at = time.time()
+
+async def build_views(region: str, quotes: dict, names: dict):
+    """{cache key: result} for every dashboard endpoint of the region."""
+    if region == "indian":
+        views = await _nse_snapshot_views()
+        overview = views.get("indian_overview")
+        if overview is None:
+            views["indian_overview"] = _index_rows(INDIAN_INDICES, quotes, names)
+        elif not any(r['symbol'] == 'SENSEX' for r in overview):
+            # SENSEX is BSE, nselib doesn't carry it
+            overview.extend(_index_rows(["^BSESN"], quotes, names))
+        _update_universe(indian_movers, quotes, names)
+        for mover_type in ["gainers", "losers"]:
+            views.setdefault(f"indian_movers_{mover_type}", indian_movers.top(mover_type, MOVERS_COUNT))
+        for sector, symbols in INDIAN_SECTORS.items():
+            views[f"indian_sector_{sector}"] = _rows(symbols, quotes, names, currency="INR")
+        return views
+
+    _update_universe(global_movers, quotes, names)
+    views = {
+        "global_overview": _rows(GLOBAL_INDICES, quotes, names),
+        "global_movers_gainers": global_movers.top("gainers", MOVERS_COUNT),
+        "global_movers_losers": global_movers.top("losers", MOVERS_COUNT),
+    }
+    for sector, symbols in SECTORS.items():
+        views[f"sector_{sector}"] = _rows(symbols, quotes, names)
+    return views
@@ -0,0 +1,196 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from api.services import cache, executors, upstream
+
+# Prometheus text-format metrics served at /metrics.
+#
+# Counters and histograms here are updated where things happen (requests,
+# upstream calls, fallbacks). Everything that already keeps its own stats -
+# caches, upstream guards, thread pools, quote strategies - is read by the
+# collectors registered with add_collector() at scrape time instead of being
+# counted twice. Upstream calls run on worker threads, so updates take a lock.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; upstream scrapes run from milliseconds (cache) to ~10s (timeouts)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Every Counter and Histogram registers itself here
+registry = []
+# Functions returning [(name, type, help, [(labels, value)])] at scrape time
+collectors = []
+
+def _labels(labels: dict):
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in labels.items()
+    )
+    return "{" + pairs + "}"
+
+def _value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values = {} # label values tuple -> count
+        self.lock = threading.Lock()
+        registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            items = sorted(self.values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_labels(dict(zip(self.labelnames, key)))} {_value(value)}")
+        return lines
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.bounds = tuple(sorted(buckets)) + (float("inf"),)
+        self.counts = {} # label values tuple -> per-bucket (not cumulative) counts
+        self.sums = {}
+        self.lock = threading.Lock()
+        registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self.lock:
+            counts = self.counts.get(key)
+            if counts is None:
+                counts = self.counts[key] = [0] * len(self.bounds)
+                self.sums[key] = 0.0
+            counts[bisect.bisect_left(self.bounds, value)] += 1
+            self.sums[key] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            items = sorted((key, list(counts), self.sums[key]) for key, counts in self.counts.items())
+        for key, counts, total in items:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.bounds, counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels({**labels, 'le': _value(bound)})} {cumulative}")
+            lines.append(f"{self.name}_count{_labels(labels)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(labels)} {_value(total)}")
+        return lines
+
+def add_collector(fn):
+    collectors.append(fn)
+    return fn
+
+request_latency = Histogram(
+    "http_request_duration_seconds", "Time to answer a request, by route template.", ("method", "route", "status"),
+)
+upstream_latency = Histogram(
+    "upstream_request_duration_seconds", "Latency of calls to data sources, successful or not.", ("source", "operation"),
+)
+upstream_errors = Counter(
+    "upstream_errors_total", "Calls to data sources that raised.", ("source", "operation"),
+)
+fallbacks = Counter(
+    "fallbacks_total", "Responses served from a fallback instead of the primary source.", ("endpoint", "fallback"),
+)
+
+@contextmanager
+def track(source, operation):
+    """Time the block as one call to source; exceptions count as errors."""
+    started = time.perf_counter()
+    try:
+        yield
+    # CancelledError isn't an Exception: a cancelled call (hedge loser,
+    # client gone) says nothing about the source and isn't recorded
+    except Exception:
+        upstream_latency.observe(time.perf_counter() - started, source=source, operation=operation)
+        upstream_errors.inc(source=source, operation=operation)
+        raise
+    upstream_latency.observe(time.perf_counter() - started, source=source, operation=operation)
+
+def timed(source, operation, fn):
+    """fn wrapped in track(), for calls handed to a thread pool."""
+    def call(*args, **kwargs):
+        with track(source, operation):
+            return fn(*args, **kwargs)
+    return call
+
+@add_collector
+def _cache_metrics():
+    counters = [
+        ("hits", "Fresh cache hits."),
+        ("stale_hits", "Stale entries served while a refresh runs."),
+        ("misses", "Cache misses."),
+        ("evictions", "Entries evicted to stay within bounds."),
+        ("expirations", "Entries dropped past their hard TTL."),
+        ("l2_hits", "Hits in the shared backend."),
+        ("l2_misses", "Misses in the shared backend."),
+    ]
+    stats = [c.stats() for c in cache.registry]
+    families = [
+        (f"cache_{field}_total", "counter", help, [({"cache": s["name"]}, s[field]) for s in stats])
+        for field, help in counters
+    ]
+    families.append(("cache_entries", "gauge", "Entries held in memory.", [({"cache": s["name"]}, s["entries"]) for s in stats]))
+    families.append(("cache_bytes", "gauge", "Approximate bytes held in memory.", [({"cache": s["name"]}, s["bytes"]) for s in stats]))
+    return families
+
+@add_collector
+def _upstream_metrics():
+    stats = [u.stats() for u in upstream.registry]
+    states = ("closed", "open", "half_open")
+    return [
+        ("upstream_guard_calls_total", "counter", "Calls let through the rate limiter and circuit breaker.",
+         [({"upstream": s["name"]}, s["calls"]) for s in stats]),
+        ("upstream_guard_failures_total", "counter", "Guarded calls that failed.",
+         [({"upstream": s["name"]}, s["failures"]) for s in stats]),
+        ("upstream_guard_request_errors_total", "counter", "Guarded calls that failed because of the request (unknown symbol, 4xx).",
+         [({"upstream": s["name"]}, s["request_errors"]) for s in stats]),
+        ("upstream_guard_cancelled_total", "counter", "Guarded calls cancelled by their caller (hedged race losers).",
+         [({"upstream": s["name"]}, s["cancelled"]) for s in stats]),
+        ("upstream_rate_limited_total", "counter", "Calls refused by the rate limiter.",
+         [({"upstream": s["name"]}, s["rate_limited"]) for s in stats]),
+        ("upstream_short_circuited_total", "counter", "Calls refused by an open circuit.",
+         [({"upstream": s["name"]}, s["short_circuited"]) for s in stats]),
+        ("upstream_circuit_state", "gauge", "1 for the circuit's current state.",
+         [({"upstream": s["name"], "state": state}, int(s["state"] == state)) for s in stats for state in states]),
+    ]
+
+@add_collector
+def _executor_metrics():
+    stats = [e.stats() for e in executors.registry]
+    return [
+        ("executor_queued", "gauge", "Jobs waiting for a worker thread.", [({"pool": s["name"]}, s["queued"]) for s in stats]),
+        ("executor_running", "gauge", "Jobs running on a worker thread.", [({"pool": s["name"]}, s["running"]) for s in stats]),
+        ("executor_max_workers", "gauge", "Worker threads in the pool.", [({"pool": s["name"]}, s["max_workers"]) for s in stats]),
+        ("executor_rejected_total", "counter", "Jobs shed because the queue was full.", [({"pool": s["name"]}, s["rejected"]) for s in stats]),
+        ("executor_completed_total", "counter", "Jobs that finished.", [({"pool": s["name"]}, s["completed"] + s["failed"]) for s in stats]),
+    ]
+
+def render():
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    for collect in collectors:
+        for name, kind, help, samples in collect():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_labels(labels)} {_value(value)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,94 @@
+import numpy as np
+
+# Live movers universes.
+# Each universe keeps the latest price, change and percent change of its
+# symbols in numpy arrays. Quote fetches anywhere in the app feed it through
+# observe(), and top gainers/losers are answered from that one shared state
+# with a partial selection (argpartition), so asking for the top N costs
+# O(universe) instead of building, filtering and sorting a dict per symbol.
+
+# Every MoversUniverse registers itself here so observe() can feed it
+registry = []
+
+def load_symbols(path: str):
+    """Symbols from a text file, one per line; blank lines and # comments are skipped."""
+    with open(path) as f:
+        lines = (line.split("#", 1)[0].strip() for line in f)
+        return [line for line in lines if line]
+
+class MoversUniverse:
+    def __init__(self, name, symbols, currency=None):
+        self.name = name
+        self.symbols = list(dict.fromkeys(symbols))
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.currency = currency
+        # Row symbols as the API shows them
+        self.display = [symbol.replace(".NS", "") for symbol in self.symbols]
+        self.names = list(self.symbols)
+        size = len(self.symbols)
+        self.price = np.full(size, np.nan)
+        self.change = np.full(size, np.nan)
+        self.percent = np.full(size, np.nan) # NaN until the symbol is first quoted
+        self.updates = 0
+        self.refreshed_at = 0.0 # last full refresh of the universe
+        registry.append(self)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def update(self, symbol, quote):
+        i = self.index.get(symbol)
+        if i is None:
+            return
+        self.price[i] = quote["price"]
+        self.change[i] = quote["change"]
+        self.percent[i] = quote["percent_change"]
+        self.updates += 1
+
+    def update_many(self, quotes: dict):
+        for symbol, quote in quotes.items():
+            self.update(symbol, quote)
+
+    def update_names(self, names: dict):
+        for symbol, name in names.items():
+            i = self.index.get(symbol)
+            if i is not None:
+                self.names[i] = name
+
+    def quoted(self):
+        """How many symbols have a quote."""
+        return int(np.count_nonzero(~np.isnan(self.percent)))
+
+    def _row(self, i):
+        row = {
+            "symbol": self.display[i],
+            "name": self.names[i],
+            "price": float(self.price[i]),
+            "change": float(self.change[i]),
+            "percent_change": float(self.percent[i]),
+        }
+        if self.currency:
+            row["currency"] = self.currency
+        return row
+
+    def top(self, mover_type: str, count: int = 5):
+        """Top count gainers (biggest rise first) or losers (biggest fall first)."""
+        if count <= 0:
+            return []
+        # Gainers are ranked on -percent so both cases pick the smallest keys;
+        # NaN compares false, so unquoted symbols drop out here
+        keys = -self.percent if mover_type == "gainers" else self.percent
+        candidates = np.flatnonzero(keys < 0)
+        if len(candidates) > count:
+            picked = np.argpartition(keys[candidates], count - 1)[:count]
+            candidates = candidates[picked]
+        order = candidates[np.argsort(keys[candidates], kind="stable")]
+        return [self._row(i) for i in order]
+
+    def stats(self):
+        return {"name": self.name, "symbols": len(self), "quoted": self.quoted(), "updates": self.updates}
+
+def observe(quotes: dict):
+    """Feed freshly fetched {yfinance symbol: quote} into every universe."""
+    for universe in registry:
+        universe.update_many(quotes)
@@ -0,0 +1,42 @@
+import asyncio
+
+# Request coalescing: concurrent callers asking for the same key while a
+# fetch is in flight all await that one fetch instead of starting their own.
+class SingleFlight:
+    def __init__(self, name):
+        self.name = name
+        self.inflight = {}
+        self.calls = 0 # every do() call
+        self.executions = 0 # calls that actually ran fn
+        self.coalesced = 0 # calls that joined an in-flight fetch
+
+    async def do(self, key, fn):
+        """Run fn() for key, or join the call already in flight for it."""
+        self.calls += 1
+        task = self.inflight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(fn())
+            self.inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            self.coalesced += 1
+
+        # Shield so one caller going away doesn't cancel the fetch for the rest
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        if self.inflight.get(key) is task:
+            del self.inflight[key]
+        # Mark the exception as retrieved if every caller went away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "inflight": len(self.inflight),
+        }
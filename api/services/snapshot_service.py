@@ -0,0 +1,125 @@
+import asyncio
+import os
+import time
+from datetime import datetime, time as clock, timezone
+from types import MappingProxyType
+from zoneinfo import ZoneInfo
+from api.services import batch_quotes, market_service, movers
+
+# Precomputed market dashboard snapshot.
+# A background task started in the app lifespan refreshes every dashboard
+# view in one batched pass over the union of their symbols, then publishes a
+# new read-only snapshot by swapping a single reference. Routers read it in
+# O(1); the lazy per-endpoint computation is only used until the first pass
+# lands or when a region's snapshot has gone stale.
+#
+# Refreshes follow market hours: a region is refreshed every
+# SNAPSHOT_INTERVAL_OPEN seconds while its exchange is open and every
+# SNAPSHOT_INTERVAL_CLOSED seconds otherwise. Exchange holidays are not
+# known, those days just refresh on the open schedule.
+
+SNAPSHOT_SCHEDULER = os.getenv("SNAPSHOT_SCHEDULER", "1") == "1"
+INTERVAL_OPEN = float(os.getenv("SNAPSHOT_INTERVAL_OPEN", "60"))
+INTERVAL_CLOSED = float(os.getenv("SNAPSHOT_INTERVAL_CLOSED", "900"))
+# Snapshots older than this are not served, the endpoints compute lazily
+MAX_AGE = float(os.getenv("SNAPSHOT_MAX_AGE", str(2 * INTERVAL_CLOSED)))
+# Retry delay for a region whose last pass failed
+RETRY_INTERVAL = 30
+TICK = 5 # seconds between schedule checks
+
+# Region -> (exchange timezone, open, close)
+MARKET_HOURS = {
+    "global": (ZoneInfo("America/New_York"), clock(9, 30), clock(16, 0)),
+    "indian": (ZoneInfo("Asia/Kolkata"), clock(9, 15), clock(15, 30)),
+}
+
+def is_market_open(region: str, now: datetime = None):
+    tz, opens, closes = MARKET_HOURS[region]
+    local = (now or datetime.now(tz)).astimezone(tz)
+    return local.weekday() < 5 and opens <= local.time() < closes
+
+def refresh_interval(region: str, now: datetime = None):
+    return INTERVAL_OPEN if is_market_open(region, now) else INTERVAL_CLOSED
+
+# The published snapshot: {cache key: view} plus when each region was built.
+# Never mutated once published, a refresh builds and swaps in a new one.
+_views = MappingProxyType({})
+_generated_at = MappingProxyType({})
+_last_attempt = {} # region -> time of the last refresh attempt
+passes = 0
+failures = 0
+
+def get(key: str):
+    """The published view for key, or None if missing or too old."""
+    region = "indian" if key.startswith("indian_") else "global"
+    generated_at = _generated_at.get(region)
+    if generated_at is None or time.time() - generated_at >= MAX_AGE:
+        return None
+    return _views.get(key)
+
+def due_regions(now: float = None):
+    now = now or time.time()
+    due = []
+    for region in MARKET_HOURS:
+        interval = refresh_interval(region, datetime.fromtimestamp(now, timezone.utc))
+        attempted = _last_attempt.get(region, 0)
+        if _generated_at.get(region, 0) < attempted:
+            # Last pass failed, retry sooner than the normal schedule
+            interval = min(interval, RETRY_INTERVAL)
+        if now - attempted >= interval:
+            due.append(region)
+    return due
+
+async def refresh(regions):
+    """Rebuild the views of regions from one batched fetch and publish them."""
+    global _views, _generated_at, passes
+    started = time.time()
+    for region in regions:
+        _last_attempt[region] = started
+    symbols = list(dict.fromkeys(
+        symbol for region in regions for symbol in market_service.dashboard_symbols(region)
+    ))
+    quotes, names = await asyncio.gather(
+        batch_quotes.get_quotes(symbols),
+        batch_quotes.get_names(symbols),
+    )
+
+    views = dict(_views)
+    generated_at = dict(_generated_at)
+    for region in regions:
+        if not any(symbol in quotes for symbol in market_service.dashboard_symbols(region)):
+            # Upstream gave us nothing, keep serving the previous snapshot
+            print(f"Snapshot: no quotes for {region}, keeping previous snapshot")
+            continue
+        region_views = await market_service.build_views(region, quotes, names)
+        views.update(region_views)
+        generated_at[region] = started
+        # Lazy endpoint requests share the same results
+        await market_service.market_cache.set_many(region_views)
+
+    _views = MappingProxyType(views)
+    _generated_at = MappingProxyType(generated_at)
+    passes += 1
+
+async def run_scheduler():
+    global failures
+    while True:
+        regions = due_regions()
+        if regions:
+            try:
+                await refresh(regions)
+            except Exception as e:
+                failures += 1
+                print(f"Snapshot refresh failed: {e}")
+        await asyncio.sleep(TICK)
+
+def stats():
+    now = time.time()
+    return {
+        "passes": passes,
+        "failures": failures,
+        "views": len(_views),
+        "age": {region: now - generated_at for region, generated_at in _generated_at.items()},
+        "market_open": {region: is_market_open(region) for region in MARKET_HOURS},
+        "movers": [universe.stats() for universe in movers.registry],
+    }
@@ -0,0 +1,131 @@
+import asyncio
+import importlib
+import os
+import time
+
+# Cold start cost.
+# The host spins the service down when idle, so every boot has a user
+# waiting on it. Heavy third-party modules (yfinance, nselib, bs4, scipy,
+# pandas) are not imported with the app: services hold lazy_import() proxies
+# that import the real module on first attribute access. Once the server is
+# accepting connections, warm_up() runs the functions registered with
+# add_warmup() and imports them on a background thread, so the first real
+# requests rarely pay for either.
+#
+# report() has the time spent before the app was imported, importing it,
+# in the lifespan startup, per module and warmer, and until the first
+# response went out.
+
+# Set STARTUP_WARMUP=0 to leave everything to first use
+WARMUP = os.getenv("STARTUP_WARMUP", "1") == "1"
+
+def _process_age():
+    """Seconds since this process started, None where /proc isn't available."""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except Exception:
+        return None
+
+# Interpreter and server startup before the app was first imported
+_before_app = _process_age()
+_started = time.perf_counter()
+_last_mark = _started
+
+phases = {} # phase -> seconds
+imports = {} # module -> seconds its first import took
+warmers = {} # name -> seconds
+first_response = None # seconds since the app was imported
+warmed = False
+
+# name -> LazyModule
+lazy_modules = {}
+# Functions run by warm_up() before the lazy modules are imported
+_warmups = []
+
+class LazyModule:
+    """Stands in for a module and imports it on first attribute access."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            # The import system's module locks make concurrent first uses
+            # wait for a single import
+            started = time.perf_counter()
+            module = importlib.import_module(self._name)
+            imports.setdefault(self._name, time.perf_counter() - started)
+            self._module = module
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+def lazy_import(name):
+    """Proxy for module name, imported on first use or by warm_up()."""
+    module = lazy_modules.get(name)
+    if module is None:
+        module = lazy_modules[name] = LazyModule(name)
+    return module
+
+def add_warmup(fn):
+    _warmups.append(fn)
+    return fn
+
+def mark(phase):
+    """Record phase as finished now, timed from the end of the previous one."""
+    global _last_mark
+    now = time.perf_counter()
+    phases[phase] = now - _last_mark
+    _last_mark = now
+
+def response_sent():
+    global first_response
+    if first_response is None:
+        first_response = time.perf_counter() - _started
+
+def _warm():
+    # Cheap and needed by the first requests, so ahead of the imports
+    for fn in _warmups:
+        name = f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+        started = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            print(f"Warm-up {name} failed: {e}")
+        warmers[name] = time.perf_counter() - started
+    for module in list(lazy_modules.values()):
+        try:
+            module._load()
+        except Exception as e:
+            print(f"Warm-up import of {module._name} failed: {e}")
+
+async def warm_up():
+    """Import the lazy modules and run the warmers off the event loop."""
+    global warmed
+    started = time.perf_counter()
+    await asyncio.to_thread(_warm)
+    phases["warmup"] = time.perf_counter() - started
+    warmed = True
+    print(f"Warm-up finished in {phases['warmup']:.2f}s")
+
+def report():
+    ms = lambda seconds: round(seconds * 1000, 1) if seconds is not None else None
+    return {
+        "before_app_ms": ms(_before_app),
+        "phases_ms": {phase: ms(seconds) for phase, seconds in phases.items()},
+        "imports_ms": {name: ms(seconds) for name, seconds in imports.items()},
+        "warmers_ms": {name: ms(seconds) for name, seconds in warmers.items()},
+        "pending_imports": [name for name, module in lazy_modules.items() if module._module is None],
+        "warmed": warmed,
+        "first_response_ms": ms(first_response),
+    }
@@ -1,40 +1,117 @@
-import yfinance as yf
-import pandas as pd
 import asyncio
-import requests
 import os
 import random
-import time
-from datetime import datetime
-from fake_useragent import UserAgent
-from nselib import capital_market
-from bs4 import BeautifulSoup
-
-# Initialize UserAgent rotator
-ua = UserAgent()
-
-# Simple in-memory cache for quotes to prevent spamming
-# Structure: {symbol: (data, timestamp)}
-quote_cache = {}
+from api.services import batch_quotes, bhavcopy, executors, history_codec, history_store, http_client, indicators, metrics, movers, snapshot_service, startup, symbol_index, upstream
+from api.services.fetcher import fetch_all
+from api.services.cache import AsyncCache
+
+pd = startup.lazy_import("pandas")
+yf = startup.lazy_import("yfinance")
+capital_market = startup.lazy_import("nselib.capital_market")
+bs4 = startup.lazy_import("bs4")
+
+# Browser User-Agents rotated across scrapes. Bundled rather than fetched so
+# nothing is downloaded or read from disk at startup.
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/128.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36 Edg/129.0.0.0",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:131.0) Gecko/20100101 Firefox/131.0",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:130.0) Gecko/20100101 Firefox/130.0",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.6 Safari/605.1.15",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:131.0) Gecko/20100101 Firefox/131.0",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:131.0) Gecko/20100101 Firefox/131.0",
+]
+
+# In-memory cache for quotes to prevent spamming.
+# Quotes are fresh for CACHE_TTL; up to QUOTE_STALE_TTL the stale quote is served
+# instantly while a background refresh runs, and hot symbols refresh ahead of expiry.
+# Concurrent misses for the same symbol share one upstream fetch.
 CACHE_TTL = 60 # seconds
+QUOTE_STALE_TTL = int(os.getenv("QUOTE_STALE_TTL", "900"))
+# The cache is keyed by user-supplied symbols, so it is bounded by entry count and size.
+quote_cache = AsyncCache(
+    ttl_seconds=CACHE_TTL,
+    stale_ttl_seconds=QUOTE_STALE_TTL,
+    refresh_ahead=0.8,
+    max_entries=int(os.getenv("QUOTE_CACHE_MAX_ENTRIES", "5000")),
+    max_bytes=int(os.getenv("QUOTE_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+    name="quote_cache",
+)
+
+# Google Finance quotes only have price and name, so they never go in
+# quote_cache; they are kept just long enough to spare Google during an outage
+# of the full-data sources
+DEGRADED_QUOTE_TTL = int(os.getenv("DEGRADED_QUOTE_TTL", "10"))
+degraded_quote_cache = AsyncCache(ttl_seconds=DEGRADED_QUOTE_TTL, max_entries=1000, name="degraded_quote_cache", shared=False)
+
+# Results per search
+SEARCH_LIMIT = 10
+# Yahoo search results for queries the local symbol index couldn't answer
+search_cache = AsyncCache(ttl_seconds=int(os.getenv("SEARCH_CACHE_TTL", "86400")), max_entries=2000, name="search_cache")
+
+# Max symbols accepted by the batch quote endpoint
+MAX_BATCH_SYMBOLS = 300
+
+# Index names used by the frontend mapped to their yfinance tickers
+INDEX_SYMBOLS = {
+    "NIFTY 50": "^NSEI",
+    "NIFTY BANK": "^NSEBANK",
+    "NIFTY IT": "^CNXIT",
+    "NIFTY NEXT 50": "^NSMIDCP",
+    "SENSEX": "^BSESN",
+}
+
+# Bare NSE symbols we treat as Indian even without the .NS suffix
+INDIAN_SYMBOLS = ["RELIANCE", "TCS", "INFY", "HDFCBANK", "ICICIBANK", "HINDUNILVR", "ITC", "SBIN", "BHARTIARTL", "APOLLOHOSP"]
+
+def is_indian_symbol(symbol: str):
+    return symbol.endswith('.NS') or symbol in INDIAN_SYMBOLS
+
+def to_yfinance_symbol(symbol: str):
+    if symbol in INDEX_SYMBOLS:
+        return INDEX_SYMBOLS[symbol]
+    if symbol in INDIAN_SYMBOLS:
+        return f"{symbol}.NS"
+    return symbol
 
 # Helper to get a random User-Agent
 def get_random_headers():
     return {
-        'User-Agent': ua.random,
+        'User-Agent': random.choice(USER_AGENTS),
         'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
         'Accept-Language': 'en-US,en;q=0.5',
         'Connection': 'keep-alive',
         'Upgrade-Insecure-Requests': '1',
     }
 
+def search_key(query: str):
+    return " ".join(query.lower().split())
+
 async def search_stocks(query: str):
+    # Answer from the local symbol index, Yahoo is only asked on a miss
+    results = symbol_index.get_index().search(query, limit=SEARCH_LIMIT)
+    if results:
+        return results
+    key = search_key(query)
+    if not key:
+        return []
+    return await search_cache.get_or_fetch(key, lambda: _search_yahoo(key))
+
+async def _search_yahoo(query: str):
     # Use Yahoo Finance auto-complete API
-    url = f"https://query2.finance.yahoo.com/v1/finance/search?q={query}&quotesCount=10&newsCount=0"
+    url = "https://query2.finance.yahoo.com/v1/finance/search"
+    params = {"q": query, "quotesCount": SEARCH_LIMIT, "newsCount": 0}
     headers = get_random_headers()
     
     try:
-        response = await asyncio.to_thread(requests.get, url, headers=headers, timeout=5)
+        async def fetch():
+            with metrics.track("yahoo", "search"):
+                return await http_client.get_client().get(url, params=params, headers=headers, timeout=5)
+
+        response = await upstream.yahoo.call(fetch)
         data = response.json()
         
         results = []
@@ -48,11 +125,33 @@ async def search_stocks(query: str):
                         "type": quote.get('quoteType'),
                         "exchange": quote.get('exchange')
                     })
+        await search_cache.set(query, results)
+        # Later keystrokes for these symbols are answered locally
+        symbol_index.get_index().add(results)
         return results
     except Exception as e:
         print(f"Search error: {e}")
         return []
 
+def _parse_google_finance_page(html: str):
+    soup = bs4.BeautifulSoup(html, 'html.parser')
+    
+    # Selectors for Google Finance (class names change, but structure is somewhat stable)
+    # We look for the main price element
+    # Common class for price: "YMlKec fxKbKc"
+    price_div = soup.find("div", class_="YMlKec fxKbKc")
+    if not price_div:
+         return None
+         
+    price_text = price_div.text.replace("₹", "").replace("$", "").replace(",", "")
+    price = float(price_text)
+    
+    # Change is usually in a span next to it
+    # We can try to calculate change if we can find previous close, or just scrape it
+    # This is basic scraping, extracting name and price is prioritized
+    name_h1 = soup.find("h1", class_="zzDege")
+    return price, name_h1.text if name_h1 else None
+
 async def get_google_finance_quote(symbol: str):
     """Scrape quote from Google Finance as a strong fallback"""
     try:
@@ -68,34 +167,30 @@ async def get_google_finance_quote(symbol: str):
         url = f"https://www.google.com/finance/quote/{clean_symbol}:{exchange}"
         
         headers = get_random_headers()
-        response = await asyncio.to_thread(requests.get, url, headers=headers, timeout=5)
-        
-        if response.status_code != 200:
-            # Try BSE if NSE failed (for Indian context)
-            if exchange == "NSE":
-                url = f"https://www.google.com/finance/quote/{clean_symbol}:BSE"
-                response = await asyncio.to_thread(requests.get, url, headers=headers, timeout=5)
+        client = http_client.get_client()
+
+        async def fetch():
+            with metrics.track("google", "scrape"):
+                response = await client.get(url, headers=headers, timeout=5)
+                if response.status_code != 200 and exchange == "NSE":
+                    # Try BSE if NSE failed (for Indian context)
+                    response = await client.get(f"https://www.google.com/finance/quote/{clean_symbol}:BSE", headers=headers, timeout=5)
+                if response.status_code in (429, 503):
+                    # Google is throttling us, count it against the circuit
+                    response.raise_for_status()
+                return response
+
+        response = await upstream.google.call(fetch)
         
         if response.status_code != 200:
             return None
 
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Selectors for Google Finance (class names change, but structure is somewhat stable)
-        # We look for the main price element
-        # Common class for price: "YMlKec fxKbKc"
-        price_div = soup.find("div", class_="YMlKec fxKbKc")
-        if not price_div:
+        # Parsing is CPU bound, keep it off the event loop and the upstream pools
+        parsed = await executors.parse.run(_parse_google_finance_page, response.text)
+        if not parsed:
              return None
-             
-        price_text = price_div.text.replace("₹", "").replace("$", "").replace(",", "")
-        price = float(price_text)
-        
-        # Change is usually in a span next to it
-        # We can try to calculate change if we can find previous close, or just scrape it
-        # This is basic scraping, extracting name and price is prioritized
-        name_h1 = soup.find("h1", class_="zzDege")
-        name = name_h1.text if name_h1 else symbol
+        price, name = parsed
+        name = name or symbol
         
         return {
             "symbol": symbol,
@@ -129,7 +224,12 @@ async def get_nselib_quote(symbol: str):
         
         # Use price_volume_and_deliverable_position_data which is lighter than equity_list
         # Note: nselib can be slow as it scrapes the NSE site
-        data = await asyncio.to_thread(capital_market.price_volume_and_deliverable_position_data, symbol=clean_symbol, period='1M')
+        # Wrapped in a timeout since it can hang
+        data = await upstream.nse.call(
+            lambda: executors.nse.run(metrics.timed("nselib", "quote", capital_market.price_volume_and_deliverable_position_data), symbol=clean_symbol, period='1M'),
+            timeout=5.0,
+            operation="quote",
+        )
         
         if data is None or data.empty:
              return None
@@ -163,155 +263,355 @@ async def get_nselib_quote(symbol: str):
             "type": "EQUITY",
             "market_state": "REGULAR", # Assume regular if we got data
         }
+    except upstream.UpstreamUnavailable as e:
+        print(f"Skipping NSE Lib for {symbol}: {e}")
+        return None
+    except asyncio.TimeoutError:
+        print(f"NSE Lib timeout for {symbol}")
+        return None
     except Exception as e:
         print(f"NSE Lib error for {symbol}: {e}")
         return None
 
 async def get_quote(symbol: str):
-    # Check cache first
-    if symbol in quote_cache:
-        data, timestamp = quote_cache[symbol]
-        if time.time() - timestamp < CACHE_TTL:
-            return data
+    return await quote_cache.get_or_fetch(symbol, lambda: _fetch_quote(symbol))
 
-    # Handle NIFTY indices mapping
-    yfinance_symbol = symbol
-    if symbol == "NIFTY 50":
-        yfinance_symbol = "^NSEI"
-    elif symbol == "NIFTY BANK":
-        yfinance_symbol = "^NSEBANK"
-    elif symbol == "NIFTY IT":
-        yfinance_symbol = "^CNXIT"
-    elif symbol == "NIFTY NEXT 50":
-        yfinance_symbol = "^NSMIDCP"
-    
-    # Strategy 1: Try nselib first for Indian stocks
-    is_indian = symbol.endswith('.NS') or symbol in ["RELIANCE", "TCS", "INFY", "HDFCBANK", "ICICIBANK", "HINDUNILVR", "ITC", "SBIN", "BHARTIARTL", "APOLLOHOSP"]
+async def refresh_quote(symbol: str, max_age: float):
+    """Return a quote no older than max_age seconds, fetching it if needed."""
+    cached = await quote_cache.get(symbol, max_age=max_age)
+    if cached:
+        return cached
+    return await quote_cache.fetch(symbol, lambda: _fetch_quote(symbol))
+
+async def _yfinance_quote(symbol: str, yfinance_symbol: str):
+    ticker = await executors.yahoo.run(yf.Ticker, yfinance_symbol)
     
-    if is_indian:
-        nse_symbol = symbol.replace('.NS', '')
+    # Try fast_info first
+    try:
+        fast_info = ticker.fast_info
+        # fast_info loads lazily, the first attribute read is the network call
+        price = await executors.yahoo.run(metrics.timed("yfinance", "fast_info", lambda: fast_info.last_price))
+        
         try:
-            # Wrap nselib call with timeout since it can hang
-            quote = await asyncio.wait_for(get_nselib_quote(nse_symbol), timeout=5.0)
-            if quote:
-                quote_cache[symbol] = (quote, time.time())
-                return quote
-        except asyncio.TimeoutError:
-            print(f"NSE Lib timeout for {symbol}")
-        except Exception as e:
-            print(f"NSE Lib error for {symbol}: {e}")
-            
+             info = await executors.yahoo.run(metrics.timed("yfinance", "info", lambda: ticker.info))
+        except:
+             info = {
+                 "shortName": symbol,
+                 "currentPrice": price,
+                 "regularMarketChange": price - fast_info.previous_close,
+                 "regularMarketChangePercent": (price - fast_info.previous_close) / fast_info.previous_close,
+                 "volume": fast_info.last_volume,
+                 "dayHigh": fast_info.day_high,
+                 "dayLow": fast_info.day_low,
+                 "open": fast_info.open,
+                 "previousClose": fast_info.previous_close,
+                 "currency": fast_info.currency,
+                 "exchange": fast_info.exchange,
+                 "quoteType": fast_info.quote_type,
+             }
+    except:
+         info = await executors.yahoo.run(metrics.timed("yfinance", "info", lambda: ticker.info))
+
+    return {
+        "symbol": symbol,
+        "name": info.get("shortName", symbol),
+        "price": info.get("currentPrice", info.get("regularMarketPrice", 0)),
+        "change": info.get("regularMarketChange", 0),
+        "percent_change": info.get("regularMarketChangePercent", 0) * 100,
+        "volume": info.get("volume", 0),
+        "market_cap": info.get("marketCap", 0),
+        "pe_ratio": info.get("trailingPE", None),
+        "eps": info.get("trailingEps", None),
+        "day_high": info.get("dayHigh", 0),
+        "day_low": info.get("dayLow", 0),
+        "open": info.get("open", 0),
+        "previous_close": info.get("previousClose", 0),
+        "currency": info.get("currency", "USD"),
+        "exchange": info.get("exchange", "UNKNOWN"),
+        "timezone": info.get("exchangeTimezoneName", "UTC"),
+        "type": info.get("quoteType", "EQUITY"),
+        "market_state": info.get("marketState", "CLOSED"),
+    }
+
+# Hedged quote fetching: strategies are tried in order of observed cost, and
+# once the running one passes its usual latency (QUOTE_HEDGE_PERCENTILE of its
+# recent quote calls, see upstream) the next one is started alongside it. The
+# first valid quote wins and the slower strategies are cancelled. Only
+# full-data sources race; Google is asked once all of them have failed.
+QUOTE_HEDGING = os.getenv("QUOTE_HEDGING", "1") == "1"
+QUOTE_HEDGE_PERCENTILE = float(os.getenv("QUOTE_HEDGE_PERCENTILE", "95"))
+# Hedge delay used until a source has enough latency samples
+QUOTE_HEDGE_DEFAULT_DELAY = float(os.getenv("QUOTE_HEDGE_DEFAULT_DELAY", "1.0"))
+QUOTE_HEDGE_MIN_DELAY = 0.05
+# yfinance has no timeout of its own
+YFINANCE_QUOTE_TIMEOUT = float(os.getenv("YFINANCE_QUOTE_TIMEOUT", "10"))
+
+quote_strategy_stats = {"races": 0, "hedges": 0, "wins": {}}
+
+@metrics.add_collector
+def _quote_strategy_metrics():
+    return [
+        ("quote_races_total", "counter", "Quote fetches raced across strategies.", [({}, quote_strategy_stats["races"])]),
+        ("quote_hedges_total", "counter", "Backup strategies started because the first was slow.", [({}, quote_strategy_stats["hedges"])]),
+        ("quote_strategy_wins_total", "counter", "Quotes answered, by strategy (google only once the others failed).",
+         [({"strategy": name}, wins) for name, wins in quote_strategy_stats["wins"].items()]),
+    ]
+
+async def _yfinance_strategy(symbol: str, yfinance_symbol: str):
+    return await upstream.yahoo.call(lambda: _yfinance_quote(symbol, yfinance_symbol), timeout=YFINANCE_QUOTE_TIMEOUT, operation="quote")
+
+def _quote_strategies(symbol: str):
+    """[(name, guard, start)] for symbol, most promising first."""
+    # Handle NIFTY indices mapping
+    yfinance_symbol = INDEX_SYMBOLS.get(symbol, symbol)
+    strategies = []
+
+    if is_indian_symbol(symbol):
+        nse_symbol = symbol.replace('.NS', '')
+        strategies.append(("nse", upstream.nse, lambda: get_nselib_quote(nse_symbol)))
         if not symbol.endswith('.NS') and not symbol.startswith('^'):
              yfinance_symbol = f"{symbol}.NS"
 
-    # Strategy 2: Try yfinance
+    strategies.append(("yahoo", upstream.yahoo, lambda: _yfinance_strategy(symbol, yfinance_symbol)))
+    # Sources with an open circuit go last, then cheapest expected answer first
+    strategies.sort(key=lambda s: (not s[1].available(), s[1].expected_cost(QUOTE_HEDGE_DEFAULT_DELAY, "quote")))
+    return strategies
+
+def _hedge_delay(guard):
+    delay = guard.latency_percentile(QUOTE_HEDGE_PERCENTILE, QUOTE_HEDGE_DEFAULT_DELAY, "quote")
+    return max(delay, QUOTE_HEDGE_MIN_DELAY)
+
+async def _race_strategies(symbol: str, strategies):
+    quote_strategy_stats["races"] += 1
+    remaining = list(strategies)
+    running = {} # task -> strategy name
+    error = None
     try:
-        ticker = await asyncio.to_thread(yf.Ticker, yfinance_symbol)
-        
-        # Try fast_info first
-        try:
-            fast_info = await asyncio.to_thread(lambda: ticker.fast_info)
-            price = fast_info.last_price
-            
-            try:
-                 info = await asyncio.to_thread(lambda: ticker.info)
-            except:
-                 info = {
-                     "shortName": symbol,
-                     "currentPrice": price,
-                     "regularMarketChange": price - fast_info.previous_close,
-                     "regularMarketChangePercent": (price - fast_info.previous_close) / fast_info.previous_close,
-                     "volume": fast_info.last_volume,
-                     "dayHigh": fast_info.day_high,
-                     "dayLow": fast_info.day_low,
-                     "open": fast_info.open,
-                     "previousClose": fast_info.previous_close,
-                     "currency": fast_info.currency,
-                     "exchange": fast_info.exchange,
-                     "quoteType": fast_info.quote_type,
-                 }
-        except:
-             info = await asyncio.to_thread(lambda: ticker.info)
+        while remaining or running:
+            # Start the next strategy: the first one, a hedge after the current
+            # ones ran past their delay, or a replacement for a failed one
+            if remaining:
+                name, guard, start = remaining.pop(0)
+                if running:
+                    quote_strategy_stats["hedges"] += 1
+                running[asyncio.ensure_future(start())] = name
+            timeout = _hedge_delay(guard) if QUOTE_HEDGING and remaining else None
 
-        data = {
-            "symbol": symbol,
-            "name": info.get("shortName", symbol),
-            "price": info.get("currentPrice", info.get("regularMarketPrice", 0)),
-            "change": info.get("regularMarketChange", 0),
-            "percent_change": info.get("regularMarketChangePercent", 0) * 100,
-            "volume": info.get("volume", 0),
-            "market_cap": info.get("marketCap", 0),
-            "pe_ratio": info.get("trailingPE", None),
-            "eps": info.get("trailingEps", None),
-            "day_high": info.get("dayHigh", 0),
-            "day_low": info.get("dayLow", 0),
-            "open": info.get("open", 0),
-            "previous_close": info.get("previousClose", 0),
-            "currency": info.get("currency", "USD"),
-            "exchange": info.get("exchange", "UNKNOWN"),
-            "timezone": info.get("exchangeTimezoneName", "UTC"),
-            "type": info.get("quoteType", "EQUITY"),
-            "market_state": info.get("marketState", "CLOSED"),
-        }
-        
-        quote_cache[symbol] = (data, time.time())
-        return data
-        
+            done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = running.pop(task)
+                try:
+                    quote = task.result()
+                except Exception as e:
+                    print(f"Quote strategy {name} failed for {symbol}: {e}")
+                    error = e
+                    continue
+                if quote:
+                    wins = quote_strategy_stats["wins"]
+                    wins[name] = wins.get(name, 0) + 1
+                    movers.observe({to_yfinance_symbol(symbol): quote})
+                    return quote
+    finally:
+        for task in running:
+            task.cancel()
+    raise error or ValueError(f"No quote found for {symbol}")
+
+async def _fetch_quote(symbol: str):
+    # Every upstream strategy is guarded by its rate limiter and circuit
+    # breaker, so a source that is down or blocking us fails instantly.
+    try:
+        quote = await _race_strategies(symbol, _quote_strategies(symbol))
+        await quote_cache.set(symbol, quote)
+        return quote
     except Exception as e:
-        print(f"YFinance error for {symbol}: {e}")
-        
-        # Strategy 3: Try Google Finance Scraping (Strong Fallback)
-        print(f"Attempting Google Finance fallback for {symbol}")
-        google_quote = await get_google_finance_quote(symbol)
-        if google_quote:
-            quote_cache[symbol] = (google_quote, time.time())
-            return google_quote
-
-        # Strategy 4: Serve Stale Cache
-        if symbol in quote_cache:
+        # Price-only Google quote, not cached with the full ones
+        degraded = await degraded_quote_cache.get_or_fetch(symbol, lambda: _fetch_google_quote(symbol))
+        if degraded:
+            metrics.fallbacks.inc(endpoint="quote", fallback="google")
+            return degraded
+
+        # Serve Stale Cache
+        stale = await quote_cache.get_stale(symbol)
+        if stale:
             print(f"Serving stale cache for {symbol} due to error")
-            return quote_cache[symbol][0]
+            metrics.fallbacks.inc(endpoint="quote", fallback="stale_cache")
+            return stale
+
+        # Offline NSE bhavcopy dump, if one is configured
+        if is_indian_symbol(symbol):
+            offline_quote = await executors.parse.run(bhavcopy.get_offline_quote, symbol)
+            if offline_quote:
+                print(f"Serving offline bhavcopy quote for {symbol}")
+                metrics.fallbacks.inc(endpoint="quote", fallback="bhavcopy")
+                return offline_quote
             
         raise e
 
-async def get_history(symbol: str, period: str, interval: str):
+def quote_cache_for(symbol: str, quote):
+    """The cache quote was served from, None for uncached fallbacks."""
+    for cache in (quote_cache, degraded_quote_cache):
+        entry = cache.peek(symbol)
+        if entry is not None and entry.value is quote:
+            return cache
+    return None
+
+async def _fetch_google_quote(symbol: str):
+    quote = await get_google_finance_quote(symbol)
+    if quote:
+        wins = quote_strategy_stats["wins"]
+        wins["google"] = wins.get("google", 0) + 1
+        await degraded_quote_cache.set(symbol, quote)
+    return quote
+
+def _batch_to_quote(symbol, quote, meta):
+    indian = is_indian_symbol(symbol) or symbol in INDEX_SYMBOLS
+    return {
+        "symbol": symbol,
+        "name": meta.get("name", symbol),
+        "price": quote["price"],
+        "change": quote["change"],
+        "percent_change": quote["percent_change"],
+        "volume": quote["volume"],
+        "market_cap": meta.get("market_cap") or 0,
+        "pe_ratio": meta.get("pe_ratio"),
+        "eps": meta.get("eps"),
+        "day_high": quote["day_high"],
+        "day_low": quote["day_low"],
+        "open": quote["open"],
+        "previous_close": quote["previous_close"],
+        "currency": meta.get("currency") or ("INR" if indian else "USD"),
+        "exchange": meta.get("exchange") or ("NSE" if indian else "UNKNOWN"),
+        "timezone": meta.get("timezone") or ("Asia/Kolkata" if indian else "UTC"),
+        "type": meta.get("type") or "EQUITY",
+        # The bulk download has no market state, go by the exchange's hours
+        "market_state": "REGULAR" if snapshot_service.is_market_open("indian" if indian else "global") else "CLOSED",
+    }
+
+async def get_quotes(symbols: list):
+    """Quote many symbols at once.
+
+    Fresh entries come straight from quote_cache, the misses are priced
+    together through the batch quote engine, and anything the bulk download
+    could not price goes through the regular get_quote chain.
+    Returns {symbol: {"status": "ok", "data": quote} | {"status": "error", "error": msg}}.
+    """
+    symbols = list(dict.fromkeys(s.strip() for s in symbols if s and s.strip()))
+    if not symbols:
+        raise ValueError("No symbols given")
+    if len(symbols) > MAX_BATCH_SYMBOLS:
+        raise ValueError(f"Too many symbols, max is {MAX_BATCH_SYMBOLS}")
+
+    cached = await quote_cache.get_many(symbols)
+    results = {symbol: {"status": "ok", "data": data} for symbol, data in cached.items()}
+    missing = [symbol for symbol in symbols if symbol not in results]
+
+    # Resolve the misses in one bulk round trip
+    if missing:
+        yf_symbols = {symbol: to_yfinance_symbol(symbol) for symbol in missing}
+        quotes, metadata = await asyncio.gather(
+            batch_quotes.get_quotes(list(yf_symbols.values())),
+            batch_quotes.get_metadata(list(yf_symbols.values())),
+        )
+        priced = {
+            symbol: _batch_to_quote(symbol, quotes[yf_symbol], metadata.get(yf_symbol, {}))
+            for symbol, yf_symbol in yf_symbols.items() if yf_symbol in quotes
+        }
+        # So the next load of the same watchlist is a cache hit
+        await quote_cache.set_many(priced)
+        results.update({symbol: {"status": "ok", "data": data} for symbol, data in priced.items()})
+
+    # Whatever the bulk download missed falls back to the per-symbol chain
+    leftover = [symbol for symbol in missing if symbol not in results]
+    if leftover:
+        fetched = await fetch_all(leftover, get_quote)
+        for symbol in leftover:
+            if symbol in fetched:
+                results[symbol] = {"status": "ok", "data": fetched[symbol]}
+            else:
+                results[symbol] = {"status": "error", "error": f"No quote data for {symbol}"}
+
+    return {symbol: results[symbol] for symbol in symbols}
+
+async def get_history_frame(symbol: str, period: str, interval: str):
+    """OHLCV history as a DataFrame, empty if nothing could be fetched."""
     # Handle NIFTY indices mapping
-    yfinance_symbol = symbol
-    if symbol == "NIFTY 50":
-        yfinance_symbol = "^NSEI"
-    elif symbol == "NIFTY BANK":
-        yfinance_symbol = "^NSEBANK"
-    elif symbol == "NIFTY IT":
-        yfinance_symbol = "^CNXIT"
-    elif symbol == "NIFTY NEXT 50":
-        yfinance_symbol = "^NSMIDCP"
-    elif symbol == "SENSEX":
-        yfinance_symbol = "^BSESN"
+    yfinance_symbol = INDEX_SYMBOLS.get(symbol, symbol)
 
     try:
-        ticker = await asyncio.to_thread(yf.Ticker, yfinance_symbol)
-        history = await asyncio.to_thread(ticker.history, period=period, interval=interval)
-        
-        # Convert dataframe to list of dicts
-        history.reset_index(inplace=True)
-        
-        # Format date/time
-        data = []
-        for _, row in history.iterrows():
-            # Handle Date or Datetime index
-            date_val = row["Date"]
-            
-            entry = {
-                "date": date_val.isoformat(),
-                "open": row["Open"],
-                "high": row["High"],
-                "low": row["Low"],
-                "close": row["Close"],
-                "volume": row["Volume"]
-            }
-            data.append(entry)
-            
-        return data
+        # Local store first, it only downloads bars it doesn't have yet
+        return await history_store.get_history_frame(yfinance_symbol, period, interval)
     except Exception as e:
-        print(f"YFinance history error: {e}")
-        return []
+        print(f"History store error for {symbol}: {e}")
+        try:
+            ticker = await executors.yahoo.run(yf.Ticker, yfinance_symbol)
+            return await executors.yahoo.run(metrics.timed("yfinance", "history", ticker.history), period=period, interval=interval)
+        except Exception as e:
+            print(f"YFinance history error: {e}")
+            return pd.DataFrame()
+
+# Downsampled chart histories per (symbol, period, interval, format, max_points, mode).
+# Binary payloads aren't JSON, and they are cheap to rebuild from the local
+# store, so this cache stays in-process.
+history_cache = AsyncCache(
+    ttl_seconds=int(os.getenv("HISTORY_CACHE_TTL", str(int(history_store.REFRESH_SECONDS)))),
+    max_entries=500,
+    name="history_cache",
+    shared=False,
+)
+
+def history_key(symbol: str, period: str, interval: str, fmt: str, max_points: int, mode: str):
+    return (symbol, period, interval, fmt, max_points, mode)
+
+async def get_history(symbol: str, period: str, interval: str, fmt: str = "json", max_points: int = None, mode: str = "candle"):
+    """OHLCV history encoded as fmt: "json" rows, "columnar" arrays or packed "binary" bytes.
+
+    With max_points the bars are downsampled to at most that many, see
+    history_codec.downsample.
+    """
+    async def build():
+        history = await get_history_frame(symbol, period, interval)
+        # Built from whole columns, no per-row loop
+        return history_codec.encode(history_codec.downsample(history, max_points, mode), fmt)
+
+    if not max_points:
+        return await build()
+
+    key = history_key(symbol, period, interval, fmt, max_points, mode)
+    async def fetch():
+        data = await build()
+        await history_cache.set(key, data)
+        return data
+    return await history_cache.get_or_fetch(key, fetch)
+
+# Indicator state per (symbol, period, interval, indicators, params). Entries
+# hold numpy arrays, so they stay in-process. Past the TTL the cached
+# response is served while the history is re-read in the background and only
+# the new bars are computed.
+indicator_cache = AsyncCache(
+    ttl_seconds=int(os.getenv("INDICATOR_CACHE_TTL", "30")),
+    stale_ttl_seconds=int(os.getenv("INDICATOR_STALE_TTL", "3600")),
+    max_entries=500,
+    name="indicator_cache",
+    shared=False,
+)
+
+def indicator_key(symbol: str, period: str, interval: str, names: list, params: dict):
+    params = {**indicators.DEFAULT_PARAMS, **params}
+    return (symbol, period, interval, tuple(names), tuple(sorted(params.items())))
+
+async def get_indicators(symbol: str, period: str, interval: str, names: list, params: dict):
+    """Technical indicators over the same history get_history serves, see indicators.compute."""
+    params = {**indicators.DEFAULT_PARAMS, **params}
+    key = indicator_key(symbol, period, interval, names, params)
+
+    async def update():
+        history = await get_history_frame(symbol, period, interval)
+        if history.empty:
+            raise ValueError(f"No history for {symbol}")
+        previous = await indicator_cache.get_stale(key)
+        state = await executors.parse.run(indicators.compute, history, names, params, previous)
+        await indicator_cache.set(key, state)
+        return state
+
+    state = await indicator_cache.get_or_fetch(key, update)
+    return {"symbol": symbol, "period": period, "interval": interval, **state["response"]}
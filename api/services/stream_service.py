@@ -0,0 +1,105 @@
+import asyncio
+import os
+from api.services import stock_service
+
+# Shared upstream polling for streamed quotes.
+# One poller task runs per distinct subscribed symbol and fans every update
+# out to all subscriber queues, so upstream load follows the number of
+# symbols rather than the number of connected clients.
+
+# Poll cadence in seconds per market state
+POLL_INTERVALS = {
+    "REGULAR": float(os.getenv("STREAM_INTERVAL_REGULAR", "5")),
+    "PRE": float(os.getenv("STREAM_INTERVAL_EXTENDED", "15")),
+    "POST": float(os.getenv("STREAM_INTERVAL_EXTENDED", "15")),
+    "PREPRE": float(os.getenv("STREAM_INTERVAL_EXTENDED", "15")),
+    "POSTPOST": float(os.getenv("STREAM_INTERVAL_EXTENDED", "15")),
+}
+CLOSED_INTERVAL = float(os.getenv("STREAM_INTERVAL_CLOSED", "60"))
+ERROR_INTERVAL = 30
+
+# Per-connection limits
+MAX_SYMBOLS_PER_CLIENT = 50
+QUEUE_SIZE = 100
+
+def poll_interval(quote):
+    return POLL_INTERVALS.get((quote or {}).get("market_state"), CLOSED_INTERVAL)
+
+def diff_quote(old, new):
+    """Return the fields of new that differ from old."""
+    if not old:
+        return dict(new)
+    return {k: v for k, v in new.items() if old.get(k) != v}
+
+class QuoteHub:
+    def __init__(self):
+        self.subscribers = {} # symbol -> set of subscriber queues
+        self.pollers = {} # symbol -> poller task
+        self.last = {} # symbol -> last quote sent
+
+    def new_queue(self):
+        return asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def subscribe(self, queue, symbols):
+        for symbol in symbols:
+            self.subscribers.setdefault(symbol, set()).add(queue)
+            # Late joiners get the current snapshot straight away
+            if symbol in self.last:
+                self._put(queue, {"type": "snapshot", "symbol": symbol, "data": self.last[symbol]})
+            if symbol not in self.pollers:
+                self.pollers[symbol] = asyncio.create_task(self._poll(symbol))
+
+    def unsubscribe(self, queue, symbols=None):
+        for symbol in list(symbols if symbols is not None else self.subscribers):
+            queues = self.subscribers.get(symbol)
+            if not queues:
+                continue
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[symbol]
+                self.last.pop(symbol, None)
+                task = self.pollers.pop(symbol, None)
+                if task:
+                    task.cancel()
+
+    def _put(self, queue, message):
+        # Slow consumers lose their oldest update rather than blocking the poller
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(message)
+
+    def _publish(self, symbol, message):
+        for queue in self.subscribers.get(symbol, ()):
+            self._put(queue, message)
+
+    async def _poll(self, symbol):
+        while symbol in self.subscribers:
+            previous = self.last.get(symbol)
+            interval = poll_interval(previous)
+            try:
+                quote = await stock_service.refresh_quote(symbol, max_age=interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Stream poll error for {symbol}: {e}")
+                self._publish(symbol, {"type": "error", "symbol": symbol, "error": str(e)})
+                await asyncio.sleep(ERROR_INTERVAL)
+                continue
+
+            if previous is None:
+                self._publish(symbol, {"type": "snapshot", "symbol": symbol, "data": quote})
+            else:
+                changes = diff_quote(previous, quote)
+                if changes:
+                    self._publish(symbol, {"type": "update", "symbol": symbol, "data": changes})
+            self.last[symbol] = quote
+
+            await asyncio.sleep(poll_interval(quote))
+
+    def stats(self):
+        return {
+            "symbols": len(self.subscribers),
+            "subscriptions": sum(len(q) for q in self.subscribers.values()),
+        }
+
+hub = QuoteHub()
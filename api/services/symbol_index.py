@@ -0,0 +1,202 @@
+import bisect
+import csv
+import heapq
+import os
+import re
+import threading
+from collections import Counter
+from api.services import startup
+
+# In-memory symbol index for /api/stock/search.
+#
+# Built from the bundled listing (api/data/listings.csv) plus any exchange
+# dumps named in SYMBOL_LISTING_PATHS (os.pathsep separated). Supported
+# dumps are the NSE equity list (EQUITY_L.csv) and the NASDAQ symbol
+# directory files (nasdaqlisted.txt, otherlisted.txt).
+#
+# Every entry is indexed under its bare ticker and the words of its name,
+# kept as sorted (token, entry id) posting arrays, so a prefix lookup is a
+# binary search plus a scan of the matching range. Typos are handled by a
+# trigram index over the same tokens.
+
+DEFAULT_LISTING = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "listings.csv")
+LISTING_PATHS = [p for p in os.getenv("SYMBOL_LISTING_PATHS", "").split(os.pathsep) if p]
+
+# Fuzzy matches need this much trigram overlap (Jaccard) with the query
+FUZZY_THRESHOLD = 0.3
+
+WORD = re.compile(r"[A-Z0-9&]+")
+
+# NASDAQ otherlisted.txt exchange codes -> Yahoo exchange codes
+OTHER_EXCHANGES = {"N": "NYQ", "A": "ASE", "P": "PCX", "Z": "BTS", "V": "PCX"}
+
+def _words(text):
+    return WORD.findall(text.upper())
+
+def _trigrams(token):
+    padded = f" {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _ticker(symbol):
+    # RELIANCE.NS -> RELIANCE
+    return symbol.split(".")[0].upper()
+
+def read_listing(path):
+    """[{symbol, name, type, exchange}] from a listing file in any supported format."""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        header = f.readline()
+        f.seek(0)
+        if "|" in header:
+            rows = csv.DictReader(f, delimiter="|")
+            return _nasdaq_entries(rows)
+        rows = csv.DictReader(f, skipinitialspace=True)
+        if "NAME OF COMPANY" in header:
+            return [
+                {"symbol": f"{row['SYMBOL'].strip()}.NS", "name": row["NAME OF COMPANY"].strip(), "type": "EQUITY", "exchange": "NSI"}
+                for row in rows if row.get("SYMBOL")
+            ]
+        return [
+            {"symbol": row["symbol"], "name": row["name"], "type": row.get("type") or "EQUITY", "exchange": row.get("exchange")}
+            for row in rows if row.get("symbol")
+        ]
+
+def _nasdaq_entries(rows):
+    entries = []
+    for row in rows:
+        symbol = row.get("Symbol") or row.get("ACT Symbol")
+        # The last line is "File Creation Time: ..."
+        if not symbol or symbol.startswith("File Creation Time") or row.get("Test Issue") == "Y":
+            continue
+        exchange = OTHER_EXCHANGES.get(row.get("Exchange"), "NMS") if "Exchange" in row else "NMS"
+        entries.append({
+            "symbol": symbol.replace(".", "-"), # BRK.B is BRK-B on Yahoo
+            "name": row["Security Name"].split(" - ")[0].strip(),
+            "type": "ETF" if row.get("ETF") == "Y" else "EQUITY",
+            "exchange": exchange,
+        })
+    return entries
+
+class SymbolIndex:
+    def __init__(self, entries=()):
+        self.entries = []
+        self.by_symbol = {}
+        self.tickers = [] # sorted (ticker, id)
+        self.words = [] # sorted (name word, id)
+        self.token_ids = {} # token -> [id]
+        self.trigrams = {} # trigram -> [token]
+        self.add(entries, build=True)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, entries, build=False):
+        """Index entries whose symbol isn't known yet."""
+        tickers = []
+        words = []
+        for entry in entries:
+            symbol = entry.get("symbol")
+            if not symbol or symbol in self.by_symbol:
+                continue
+            entry_id = len(self.entries)
+            entry = {
+                "symbol": symbol,
+                "name": entry.get("name") or symbol,
+                "type": entry.get("type"),
+                "exchange": entry.get("exchange"),
+            }
+            self.entries.append(entry)
+            self.by_symbol[symbol] = entry_id
+
+            ticker = _ticker(symbol)
+            tickers.append((ticker, entry_id))
+            tokens = {ticker}
+            for word in set(_words(entry["name"])):
+                words.append((word, entry_id))
+                tokens.add(word)
+            for token in tokens:
+                ids = self.token_ids.get(token)
+                if ids is None:
+                    ids = self.token_ids[token] = []
+                    for gram in _trigrams(token):
+                        self.trigrams.setdefault(gram, []).append(token)
+                ids.append(entry_id)
+
+        if build:
+            self.tickers = sorted(self.tickers + tickers)
+            self.words = sorted(self.words + words)
+        else:
+            for item in tickers:
+                bisect.insort(self.tickers, item)
+            for item in words:
+                bisect.insort(self.words, item)
+
+    @staticmethod
+    def _prefix(postings, prefix):
+        start = bisect.bisect_left(postings, (prefix,))
+        # Every token with the prefix sorts before prefix + U+FFFF
+        stop = bisect.bisect_left(postings, (prefix + "\uffff",), start)
+        return {entry_id for _, entry_id in postings[start:stop]}
+
+    def _fuzzy(self, word):
+        """{id: similarity} for entries with a token close to word."""
+        grams = _trigrams(word)
+        shared = Counter(token for gram in grams for token in self.trigrams.get(gram, ()))
+        scores = {}
+        for token, count in shared.items():
+            similarity = count / (len(grams) + len(_trigrams(token)) - count)
+            if similarity >= FUZZY_THRESHOLD:
+                for entry_id in self.token_ids[token]:
+                    scores[entry_id] = max(scores.get(entry_id, 0), similarity)
+        return scores
+
+    def search(self, query: str, limit: int = 10):
+        words = _words(query)
+        if not words:
+            return []
+
+        # Every query word must prefix a ticker or a word of the name;
+        # single letters only match tickers, names would match half the index
+        matched = None
+        for word in words:
+            ids = self._prefix(self.tickers, word)
+            if len(word) > 1:
+                ids |= self._prefix(self.words, word)
+            matched = ids if matched is None else matched & ids
+
+        compact = "".join(words)
+        def rank(entry_id):
+            ticker = _ticker(self.entries[entry_id]["symbol"])
+            if ticker == compact:
+                return (0, entry_id)
+            if ticker.startswith(words[0]):
+                return (1, entry_id)
+            return (2, entry_id)
+        ranked = heapq.nsmallest(limit, matched, key=rank)
+
+        # Nothing starts with the query, try near misses on its longest word, e.g. "relaince"
+        longest = max(words, key=len)
+        if not ranked and len(longest) >= 3:
+            fuzzy = self._fuzzy(longest)
+            ranked = sorted(fuzzy, key=lambda i: (-fuzzy[i], i))[:limit]
+
+        return [dict(self.entries[i]) for i in ranked]
+
+_index = None
+# The startup warm-up builds the index on a worker thread
+_index_lock = threading.Lock()
+
+@startup.add_warmup
+def get_index():
+    """The process-wide index, built on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                entries = []
+                for path in [DEFAULT_LISTING, *LISTING_PATHS]:
+                    try:
+                        entries.extend(read_listing(path))
+                    except Exception as e:
+                        print(f"Symbol listing load error for {path}: {e}")
+                _index = SymbolIndex(entries)
+    return _index
@@ -0,0 +1,240 @@
+import asyncio
+import os
+import time
+from collections import deque
+from api.services.executors import ExecutorOverloaded
+
+# Per-upstream request guards: a token bucket limits how fast we hit a
+# source, and a circuit breaker stops calling it for a while after repeated
+# failures. When a guard refuses a call, UpstreamUnavailable is raised right
+# away, so callers skip to their next source instead of waiting out a timeout.
+#
+# Breaker states:
+#   closed    - calls go through, consecutive failures are counted
+#   open      - calls are refused until reset_timeout has passed
+#   half_open - one probe call is let through; success closes the
+#               circuit, failure opens it again
+#
+# Only errors that say something about the upstream's health count against
+# the breaker: timeouts, connection errors, 5xx and 429. A 4xx or a
+# "no such ticker" error is about the request (usually a symbol a user typed)
+# and leaves the breaker as it was.
+#
+# Limits are per process. Each guard also tracks the latency of recent
+# calls and a moving success rate, which callers use to decide which source
+# to try first and when to hedge with the next one. Successful calls count
+# with their latency and cancelled ones (usually the losers of a hedged race)
+# with how long they had run, a lower bound; leaving those out would make the
+# slow calls that get cancelled invisible to the percentiles. Calls can
+# name an operation so its latencies are kept apart from the upstream's
+# other, differently sized calls (a quote vs a search or a bulk download).
+
+class UpstreamUnavailable(Exception):
+    pass
+
+# Exception classes (by name, so the libraries needn't be imported here)
+# raised for unknown symbols or missing data rather than upstream trouble
+REQUEST_ERRORS = {"YFTickerMissingError", "YFInvalidPeriodError"}
+
+def is_upstream_failure(error):
+    """False for errors caused by the request itself, True for everything else."""
+    if any(cls.__name__ in REQUEST_ERRORS for cls in type(error).__mro__):
+        return False
+    # HTTP errors from requests, curl_cffi and httpx carry the response
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status, int) and 400 <= status < 500:
+        return status in (408, 429)
+    return True
+
+# Every Upstream registers itself here so its stats can be reported
+registry = []
+
+# Call latencies kept per upstream and per operation, and how many are
+# needed before percentiles are trusted
+LATENCY_WINDOW = 200
+MIN_LATENCY_SAMPLES = 5
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate # tokens per second
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def try_acquire(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0 # consecutive
+        self.opened_at = 0.0
+        self.probing = False
+        self.opens = 0
+
+    def allow(self):
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = "half_open"
+        # half_open: only one probe at a time
+        if self.probing:
+            return False
+        self.probing = True
+        return True
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.opens += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+        self.probing = False
+
+    def release(self):
+        """The call ended without telling us anything about the upstream."""
+        self.probing = False
+
+class Upstream:
+    def __init__(self, name, rate, burst, failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.request_errors = 0
+        self.rate_limited = 0
+        self.short_circuited = 0
+        self.cancelled = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.operation_latencies = {} # operation -> deque
+        self.success_rate = 1.0 # exponential moving average
+        registry.append(self)
+
+    def latency_percentile(self, percentile, default=None, operation=None):
+        """Latency of recent calls (of operation, if given) at percentile (0-100), in seconds."""
+        latencies = self.latencies if operation is None else self.operation_latencies.get(operation, ())
+        if len(latencies) < MIN_LATENCY_SAMPLES:
+            return default
+        ordered = sorted(latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+
+    def expected_cost(self, default_latency, operation=None):
+        """Typical latency divided by success rate, lower is better."""
+        return self.latency_percentile(50, default_latency, operation) / max(self.success_rate, 0.05)
+
+    def _record_latency(self, elapsed, operation):
+        self.latencies.append(elapsed)
+        if operation is not None:
+            latencies = self.operation_latencies.get(operation)
+            if latencies is None:
+                latencies = self.operation_latencies[operation] = deque(maxlen=LATENCY_WINDOW)
+            latencies.append(elapsed)
+
+    def available(self):
+        """True if a call would not be refused by an open circuit right now."""
+        breaker = self.breaker
+        if breaker.state == "closed":
+            return True
+        if breaker.state == "open":
+            return time.monotonic() - breaker.opened_at >= breaker.reset_timeout
+        return not breaker.probing
+
+    async def call(self, fn, timeout=None, operation=None):
+        """Await fn() under this upstream's rate limit and circuit breaker.
+
+        Exceptions from fn and timeouts are re-raised, and count as upstream
+        failures unless is_upstream_failure() says the request was at fault.
+        A refused call raises UpstreamUnavailable.
+        """
+        if not self.breaker.allow():
+            self.short_circuited += 1
+            raise UpstreamUnavailable(f"{self.name} circuit is open")
+        if not self.bucket.try_acquire():
+            self.breaker.release()
+            self.rate_limited += 1
+            raise UpstreamUnavailable(f"{self.name} rate limit reached")
+
+        self.calls += 1
+        started = time.perf_counter()
+        try:
+            if timeout is None:
+                result = await fn()
+            else:
+                result = await asyncio.wait_for(fn(), timeout=timeout)
+        except asyncio.CancelledError:
+            # The caller went away, not the upstream's fault. The call took
+            # at least this long, see above
+            self.cancelled += 1
+            self._record_latency(time.perf_counter() - started, operation)
+            self.breaker.release()
+            raise
+        except ExecutorOverloaded:
+            # Shed locally, not the upstream's fault
+            self.breaker.release()
+            raise
+        except Exception as e:
+            if not is_upstream_failure(e):
+                self.request_errors += 1
+                self.breaker.release()
+                raise
+            self.failures += 1
+            self.success_rate *= 0.9
+            self.breaker.record_failure()
+            raise
+        self.successes += 1
+        self.success_rate = self.success_rate * 0.9 + 0.1
+        self._record_latency(time.perf_counter() - started, operation)
+        self.breaker.record_success()
+        return result
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "opens": self.breaker.opens,
+            "tokens": round(self.bucket.tokens, 2),
+            "calls": self.calls,
+            "successes": self.successes,
+            "failures": self.failures,
+            "request_errors": self.request_errors,
+            "rate_limited": self.rate_limited,
+            "short_circuited": self.short_circuited,
+            "cancelled": self.cancelled,
+            "success_rate": round(self.success_rate, 3),
+            "latency_p50": self.latency_percentile(50),
+            "latency_p95": self.latency_percentile(95),
+        }
+
+def _upstream(name, rate, burst, failure_threshold, reset_timeout):
+    prefix = name.upper()
+    return Upstream(
+        name,
+        rate=float(os.getenv(f"{prefix}_RATE", rate)),
+        burst=float(os.getenv(f"{prefix}_BURST", burst)),
+        failure_threshold=int(os.getenv(f"{prefix}_FAILURE_THRESHOLD", failure_threshold)),
+        reset_timeout=float(os.getenv(f"{prefix}_RESET_TIMEOUT", reset_timeout)),
+    )
+
+# NSE blocks aggressive scrapers, so it gets a slow bucket and a long cool-down
+nse = _upstream("nse", rate="0.5", burst="5", failure_threshold="3", reset_timeout="60")
+yahoo = _upstream("yahoo", rate="20", burst="40", failure_threshold="5", reset_timeout="30")
+google = _upstream("google", rate="2", burst="5", failure_threshold="3", reset_timeout="60")
@@ -0,0 +1,312 @@
+import asyncio
+import random
+import threading
+import time
+import zlib
+import httpx
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from nselib import capital_market
+from yfinance.exceptions import YFRateLimitError
+from api.services import history_store, http_client, market_service
+
+# Local stand-ins for every upstream the API talks to, so benchmarks run
+# offline and reproducibly. yfinance and nselib are patched at module level
+# (the services look them up at call time); Yahoo search, Google Finance and
+# everything else over httpx go through a MockTransport on the shared client.
+#
+# Each source has a latency (seconds, with log-normal jitter), an error rate
+# and a rate-limit rate. Rate-limited calls fail the way the real source
+# does: YFRateLimitError for yfinance, an exception for nselib, HTTP 429 for
+# Google and Yahoo search. Blocking sources sleep on the calling thread, like
+# the real libraries do.
+#
+# Prices are a deterministic function of (symbol, bar time), so repeated and
+# overlapping history requests agree with each other.
+
+DEFAULT_CONFIG = {
+    "yfinance": {"latency": 0.08, "jitter": 0.3, "error_rate": 0.0, "rate_limit_rate": 0.0},
+    "nselib": {"latency": 0.4, "jitter": 0.3, "error_rate": 0.0, "rate_limit_rate": 0.0},
+    "google": {"latency": 0.15, "jitter": 0.3, "error_rate": 0.0, "rate_limit_rate": 0.0},
+    "yahoo_search": {"latency": 0.05, "jitter": 0.3, "error_rate": 0.0, "rate_limit_rate": 0.0},
+}
+
+INTERVAL_SECONDS = {
+    "1m": 60, "2m": 120, "5m": 300, "15m": 900, "30m": 1800, "60m": 3600, "90m": 5400, "1h": 3600,
+    "1d": 86400, "5d": 5 * 86400, "1wk": 7 * 86400, "1mo": 30 * 86400, "3mo": 90 * 86400,
+}
+MAX_BARS = 20000
+
+class FakeError(Exception):
+    pass
+
+class FakeSource:
+    def __init__(self, name, latency=0.0, jitter=0.0, error_rate=0.0, rate_limit_rate=0.0, seed=0):
+        self.name = name
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = {} # operation -> count
+        self.errors = 0
+        self.rate_limited = 0
+
+    def _begin(self, operation):
+        """(delay, outcome) for one call; outcome is "ok", "error" or "rate_limited"."""
+        with self.lock:
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+            delay = self.latency * self.random.lognormvariate(0, self.jitter) if self.latency else 0.0
+            roll = self.random.random()
+            if roll < self.rate_limit_rate:
+                self.rate_limited += 1
+                return delay, "rate_limited"
+            if roll < self.rate_limit_rate + self.error_rate:
+                self.errors += 1
+                return delay, "error"
+            return delay, "ok"
+
+    def call(self, operation):
+        """Simulate one blocking call, returns its outcome."""
+        delay, outcome = self._begin(operation)
+        time.sleep(delay)
+        return outcome
+
+    async def acall(self, operation):
+        delay, outcome = self._begin(operation)
+        await asyncio.sleep(delay)
+        return outcome
+
+    def stats(self):
+        with self.lock:
+            return {"calls": dict(self.calls), "errors": self.errors, "rate_limited": self.rate_limited}
+
+def _seed(symbol):
+    return zlib.crc32(symbol.encode())
+
+def _prices(symbol, ts):
+    """Close prices of symbol at epoch seconds ts, a smooth wave plus hashed noise."""
+    seed = _seed(symbol)
+    base = 50 + seed % 950
+    ts = np.asarray(ts, dtype=np.int64)
+    noise = ((ts // 60 * 2654435761 + seed) % 1000) / 1000.0 - 0.5
+    return base * (1 + 0.1 * np.sin(ts / 864000.0 + seed % 7) + 0.01 * noise)
+
+def _quote(symbol):
+    now = int(time.time())
+    price, previous = _prices(symbol, [now, now - 86400])
+    return float(price), float(previous)
+
+def history_frame(symbol, period=None, interval="1d", start=None, **kwargs):
+    step = INTERVAL_SECONDS.get(interval, 86400)
+    now = pd.Timestamp.now(tz="UTC")
+    end = int(now.timestamp()) // step * step
+    if start is not None:
+        first = int(pd.Timestamp(start).timestamp())
+    else:
+        required = history_store.required_start(period or "1mo", now)
+        first = required if required is not None else end - 10 * 365 * 86400
+    first = max(first // step * step, end - (MAX_BARS - 1) * step)
+    ts = np.arange(first, end + 1, step, dtype=np.int64)
+    if step >= 86400:
+        # No weekend sessions
+        ts = ts[pd.to_datetime(ts, unit="s").dayofweek < 5]
+    close = _prices(symbol, ts)
+    index = pd.to_datetime(ts, unit="s", utc=True).tz_convert("America/New_York")
+    return pd.DataFrame({
+        "Open": close * 0.998,
+        "High": close * 1.01,
+        "Low": close * 0.99,
+        "Close": close,
+        "Volume": (1000 + ts % 5000).astype(np.float64),
+        "Dividends": 0.0,
+        "Stock Splits": 0.0,
+    }, index=index)
+
+class FakeFastInfo:
+    def __init__(self, source, symbol):
+        self._source = source
+        self._symbol = symbol
+        self._price, self.previous_close = _quote(symbol)
+        self.open = self.previous_close
+        self.day_high = self._price * 1.01
+        self.day_low = self._price * 0.99
+        self.last_volume = 100000
+        self.currency = "INR" if symbol.endswith(".NS") else "USD"
+        self.exchange = "NSI" if symbol.endswith(".NS") else "NMS"
+        self.quote_type = "EQUITY"
+
+    @property
+    def last_price(self):
+        _check(self._source.call("fast_info"))
+        return self._price
+
+def _check(outcome):
+    if outcome == "rate_limited":
+        raise YFRateLimitError()
+    if outcome == "error":
+        raise FakeError("simulated yfinance failure")
+
+class FakeTicker:
+    def __init__(self, source, symbol):
+        self.source = source
+        self.ticker = symbol
+
+    @property
+    def fast_info(self):
+        return FakeFastInfo(self.source, self.ticker)
+
+    @property
+    def info(self):
+        _check(self.source.call("info"))
+        price, previous = _quote(self.ticker)
+        return {
+            "shortName": f"{self.ticker} Corp",
+            "currentPrice": price,
+            "regularMarketPrice": price,
+            "regularMarketChange": price - previous,
+            "regularMarketChangePercent": (price - previous) / previous,
+            "volume": 100000,
+            "marketCap": 10**10,
+            "trailingPE": 20.0,
+            "trailingEps": price / 20,
+            "dayHigh": price * 1.01,
+            "dayLow": price * 0.99,
+            "open": previous,
+            "previousClose": previous,
+            "currency": "INR" if self.ticker.endswith(".NS") else "USD",
+            "exchange": "NSI" if self.ticker.endswith(".NS") else "NMS",
+            "quoteType": "EQUITY",
+            "marketState": "REGULAR",
+        }
+
+    def history(self, period=None, interval="1d", start=None, **kwargs):
+        _check(self.source.call("history"))
+        return history_frame(self.ticker, period=period, interval=interval, start=start)
+
+def fake_download(source):
+    def download(symbols, period="5d", interval="1d", **kwargs):
+        _check(source.call("download"))
+        if isinstance(symbols, str):
+            symbols = symbols.split()
+        columns = {}
+        index = None
+        for symbol in symbols:
+            frame = history_frame(symbol, period=period, interval=interval)
+            index = frame.index
+            for field in ("Open", "High", "Low", "Close", "Volume"):
+                columns[(symbol, field)] = frame[field].to_numpy()
+            columns[(symbol, "Adj Close")] = frame["Close"].to_numpy()
+        return pd.DataFrame(columns, index=index)
+    return download
+
+def _nse_check(outcome):
+    if outcome == "rate_limited":
+        raise FakeError("NSE responded 429 Too Many Requests")
+    if outcome == "error":
+        raise FakeError("simulated NSE failure")
+
+def _fmt(value):
+    return f"{value:,.2f}"
+
+def fake_nse(source):
+    def price_volume_and_deliverable_position_data(symbol, period="1M", **kwargs):
+        _nse_check(source.call("quote"))
+        price, previous = _quote(f"{symbol}.NS")
+        return pd.DataFrame([{
+            "Symbol": symbol,
+            "LastPrice": _fmt(price),
+            "PrevClose": _fmt(previous),
+            "OpenPrice": _fmt(previous),
+            "HighPrice": _fmt(price * 1.01),
+            "LowPrice": _fmt(price * 0.99),
+            "TotalTradedQuantity": "1,000,000",
+        }])
+
+    def market_watch_all_indices(*args, **kwargs):
+        _nse_check(source.call("indices"))
+        rows = []
+        for name in market_service.NSE_TARGET_INDICES:
+            price, previous = _quote(name)
+            rows.append({
+                "index": name,
+                "last": _fmt(price),
+                "variation": _fmt(price - previous),
+                "percentChange": _fmt((price - previous) / previous * 100),
+            })
+        return pd.DataFrame(rows)
+
+    def top_gainers_or_losers(*args, **kwargs):
+        _nse_check(source.call("movers"))
+        rows = []
+        for symbol in market_service.INDIAN_MOVER_SYMBOLS:
+            price, previous = _quote(symbol)
+            rows.append({
+                "symbol": symbol.replace(".NS", ""),
+                "ltp": _fmt(price),
+                "previousPrice": _fmt(previous),
+                "pChange": _fmt((price - previous) / previous * 100),
+            })
+        return pd.DataFrame(rows)
+
+    return {
+        "price_volume_and_deliverable_position_data": price_volume_and_deliverable_position_data,
+        "market_watch_all_indices": market_watch_all_indices,
+        "top_gainers_or_losers": top_gainers_or_losers,
+    }
+
+GOOGLE_PAGE = '<html><body><h1 class="zzDege">{name}</h1><div class="YMlKec fxKbKc">{price}</div></body></html>'
+
+def fake_transport(google, yahoo_search):
+    async def handler(request: httpx.Request):
+        host = request.url.host
+        if host.endswith("google.com"):
+            outcome = await google.acall("scrape")
+            if outcome != "ok":
+                return httpx.Response(429 if outcome == "rate_limited" else 503)
+            symbol = request.url.path.rsplit("/", 1)[-1].split(":")[0]
+            price, _ = _quote(symbol)
+            return httpx.Response(200, text=GOOGLE_PAGE.format(name=f"{symbol} Ltd", price=_fmt(price)))
+        if host.endswith("finance.yahoo.com") and request.url.path.endswith("/search"):
+            outcome = await yahoo_search.acall("search")
+            if outcome != "ok":
+                return httpx.Response(429 if outcome == "rate_limited" else 500, json={"finance": {"error": outcome}})
+            query = request.url.params.get("q", "").upper()
+            quotes = [
+                {"symbol": f"{query}{i}", "shortname": f"{query} Holdings {i}", "quoteType": "EQUITY", "exchange": "NMS"}
+                for i in range(3)
+            ]
+            return httpx.Response(200, json={"quotes": quotes})
+        # Keep-alive pings and anything else
+        return httpx.Response(200, json={})
+    return httpx.MockTransport(handler)
+
+class Fakes:
+    def __init__(self, config=None, seed=0):
+        config = {name: {**DEFAULT_CONFIG[name], **(config or {}).get(name, {})} for name in DEFAULT_CONFIG}
+        self.config = config
+        self.sources = {name: FakeSource(name, seed=seed + i, **options) for i, (name, options) in enumerate(config.items())}
+        self.saved = []
+
+    def _patch(self, target, name, value):
+        self.saved.append((target, name, getattr(target, name)))
+        setattr(target, name, value)
+
+    def install(self):
+        yfinance = self.sources["yfinance"]
+        self._patch(yf, "Ticker", lambda symbol, *args, **kwargs: FakeTicker(yfinance, symbol))
+        self._patch(yf, "download", fake_download(yfinance))
+        for name, fn in fake_nse(self.sources["nselib"]).items():
+            self._patch(capital_market, name, fn)
+        self._patch(http_client, "_client", httpx.AsyncClient(transport=fake_transport(self.sources["google"], self.sources["yahoo_search"])))
+        return self
+
+    def uninstall(self):
+        while self.saved:
+            target, name, value = self.saved.pop()
+            setattr(target, name, value)
+
+    def stats(self):
+        return {name: source.stats() for name, source in self.sources.items()}
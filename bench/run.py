@@ -0,0 +1,246 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+# Benchmark / load test for the API against local fake upstreams.
+#
+#   python -m bench.run                                # every scenario, defaults
+#   python -m bench.run --scenario quote --concurrency 64 --requests 2000
+#   python -m bench.run --set yfinance.latency=0.3 --set nselib.error_rate=0.2
+#   python -m bench.run --compare bench/results/baseline.json
+#
+# The app is driven in-process through its ASGI interface with the real
+# lifespan, caches, thread pools and guards; only the upstreams are fake
+# (see bench/fakes.py). Each scenario reports throughput, latency
+# percentiles, status codes, upstream calls made and peak RSS, and the run
+# is written as JSON so results can be compared between builds.
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+US_SYMBOLS = ["AAPL", "MSFT", "NVDA", "AMZN", "GOOGL", "META", "TSLA", "AMD", "NFLX", "JPM", "XOM", "UNH"]
+INDIAN_SYMBOLS = ["RELIANCE.NS", "TCS.NS", "INFY.NS", "HDFCBANK.NS", "ICICIBANK.NS", "SBIN.NS", "ITC.NS"]
+SEARCH_QUERIES = ["app", "micro", "relia", "tata", "nvid", "bank", "infos", "zzqx", "goo", "hdfc"]
+
+# Scenario -> request path generator; together they cover every route in
+# api/routers/market.py and api/routers/stock.py
+SCENARIOS = {
+    "market_overview": lambda rng: "/api/market/overview",
+    "market_movers": lambda rng: f"/api/market/movers?type={rng.choice(['gainers', 'losers'])}",
+    "indian_overview": lambda rng: "/api/market/indian/overview",
+    "indian_movers": lambda rng: f"/api/market/indian/movers?type={rng.choice(['gainers', 'losers'])}",
+    "sector": lambda rng: f"/api/market/sector/{rng.choice(['tech', 'health', 'pharma'])}",
+    "indian_sector": lambda rng: f"/api/market/indian/sector/{rng.choice(['tech', 'health', 'pharma'])}",
+    "search": lambda rng: f"/api/stock/search?q={rng.choice(SEARCH_QUERIES)}",
+    "quotes": lambda rng: "/api/stock/quotes?symbols=" + ",".join(rng.sample(US_SYMBOLS + INDIAN_SYMBOLS, 8)),
+    "quote": lambda rng: f"/api/stock/{rng.choice(US_SYMBOLS + INDIAN_SYMBOLS)}",
+    "history": lambda rng: f"/api/stock/{rng.choice(US_SYMBOLS)}/history?period={rng.choice(['1mo', '6mo', '1y'])}",
+    "history_chart": lambda rng: f"/api/stock/{rng.choice(US_SYMBOLS)}/history?period=5y&max_points=500&mode=line",
+    "history_intraday": lambda rng: f"/api/stock/{rng.choice(US_SYMBOLS)}/history?period=5d&interval=5m&format=columnar",
+    "indicators": lambda rng: f"/api/stock/{rng.choice(US_SYMBOLS)}/indicators?period=1y",
+}
+
+# Rough production mix for the "mixed" scenario
+MIX = {
+    "quote": 30, "quotes": 10, "search": 15, "history_chart": 10, "history": 5, "indicators": 5,
+    "market_overview": 8, "market_movers": 6, "indian_overview": 4, "indian_movers": 3, "sector": 2, "indian_sector": 2,
+}
+
+def _mixed(rng):
+    name = rng.choices(list(MIX), weights=list(MIX.values()))[0]
+    return SCENARIOS[name](rng)
+
+SCENARIOS["mixed"] = _mixed
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def percentile(ordered, p):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+def _diff_calls(before, after):
+    calls = {}
+    for name, stats in after.items():
+        previous = before.get(name, {})
+        for operation, count in stats["calls"].items():
+            delta = count - previous.get("calls", {}).get(operation, 0)
+            if delta:
+                calls[f"{name}.{operation}"] = delta
+    return calls
+
+def _cache_counts():
+    from api.services import cache
+    return {c.name: (c.hits + c.stale_hits, c.misses) for c in cache.registry}
+
+async def run_scenario(client, fakes, name, requests, concurrency, seed):
+    rng = random.Random(seed)
+    paths = [SCENARIOS[name](rng) for _ in range(requests)]
+    latencies = []
+    statuses = {}
+    before = fakes.stats()
+    cache_before = _cache_counts()
+    queue = iter(paths)
+
+    async def worker():
+        for path in queue:
+            started = time.perf_counter()
+            try:
+                response = await client.get(path)
+                status = str(response.status_code)
+            except Exception as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    hits = misses = 0
+    for cache_name, (h, m) in _cache_counts().items():
+        h0, m0 = cache_before.get(cache_name, (0, 0))
+        hits += h - h0
+        misses += m - m0
+    ms = lambda value: round(value * 1000, 3) if value is not None else None
+    return {
+        "name": name,
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "latency_ms": {
+            "mean": ms(sum(ordered) / len(ordered)) if ordered else None,
+            "p50": ms(percentile(ordered, 50)),
+            "p95": ms(percentile(ordered, 95)),
+            "p99": ms(percentile(ordered, 99)),
+            "max": ms(ordered[-1]) if ordered else None,
+        },
+        "status": statuses,
+        "upstream_calls": _diff_calls(before, fakes.stats()),
+        "cache_hit_ratio": round(hits / (hits + misses), 3) if hits + misses else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+def _parse_overrides(pairs):
+    """["yfinance.latency=0.3", ...] -> {"yfinance": {"latency": 0.3}}"""
+    config = {}
+    for pair in pairs:
+        key, _, value = pair.partition("=")
+        source, _, option = key.partition(".")
+        config.setdefault(source, {})[option] = float(value)
+    return config
+
+def compare(results, baseline, max_regression):
+    """Print per-scenario changes against baseline, return the regressed scenario names."""
+    previous = {s["name"]: s for s in baseline["scenarios"]}
+    regressed = []
+    for scenario in results["scenarios"]:
+        old = previous.get(scenario["name"])
+        if not old:
+            continue
+        p95, old_p95 = scenario["latency_ms"]["p95"], old["latency_ms"]["p95"]
+        rps, old_rps = scenario["throughput_rps"], old["throughput_rps"]
+        p95_change = (p95 - old_p95) / old_p95 if old_p95 else 0.0
+        rps_change = (rps - old_rps) / old_rps if old_rps else 0.0
+        flag = ""
+        if p95_change > max_regression or rps_change < -max_regression:
+            regressed.append(scenario["name"])
+            flag = "  REGRESSION"
+        print(f"{scenario['name']:<18} p95 {old_p95:>9.2f} -> {p95:>9.2f} ms ({p95_change:+.0%})   "
+              f"rps {old_rps:>8.1f} -> {rps:>8.1f} ({rps_change:+.0%}){flag}")
+    return regressed
+
+async def main(args):
+    from bench.fakes import Fakes
+    from api.main import app
+
+    fakes = Fakes(_parse_overrides(args.set), seed=args.seed).install()
+    scenarios = list(SCENARIOS) if args.scenario == ["all"] else args.scenario
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "upstreams": fakes.config,
+        },
+        "scenarios": [],
+    }
+    try:
+        import httpx
+        transport = httpx.ASGITransport(app=app)
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+                for i, name in enumerate(scenarios):
+                    result = await run_scenario(client, fakes, name, args.requests, args.concurrency, args.seed + i)
+                    results["scenarios"].append(result)
+                    latency = result["latency_ms"]
+                    print(f"{name:<18} {result['throughput_rps']:>8.1f} rps  p50 {latency['p50']:>8.2f}  "
+                          f"p95 {latency['p95']:>8.2f}  p99 {latency['p99']:>8.2f} ms  "
+                          f"upstream {sum(result['upstream_calls'].values()):>5}  rss {result['peak_rss_mb']} MB")
+    finally:
+        fakes.uninstall()
+    results["peak_rss_mb"] = peak_rss_mb()
+    results["upstreams"] = fakes.stats()
+    return results
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the API against local fake upstreams.")
+    parser.add_argument("--scenario", nargs="+", default=["all"], choices=["all", *SCENARIOS], help="Scenarios to run (default: all)")
+    parser.add_argument("--requests", type=int, default=300, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent clients")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--set", action="append", default=[], metavar="SOURCE.OPTION=VALUE",
+                        help="Fake upstream option, e.g. yfinance.latency=0.2 or google.rate_limit_rate=0.5")
+    parser.add_argument("--output", help="Results JSON path (default: bench/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed p95/throughput regression vs --compare")
+    parser.add_argument("--scheduler", action="store_true", help="Keep the market snapshot scheduler running")
+    return parser.parse_args(argv)
+
+def run(argv=None):
+    args = parse_args(argv)
+    # Isolated local state; must be set before the app modules are imported
+    workdir = tempfile.mkdtemp(prefix="tradex-bench-")
+    os.environ.setdefault("HISTORY_DB_PATH", os.path.join(workdir, "history.sqlite3"))
+    os.environ.setdefault("CACHE_BACKEND", "memory")
+    if not args.scheduler:
+        os.environ["SNAPSHOT_SCHEDULER"] = "0"
+
+    results = asyncio.run(main(args))
+
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output} (peak RSS {results['peak_rss_mb']} MB)")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressed = compare(results, json.load(f), args.max_regression)
+        if regressed:
+            print(f"Regressions: {', '.join(regressed)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    run()
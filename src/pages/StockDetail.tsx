@@ -1,4 +1,4 @@
-import React, { useEffect, useState, useRef } from 'react';
+import React, { useEffect, useState } from 'react';
 import { useParams } from 'react-router-dom';
 import { useStockStore } from '../store/useStockStore';
 import { useAuthStore } from '../store/useAuthStore';
@@ -12,10 +12,9 @@ import { cn } from '../lib/utils';
 
 const StockDetail: React.FC = () => {
   const { symbol } = useParams<{ symbol: string }>();
-  const { quote, history, isLoading, error, fetchQuote, fetchHistory } = useStockStore();
+  const { quote, history, isLoading, error, fetchQuote, fetchHistory, subscribeQuote } = useStockStore();
   const { wishlist, addToWishlist, removeFromWishlist } = useAuthStore();
   const [period, setPeriod] = useState('1mo');
-  const pollingInterval = useRef<NodeJS.Timeout | null>(null);
 
   const isWishlisted = quote ? wishlist.includes(quote.symbol) : false;
 
@@ -33,33 +32,11 @@ const StockDetail: React.FC = () => {
       fetchQuote(symbol);
       fetchHistory(symbol, period);
 
-      pollingInterval.current = setInterval(() => {
-        // Only poll if market is OPEN
-        // We check the quote in the store. Since quote updates, this closure might catch old state if not careful,
-        // but useStockStore is external. However, accessing state inside setInterval needs ref or store getter.
-        // A cleaner way is to rely on the fact that if we just fetched, we know the state.
-        
-        // Actually, we should check the current quote's market state before refetching
-        const currentQuote = useStockStore.getState().quote;
-        const marketState = currentQuote?.marketState;
-        
-        // Map yfinance states to isOpen boolean
-        const isOpen = marketState === 'REGULAR' || marketState === 'OPEN' || 
-                       marketState === 'PRE' || marketState === 'POST' ||
-                       marketState === 'PREPRE' || marketState === 'POSTPOST';
-
-        if (isOpen) {
-            fetchQuote(symbol);
-        }
-      }, 10000);
+      // Live updates are pushed by the server instead of polled per tab
+      const unsubscribe = subscribeQuote(symbol);
+      return unsubscribe;
     }
-
-    return () => {
-      if (pollingInterval.current) {
-        clearInterval(pollingInterval.current);
-      }
-    };
-  }, [symbol, period, fetchQuote, fetchHistory]);
+  }, [symbol, period, fetchQuote, fetchHistory, subscribeQuote]);
 
   const periods = [
     { label: '1D', value: '1d' },
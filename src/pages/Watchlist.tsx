@@ -7,6 +7,21 @@ import { getLogoUrl } from '../lib/logo';
 import { API_URL } from '../lib/utils';
 import { formatCurrency } from '../lib/currency';
 
+interface BatchQuote {
+  symbol: string;
+  name: string;
+  price: number;
+  change: number;
+  percent_change: number;
+  currency?: string;
+}
+
+interface BatchQuoteEntry {
+  status: 'ok' | 'error';
+  data?: BatchQuote;
+  error?: string;
+}
+
 interface WatchlistItem {
   symbol: string;
   price: number;
@@ -52,27 +67,28 @@ export default function Watchlist() {
 
       setLoading(true);
       try {
-        // Fetch data for each symbol
-        // In a real app, we'd have a bulk endpoint
-        const promises = wishlist.map(async (symbol) => {
-          try {
-            const res = await fetch(`${API_URL}/api/stock/${symbol}`);
-            if (!res.ok) return null;
-            const quote = await res.json();
-            return {
-              symbol: quote.symbol,
-              name: quote.name,
-              price: quote.price,
-              change: quote.change,
-              changePercent: quote.percent_change,
-              currency: quote.currency || 'USD',
-            };
-          } catch {
-            return null;
-          }
+        // Fetch the whole watchlist in one round trip
+        const res = await fetch(`${API_URL}/api/stock/quotes?symbols=${wishlist.map(encodeURIComponent).join(',')}`);
+        if (!res.ok) {
+          setData([]);
+          return;
+        }
+        const quotes: Record<string, BatchQuoteEntry> = await res.json();
+
+        const results = wishlist.map((symbol) => {
+          const entry = quotes[symbol];
+          if (!entry || entry.status !== 'ok' || !entry.data) return null;
+          const quote = entry.data;
+          return {
+            symbol: quote.symbol,
+            name: quote.name,
+            price: quote.price,
+            change: quote.change,
+            changePercent: quote.percent_change,
+            currency: quote.currency || 'USD',
+          };
         });
 
-        const results = await Promise.all(promises);
         setData(results.filter((item): item is WatchlistItem => item !== null));
       } finally {
         setLoading(false);
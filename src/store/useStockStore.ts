@@ -41,9 +41,29 @@ interface StockState {
   error: string | null;
   fetchQuote: (symbol: string) => Promise<void>;
   fetchHistory: (symbol: string, period?: string) => Promise<void>;
+  subscribeQuote: (symbol: string) => () => void;
 }
 
-export const useStockStore = create<StockState>((set) => ({
+// Upper bound on history points requested for the price chart
+const CHART_MAX_POINTS = 500;
+
+// Backend quote fields streamed by /api/stream/quotes mapped to StockQuote keys
+const STREAM_FIELDS: Record<string, keyof StockQuote> = {
+  price: 'price',
+  change: 'change',
+  percent_change: 'changePercent',
+  volume: 'volume',
+  market_cap: 'marketCap',
+  pe_ratio: 'peRatio',
+  eps: 'eps',
+  day_high: 'dayHigh',
+  day_low: 'dayLow',
+  open: 'open',
+  previous_close: 'previousClose',
+  market_state: 'marketState',
+};
+
+export const useStockStore = create<StockState>((set, get) => ({
   quote: null,
   history: null,
   isLoading: false,
@@ -102,7 +122,8 @@ export const useStockStore = create<StockState>((set) => ({
     try {
       // Map frontend periods to yfinance periods if needed
       // yfinance supports: 1d, 5d, 1mo, 3mo, 6mo, 1y, 2y, 5y, 10y, ytd, max
-      const response = await fetch(`${API_URL}/api/stock/${symbol}/history?period=${period}`);
+      // The area chart can't show more points than it has pixels, let the server pick them
+      const response = await fetch(`${API_URL}/api/stock/${symbol}/history?period=${period}&max_points=${CHART_MAX_POINTS}&mode=line`);
       if (!response.ok) throw new Error('Failed to fetch history');
       
       const data = await response.json();
@@ -111,5 +132,30 @@ export const useStockStore = create<StockState>((set) => ({
       console.error('Failed to fetch history:', error);
       // Don't set global error here to avoid blocking the quote view
     }
+  },
+
+  subscribeQuote: (symbol: string) => {
+    // The server polls upstream once per symbol and pushes only changed fields
+    const source = new EventSource(`${API_URL}/api/stream/quotes/sse?symbols=${encodeURIComponent(symbol)}`);
+
+    const applyChanges = (event: MessageEvent) => {
+      const message = JSON.parse(event.data);
+      const current = get().quote;
+      if (!current || current.symbol !== message.symbol) return;
+
+      const updates: Partial<StockQuote> = { timestamp: Date.now() };
+      for (const [field, value] of Object.entries(message.data)) {
+        const key = STREAM_FIELDS[field];
+        if (key) {
+          (updates as Record<string, unknown>)[key] = value;
+        }
+      }
+      set({ quote: { ...current, ...updates } });
+    };
+
+    source.addEventListener('snapshot', applyChanges);
+    source.addEventListener('update', applyChanges);
+
+    return () => source.close();
   }
 }));
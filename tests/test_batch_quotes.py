@@ -0,0 +1,69 @@
+import asyncio
+import numpy as np
+import pandas as pd
+from api.services import batch_quotes
+
+def bars(closes):
+    closes = np.asarray(closes, dtype=float)
+    return {
+        "Open": closes - 1, "High": closes + 2, "Low": closes - 2,
+        "Close": closes, "Adj Close": closes, "Volume": np.full(len(closes), 1000.0),
+    }
+
+def download(per_symbol):
+    """Frame shaped like yf.download(group_by="ticker")."""
+    index = pd.date_range("2024-01-01", periods=len(next(iter(per_symbol.values()))), tz="UTC")
+    columns = {(symbol, field): values for symbol, fields in per_symbol.items() for field, values in bars(fields).items()}
+    return pd.DataFrame(columns, index=index)
+
+def test_parse_download_prices_each_symbol_from_its_last_two_closes():
+    df = download({"AAPL": [100, 110], "MSFT": [200, 190]})
+    quotes = batch_quotes._parse_download(df, ["AAPL", "MSFT"])
+    assert quotes["AAPL"]["price"] == 110
+    assert quotes["AAPL"]["previous_close"] == 100
+    assert quotes["AAPL"]["change"] == 10
+    assert quotes["AAPL"]["percent_change"] == 10
+    assert quotes["MSFT"]["percent_change"] == -5
+    assert quotes["MSFT"]["day_high"] == 192
+
+def test_parse_download_skips_missing_and_empty_symbols():
+    df = download({"AAPL": [100, 110], "DEAD": [np.nan, np.nan]})
+    quotes = batch_quotes._parse_download(df, ["AAPL", "DEAD", "NOPE"])
+    assert list(quotes) == ["AAPL"]
+
+def test_parse_download_ignores_trailing_nan_bar():
+    df = download({"AAPL": [100, 110, np.nan]})
+    assert batch_quotes._parse_download(df, ["AAPL"])["AAPL"]["price"] == 110
+
+def test_parse_download_single_symbol_frame():
+    df = download({"AAPL": [100, 105]})
+    df.columns = df.columns.droplevel(0)
+    assert batch_quotes._parse_download(df, ["AAPL"])["AAPL"]["price"] == 105
+
+def test_parse_download_single_bar_uses_open_as_previous_close():
+    quote = batch_quotes._parse_download(download({"AAPL": [100]}), ["AAPL"])["AAPL"]
+    assert quote["previous_close"] == 99
+    assert quote["change"] == 1
+
+def test_parse_download_empty_frame():
+    assert batch_quotes._parse_download(pd.DataFrame(), ["AAPL"]) == {}
+
+def test_get_quotes_downloads_only_uncached_symbols(monkeypatch):
+    requested = []
+
+    def fake_download(symbols):
+        requested.append(list(symbols))
+        return download({symbol: [100, 101] for symbol in symbols})
+
+    monkeypatch.setattr(batch_quotes, "_download", fake_download)
+    monkeypatch.setattr(batch_quotes, "quote_cache", batch_quotes.AsyncCache(name="test_batch_quotes", shared=False))
+
+    async def main():
+        first = await batch_quotes.get_quotes(["AAPL", "MSFT", "AAPL"])
+        second = await batch_quotes.get_quotes(["MSFT", "NVDA"])
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert list(first) == ["AAPL", "MSFT"]
+    assert list(second) == ["MSFT", "NVDA"]
+    assert requested == [["AAPL", "MSFT"], ["NVDA"]]
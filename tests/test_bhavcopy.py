@@ -0,0 +1,82 @@
+import os
+import numpy as np
+import pytest
+from api.services import bhavcopy
+
+# Deliverable position report layout: quoted cells, padded headers, Indian digit grouping
+QUOTED = (
+    b'\xef\xbb\xbf"Symbol  ","Series  ","Date  ","Prev Close  ","Open Price  ","High Price  ","Low Price  ",'
+    b'"Last Price  ","Close Price  ","Total Traded Quantity  ","Deliverable Qty  "\r\n'
+    b'"RELIANCE","EQ","02-Jan-2024","2,580.50","2,590.00","2,610.00","2,575.25","2,600.00","2,601.10","23,11,495","-"\r\n'
+    b'"RELIANCE","BE","02-Jan-2024","2,580.50","2,590.00","2,610.00","2,575.25","2,605.00","2,605.00","1,000","500"\r\n'
+    b'"TCS","EQ","02-Jan-2024","3,700.00","3,710.00","3,750.00","3,690.00","3,740.00","3,741.00","5,00,000","2,50,000"\r\n'
+)
+
+# Full bhavcopy layout: plain rows, space padded headers
+PLAIN = (
+    b"SYMBOL, SERIES, DATE1, PREV_CLOSE, OPEN_PRICE, HIGH_PRICE, LOW_PRICE, LAST_PRICE, CLOSE_PRICE, TTL_TRD_QNTY, DELIV_QTY\n"
+    b"INFY, EQ, 02-Jan-2024, 1500.00, 1505.00, 1520.00, 1495.00, 1510.00, 1511.00, 700000, -\n"
+    b"TCS, EQ, 02-Jan-2024, 3700.00, 3710.00, 3750.00, 3690.00, 3745.00, 3746.00, 500000, 250000\n"
+)
+
+def test_normalize_header_aliases():
+    assert bhavcopy.normalize_header("Prev Close  ") == "PrevClose"
+    assert bhavcopy.normalize_header(" PREV_CLOSE") == "PrevClose"
+    assert bhavcopy.normalize_header("TTL_TRD_QNTY") == "TotalTradedQuantity"
+    assert bhavcopy.normalize_header("Unknown Col") == "UNKNOWNCOL"
+
+def test_parse_quoted_layout():
+    table = bhavcopy.parse(QUOTED)
+    assert len(table) == 3
+    rows = table.rows("RELIANCE")
+    assert rows["Series"].tolist() == ["EQ", "BE"]
+    assert rows["PrevClose"][0] == 2580.5
+    assert rows["TotalTradedQuantity"][0] == 2311495
+    assert np.isnan(rows["DeliverableQty"][0])
+    assert table.rows("TCS")["DeliverableQty"][0] == 250000
+
+def test_parse_plain_layout():
+    table = bhavcopy.parse(PLAIN)
+    assert set(table.index) == {"INFY", "TCS"}
+    row = table.latest("INFY")
+    assert row["Date"] == "02-Jan-2024"
+    assert row["LastPrice"] == 1510.0
+    assert np.isnan(row["DeliverableQty"])
+
+def test_latest_prefers_eq_series():
+    assert bhavcopy.parse(QUOTED).latest("RELIANCE")["LastPrice"] == 2600.0
+
+def test_parse_header_only_file():
+    table = bhavcopy.parse(b"SYMBOL,SERIES,CLOSE_PRICE\n")
+    assert len(table) == 0
+    assert "TCS" not in table
+
+def test_parse_rejects_ragged_rows():
+    with pytest.raises(ValueError):
+        bhavcopy.parse(b"SYMBOL,CLOSE_PRICE\nTCS,1,2\n")
+
+def test_load_memory_maps_file(tmp_path):
+    path = tmp_path / "bhav.csv"
+    path.write_bytes(PLAIN)
+    table = bhavcopy.load(str(path))
+    assert table.path == str(path)
+    assert table.mtime == path.stat().st_mtime
+    assert "INFY" in table
+
+def test_offline_quote_later_files_win(tmp_path, monkeypatch):
+    first, second = tmp_path / "a.csv", tmp_path / "b.csv"
+    first.write_bytes(QUOTED)
+    second.write_bytes(PLAIN)
+    monkeypatch.setenv("BHAVCOPY_PATH", f"{first}{os.pathsep}{second}")
+    monkeypatch.setattr(bhavcopy, "_tables", {})
+
+    tcs = bhavcopy.get_offline_quote("TCS.NS")
+    assert tcs["symbol"] == "TCS.NS"
+    assert tcs["price"] == 3745.0
+    assert tcs["change"] == 45.0
+    assert tcs["currency"] == "INR"
+
+    reliance = bhavcopy.get_offline_quote("RELIANCE.NS")
+    assert reliance["price"] == 2600.0
+    assert reliance["volume"] == 2311495
+    assert bhavcopy.get_offline_quote("NOPE.NS") is None
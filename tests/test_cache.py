@@ -0,0 +1,193 @@
+import asyncio
+from api.services import cache as cache_module
+from api.services.cache import AsyncCache
+
+def local_cache(**kwargs):
+    return AsyncCache(name="test_cache", shared=False, **kwargs)
+
+def age(cache, key, seconds):
+    """Make key's entry seconds older."""
+    cache.cache[key].timestamp -= seconds
+
+def test_fresh_entry_is_a_hit():
+    cache = local_cache(ttl_seconds=60)
+
+    async def main():
+        await cache.set("k", {"price": 1})
+        return await cache.get("k")
+
+    assert asyncio.run(main()) == {"price": 1}
+    assert (cache.hits, cache.misses) == (1, 0)
+
+def test_entry_past_soft_ttl_is_not_fresh_but_still_stale():
+    cache = local_cache(ttl_seconds=60, stale_ttl_seconds=600)
+
+    async def main():
+        await cache.set("k", 1)
+        age(cache, "k", 61)
+        return await cache.get("k"), await cache.get_stale("k")
+
+    assert asyncio.run(main()) == (None, 1)
+
+def test_entry_past_hard_ttl_is_gone():
+    cache = local_cache(ttl_seconds=60, stale_ttl_seconds=600)
+
+    async def main():
+        await cache.set("k", 1)
+        age(cache, "k", 601)
+        return await cache.get_stale("k")
+
+    assert asyncio.run(main()) is None
+    assert "k" not in cache.cache
+    assert cache.expirations == 1
+
+def test_get_or_fetch_coalesces_misses():
+    cache = local_cache(ttl_seconds=60)
+    fetches = 0
+
+    async def fetch():
+        nonlocal fetches
+        fetches += 1
+        await asyncio.sleep(0.01)
+        await cache.set("k", "value")
+        return "value"
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_fetch("k", fetch) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["value"] * 5
+    assert fetches == 1
+
+def test_get_or_fetch_serves_stale_and_refreshes_in_background():
+    cache = local_cache(ttl_seconds=60, stale_ttl_seconds=600)
+
+    async def fetch():
+        await cache.set("k", "new")
+        return "new"
+
+    async def main():
+        await cache.set("k", "old")
+        age(cache, "k", 61)
+        served = await cache.get_or_fetch("k", fetch)
+        await asyncio.gather(*cache.refreshing)
+        return served, await cache.get("k")
+
+    assert asyncio.run(main()) == ("old", "new")
+    assert cache.stale_hits == 1
+
+def test_empty_results_are_cached():
+    cache = local_cache(ttl_seconds=60)
+    fetches = 0
+
+    async def fetch():
+        nonlocal fetches
+        fetches += 1
+        await cache.set("k", [])
+        return []
+
+    async def main():
+        for _ in range(3):
+            assert await cache.get_or_fetch("k", fetch) == []
+
+    asyncio.run(main())
+    assert fetches == 1
+
+def test_fetch_may_decline_to_cache():
+    cache = local_cache(ttl_seconds=60)
+    fetches = 0
+
+    async def fetch():
+        nonlocal fetches
+        fetches += 1
+        return "fallback"
+
+    async def main():
+        for _ in range(2):
+            assert await cache.get_or_fetch("k", fetch) == "fallback"
+
+    asyncio.run(main())
+    assert fetches == 2
+
+def test_lru_entry_is_evicted_past_max_entries():
+    cache = local_cache(max_entries=2)
+
+    async def main():
+        await cache.set("a", 1)
+        await cache.set("b", 2)
+        await cache.get("a") # a is now the most recently used
+        await cache.set("c", 3)
+
+    asyncio.run(main())
+    assert list(cache.cache) == ["a", "c"]
+    assert cache.evictions == 1
+
+def test_entries_are_evicted_past_max_bytes():
+    cache = local_cache(max_bytes=2000)
+
+    async def main():
+        for i in range(10):
+            await cache.set(f"k{i}", "x" * 400)
+
+    asyncio.run(main())
+    assert cache.bytes <= 2000
+    assert sum(entry.size for entry in cache.cache.values()) == cache.bytes
+    assert "k9" in cache.cache and "k0" not in cache.cache
+
+def test_purge_expired_drops_only_expired_entries():
+    cache = local_cache(ttl_seconds=60, stale_ttl_seconds=600)
+
+    async def main():
+        await cache.set("old", 1)
+        await cache.set("new", 2)
+
+    asyncio.run(main())
+    age(cache, "old", 601)
+    cache.purge_expired()
+    assert list(cache.cache) == ["new"]
+    assert cache.expirations == 1
+
+def test_sweeper_purges_idle_caches(monkeypatch):
+    cache = local_cache(ttl_seconds=60, stale_ttl_seconds=600, sweep_interval=0)
+    monkeypatch.setattr(cache_module, "SWEEP_TICK", 0.01)
+
+    async def main():
+        await cache.set("k", 1)
+        age(cache, "k", 601)
+        sweeper = asyncio.ensure_future(cache_module.run_sweeper())
+        await asyncio.sleep(0.05)
+        sweeper.cancel()
+
+    asyncio.run(main())
+    assert "k" not in cache.cache
+
+def test_attach_body_counts_against_max_bytes():
+    cache = local_cache()
+
+    async def main():
+        await cache.set("k", 1)
+
+    asyncio.run(main())
+    entry = cache.peek("k")
+    before = cache.bytes
+    cache.attach_body("k", entry, b"x" * 100, 'W/"tag"')
+    assert cache.bytes == before + 100
+    cache.attach_body("k", entry, b"x" * 40, 'W/"tag2"')
+    assert cache.bytes == before + 40
+    assert sum(e.size for e in cache.cache.values()) == cache.bytes
+
+def test_attach_body_to_a_dead_entry_is_not_counted():
+    cache = local_cache()
+
+    async def main():
+        await cache.set("evicted", 1)
+        await cache.set("replaced", 2)
+        evicted, replaced = cache.peek("evicted"), cache.peek("replaced")
+        cache._remove("evicted")
+        await cache.set("replaced", 3)
+        return evicted, replaced
+
+    evicted, replaced = asyncio.run(main())
+    cache.attach_body("evicted", evicted, b"x" * 100, 'W/"a"')
+    cache.attach_body("replaced", replaced, b"x" * 100, 'W/"b"')
+    assert evicted.body is not None
+    assert sum(e.size for e in cache.cache.values()) == cache.bytes
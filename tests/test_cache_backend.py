@@ -0,0 +1,163 @@
+import asyncio
+import time
+import fakeredis
+import numpy as np
+import pytest
+from api.services import cache as cache_module
+from api.services.cache import AsyncCache
+from api.services.cache_backend import RedisBackend
+
+@pytest.fixture(autouse=True)
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(cache_module, "LOCK_POLL_INTERVAL", 0.01)
+
+def backend(server=None):
+    return RedisBackend(client=fakeredis.FakeAsyncRedis(server=server or fakeredis.FakeServer()), prefix="test")
+
+def process_caches(shared, count=2, **kwargs):
+    """Caches with the same name on one backend, as in separate processes."""
+    kwargs.setdefault("ttl_seconds", 60)
+    kwargs.setdefault("stale_ttl_seconds", 600)
+    return [AsyncCache(name="shared", backend=shared, **kwargs) for _ in range(count)]
+
+def test_set_is_written_through_and_read_back():
+    async def main():
+        shared = backend()
+        a, b = process_caches(shared)
+        await a.set("AAPL", {"price": 190.5, "volume": np.int64(10)})
+        value = await b.get("AAPL")
+        return value, b
+
+    value, b = asyncio.run(main())
+    assert value == {"price": 190.5, "volume": 10}
+    assert (b.l2_hits, b.hits) == (1, 1)
+
+def test_stored_timestamp_drives_the_ttls():
+    async def main():
+        shared = backend()
+        cache, = process_caches(shared, count=1)
+        set_at = time.time() - 120 # past the soft TTL, within the hard one
+        await shared.set_many("shared", {"old": ({"price": 1}, set_at)}, 600)
+        await shared.set_many("shared", {"gone": ({"price": 2}, time.time() - 601)}, 600)
+        fresh = await cache.get("old")
+        stale = await cache.get_stale("old")
+        gone = await cache.get_stale("gone")
+        return cache, set_at, fresh, stale, gone
+
+    cache, set_at, fresh, stale, gone = asyncio.run(main())
+    assert fresh is None
+    assert stale == {"price": 1}
+    assert cache.peek("old").timestamp == set_at
+    assert gone is None and cache.peek("gone") is None
+
+def test_entries_expire_from_redis_with_the_hard_ttl():
+    async def main():
+        shared = backend()
+        cache, = process_caches(shared, count=1, ttl_seconds=1, stale_ttl_seconds=5)
+        await cache.set("k", 1)
+        return await shared.client.pttl("test:shared:k")
+
+    assert 0 < asyncio.run(main()) <= 5000
+
+def test_get_many_uses_one_mget():
+    async def main():
+        shared = backend()
+        a, b = process_caches(shared)
+        await a.set_many({"x": 1, "y": 2})
+        calls = []
+        mget = shared.client.mget
+
+        async def counting_mget(keys, *args):
+            calls.append(list(keys))
+            return await mget(keys, *args)
+
+        shared.client.mget = counting_mget
+        return await b.get_many(["x", "y", "z"]), calls
+
+    values, calls = asyncio.run(main())
+    assert values == {"x": 1, "y": 2}
+    assert calls == [["test:shared:x", "test:shared:y", "test:shared:z"]]
+
+def test_lock_is_exclusive_and_released_only_by_its_holder():
+    async def main():
+        shared = backend()
+        token = await shared.acquire_lock("shared", "k", 30)
+        second = await shared.acquire_lock("shared", "k", 30)
+        ttl = await shared.client.pttl("test:lock:shared:k")
+        await shared.release_lock("shared", "k", "someone-else")
+        still_locked = await shared.is_locked("shared", "k")
+        await shared.release_lock("shared", "k", token)
+        return token, second, ttl, still_locked, await shared.is_locked("shared", "k")
+
+    token, second, ttl, still_locked, locked = asyncio.run(main())
+    assert token and second is None
+    assert 0 < ttl <= 30000
+    assert still_locked and not locked
+
+def test_waiter_gets_the_lock_holders_value():
+    fetches = []
+
+    def fetcher(cache, name):
+        async def fetch():
+            fetches.append(name)
+            await asyncio.sleep(0.05)
+            await cache.set("k", name)
+            return name
+        return fetch
+
+    async def main():
+        a, b = process_caches(backend())
+        holder = asyncio.ensure_future(a.get_or_fetch("k", fetcher(a, "a")))
+        await asyncio.sleep(0.01)
+        waiter = await b.get_or_fetch("k", fetcher(b, "b"))
+        return await holder, waiter, b
+
+    held, waited, b = asyncio.run(main())
+    assert (held, waited) == ("a", "a")
+    assert fetches == ["a"]
+    assert b.lock_waits == 1
+
+def test_waiter_fetches_itself_when_the_holder_does_not_cache():
+    async def main():
+        a, b = process_caches(backend())
+
+        async def uncached():
+            await asyncio.sleep(0.05)
+            return "fallback"
+
+        async def fetch_b():
+            await b.set("k", "b")
+            return "b"
+
+        holder = asyncio.ensure_future(a.get_or_fetch("k", uncached))
+        await asyncio.sleep(0.01)
+        return await holder, await b.get_or_fetch("k", fetch_b)
+
+    assert asyncio.run(main()) == ("fallback", "b")
+
+def test_redis_outage_degrades_to_local_caching():
+    server = fakeredis.FakeServer()
+    server.connected = False
+    fetches = 0
+
+    async def main():
+        nonlocal fetches
+        shared = backend(server)
+        cache, = process_caches(shared, count=1)
+
+        async def fetch():
+            nonlocal fetches
+            fetches += 1
+            await cache.set("k", "value")
+            return "value"
+
+        assert await cache.get("missing") is None
+        assert await cache.get_many(["missing"]) == {}
+        first = await cache.get_or_fetch("k", fetch)
+        second = await cache.get_or_fetch("k", fetch)
+        return shared, first, second
+
+    shared, first, second = asyncio.run(main())
+    assert (first, second) == ("value", "value")
+    assert fetches == 1
+    assert shared.errors > 0
@@ -0,0 +1,63 @@
+import asyncio
+import threading
+import pytest
+from api.services import executors
+from api.services.executors import BoundedExecutor, ExecutorOverloaded
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(executors, "registry", [])
+    pool = BoundedExecutor("test", max_workers=1, max_queue=1)
+    yield pool
+    pool.shutdown()
+
+def test_runs_on_the_pool_thread(pool):
+    name = asyncio.run(pool.run(lambda: threading.current_thread().name))
+    assert name.startswith("test-worker")
+    assert pool.stats()["completed"] == 1
+
+def test_overloaded_once_the_queue_bound_is_hit(pool):
+    release = threading.Event()
+
+    async def main():
+        running = asyncio.ensure_future(pool.run(release.wait))
+        queued = asyncio.ensure_future(pool.run(lambda: "queued"))
+        await asyncio.sleep(0.01)
+        with pytest.raises(ExecutorOverloaded):
+            await pool.run(lambda: "shed")
+        stats = pool.stats()
+        release.set()
+        return stats, await running, await queued
+
+    stats, running, queued = asyncio.run(main())
+    assert (stats["running"], stats["queued"], stats["rejected"]) == (1, 1, 1)
+    assert (running, queued) == (True, "queued")
+    assert pool.pending == 0
+
+def test_cancelled_queued_job_frees_its_slot(pool):
+    release = threading.Event()
+    ran = []
+
+    async def main():
+        running = asyncio.ensure_future(pool.run(release.wait))
+        queued = asyncio.ensure_future(pool.run(lambda: ran.append("queued")))
+        await asyncio.sleep(0.01)
+        queued.cancel()
+        await asyncio.sleep(0.01)
+        # The dropped job's slot is free again
+        again = asyncio.ensure_future(pool.run(lambda: "again"))
+        release.set()
+        return await running, await again
+
+    assert asyncio.run(main()) == (True, "again")
+    assert ran == []
+    assert pool.pending == 0
+
+def test_failures_are_counted_and_raised(pool):
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        asyncio.run(pool.run(fail))
+    assert pool.stats()["failed"] == 1
+    assert pool.pending == 0
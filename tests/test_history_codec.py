@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+from api.services import history_codec
+
+def history(count=10, tz="America/New_York", freq="D", start="2024-03-01"):
+    index = pd.date_range(start, periods=count, freq=freq, tz=tz)
+    close = 100 + np.sin(np.arange(count)) * 10
+    return pd.DataFrame({
+        "Open": close - 1, "High": close + 2, "Low": close - 2, "Close": close,
+        "Volume": np.arange(count, dtype=float) * 100,
+    }, index=index)
+
+def test_iso_dates_match_isoformat_across_dst():
+    frame = history(30) # spans the March DST change in New York
+    assert list(history_codec.iso_dates(frame.index)) == [ts.isoformat() for ts in frame.index]
+
+def test_iso_dates_of_naive_index():
+    frame = history(3, tz=None)
+    assert list(history_codec.iso_dates(frame.index)) == [ts.isoformat() for ts in frame.index]
+
+def test_to_records_matches_per_row_encoding():
+    frame = history(5, tz="Asia/Kolkata", freq="15min", start="2024-01-02 09:15")
+    expected = [
+        {"date": ts.isoformat(), "open": row.Open, "high": row.High, "low": row.Low, "close": row.Close, "volume": row.Volume}
+        for ts, row in zip(frame.index, frame.itertuples())
+    ]
+    assert history_codec.to_records(frame) == expected
+
+def test_nan_is_sent_as_null():
+    frame = history(3)
+    frame.iloc[1, frame.columns.get_loc("Close")] = np.nan
+    assert history_codec.to_records(frame)[1]["close"] is None
+    assert history_codec.to_columnar(frame)["close"][1] is None
+
+def test_to_columnar_timestamps_are_epoch_seconds():
+    frame = history(3)
+    data = history_codec.to_columnar(frame)
+    assert data["timestamps"] == [int(ts.timestamp()) for ts in frame.index]
+    assert data["volume"] == frame["Volume"].tolist()
+
+def test_to_binary_layout():
+    frame = history(4)
+    data = history_codec.to_binary(frame)
+    assert data[:4] == history_codec.BINARY_MAGIC
+    count = int(np.frombuffer(data[4:8], dtype="<u4")[0])
+    timestamps = np.frombuffer(data[8:8 + 8 * count], dtype="<i8")
+    values = np.frombuffer(data[8 + 8 * count:], dtype="<f8").reshape(5, count)
+    assert count == 4
+    assert timestamps.tolist() == [int(ts.timestamp()) for ts in frame.index]
+    assert values[3].tolist() == frame["Close"].tolist()
+    assert values[4].tolist() == frame["Volume"].tolist()
+
+def test_empty_history():
+    empty = history(0)
+    assert history_codec.to_records(empty) == []
+    assert history_codec.to_columnar(empty)["timestamps"] == []
+    assert history_codec.to_binary(empty) == history_codec.BINARY_MAGIC + bytes(4)
+
+def test_aggregate_ohlc_matches_per_bucket_reference():
+    frame = history(103)
+    result = history_codec.aggregate_ohlc(frame, 10)
+    assert len(result) == 10
+    starts = [i * 103 // 10 for i in range(10)]
+    for row, (lo, hi) in enumerate(zip(starts, starts[1:] + [103])):
+        bucket = frame.iloc[lo:hi]
+        assert result.index[row] == bucket.index[0]
+        assert result["Open"].iloc[row] == bucket["Open"].iloc[0]
+        assert result["High"].iloc[row] == bucket["High"].max()
+        assert result["Low"].iloc[row] == bucket["Low"].min()
+        assert result["Close"].iloc[row] == bucket["Close"].iloc[-1]
+        assert result["Volume"].iloc[row] == bucket["Volume"].sum()
+
+def test_lttb_keeps_first_last_and_extremes():
+    frame = history(500)
+    frame.iloc[250, frame.columns.get_loc("Close")] = 1000 # a spike the line must not lose
+    result = history_codec.lttb(frame, 50)
+    assert len(result) == 50
+    assert result.index[0] == frame.index[0]
+    assert result.index[-1] == frame.index[-1]
+    assert result.index.is_monotonic_increasing and result.index.is_unique
+    assert frame.index[250] in result.index
+
+def test_lttb_with_fewer_than_three_points():
+    frame = history(10)
+    assert list(history_codec.lttb(frame, 2).index) == [frame.index[0], frame.index[-1]]
+    assert list(history_codec.lttb(frame, 1).index) == [frame.index[0]]
+
+def test_downsample_leaves_short_history_alone():
+    frame = history(20)
+    assert history_codec.downsample(frame, 20).equals(frame)
+    assert history_codec.downsample(frame, 0).equals(frame)
+
+def test_downsample_drops_bars_without_a_close():
+    frame = history(20)
+    frame.iloc[5, frame.columns.get_loc("Close")] = np.nan
+    result = history_codec.downsample(frame, 100)
+    assert len(result) == 19
+    assert frame.index[5] not in result.index
+
+def test_downsample_modes():
+    frame = history(300)
+    assert len(history_codec.downsample(frame, 30, "line")) == 30
+    candles = history_codec.downsample(frame, 30, "candle")
+    assert len(candles) == 30
+    assert candles["Volume"].sum() == frame["Volume"].sum()
+
+def test_downsample_of_failed_fetch():
+    empty = pd.DataFrame()
+    for mode in history_codec.MODES:
+        assert history_codec.downsample(empty, 100, mode) is empty
+    assert history_codec.encode(history_codec.downsample(empty, 100), "columnar")["timestamps"] == []
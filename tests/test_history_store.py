@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+import pytest
+from api.services import history_store
+
+def daily_bars(count):
+    """count sessions of daily bars up to today, at midnight New York time like Yahoo's."""
+    today = pd.Timestamp.now(tz="America/New_York").normalize()
+    index = pd.bdate_range(end=today.tz_localize(None), periods=count).tz_localize("America/New_York")
+    close = np.linspace(100, 200, count)
+    return pd.DataFrame({
+        "Open": close - 1, "High": close + 1, "Low": close - 2, "Close": close,
+        "Volume": np.full(count, 1000.0), "Dividends": 0.0, "Stock Splits": 0.0,
+    }, index=index)
+
+class FakeYahoo:
+    """Serves self.data the way Ticker.history does, and records each request."""
+
+    def __init__(self, data):
+        self.data = data
+        self.calls = []
+
+    def __call__(self, symbol, period=None, start=None, interval=None):
+        self.calls.append({"period": period} if period else {"start": pd.Timestamp(start)})
+        if start is not None:
+            return self.data[self.data.index >= pd.Timestamp(start)]
+        if period == "max":
+            return self.data
+        if history_store.session_count(period):
+            return self.data.iloc[-history_store.session_count(period):]
+        since = history_store.required_start(period, pd.Timestamp.now(tz="UTC"))
+        return self.data[self.data.index >= pd.Timestamp(since, unit="s", tz="UTC")]
+
+@pytest.fixture
+def yahoo(tmp_path, monkeypatch):
+    monkeypatch.setattr(history_store, "DB_PATH", str(tmp_path / "history.sqlite3"))
+    monkeypatch.setattr(history_store, "_initialized", False)
+    monkeypatch.setattr(history_store, "REFRESH_SECONDS", 3600)
+    fake = FakeYahoo(daily_bars(400))
+    monkeypatch.setattr(history_store, "_yahoo_history", fake)
+    return fake
+
+def sync(period):
+    return history_store._sync_history("AAPL", period, "1d")
+
+def backdate_last_fetch(seconds):
+    conn = history_store._connect()
+    conn.execute("UPDATE series SET last_fetch = last_fetch - ?", (seconds,))
+    conn.commit()
+    conn.close()
+
+def test_first_request_downloads_the_period_once(yahoo):
+    first = sync("1y")
+    second = sync("1y")
+    assert yahoo.calls == [{"period": "1y"}]
+    expected = yahoo("AAPL", period="1y")[["Open", "High", "Low", "Close", "Volume"]]
+    assert first.index.equals(expected.index)
+    assert np.allclose(first.to_numpy(), expected.to_numpy())
+    assert second.equals(first)
+    assert str(first.index.tz) == "America/New_York"
+
+def test_stale_series_fetches_only_the_tail(yahoo):
+    yahoo.data = daily_bars(400).iloc[:-2]
+    sync("1y")
+    last = yahoo.data.index[-1]
+    yahoo.data = daily_bars(400)
+    backdate_last_fetch(3600)
+    result = sync("1y")
+    assert yahoo.calls[1:] == [{"start": last}]
+    assert result.index[-1] == yahoo.data.index[-1]
+    assert len(result) == len(yahoo("AAPL", period="1y"))
+
+def test_shorter_periods_are_answered_from_a_covering_download(yahoo):
+    sync("1y")
+    month = sync("1mo")
+    ytd = sync("ytd")
+    assert yahoo.calls == [{"period": "1y"}]
+    assert len(month) == len(yahoo("AAPL", period="1mo"))
+    assert len(ytd) == len(yahoo("AAPL", period="ytd"))
+
+def test_max_is_only_covered_by_max(yahoo):
+    sync("1y")
+    assert len(sync("max")) == 400
+    sync("2y")
+    assert yahoo.calls == [{"period": "1y"}, {"period": "max"}]
+
+def test_nd_periods_are_sliced_to_sessions(yahoo):
+    five = sync("5d")
+    assert len(five) == 5
+    assert sync("5d").equals(five)
+    assert len(sync("10d")) == 10
+    assert yahoo.calls == [{"period": "5d"}, {"period": "10d"}]
+    # 10 sessions are stored now, so 5 more days are answered locally
+    assert len(sync("5d")) == 5
+    assert len(yahoo.calls) == 2
+
+def test_nd_period_is_covered_by_a_longer_download(yahoo):
+    sync("1mo")
+    assert sync("5d").index.equals(yahoo.data.index[-5:])
+    assert yahoo.calls == [{"period": "1mo"}]
+
+def test_empty_download_records_no_coverage(yahoo):
+    yahoo.data = daily_bars(400).iloc[:0]
+    assert sync("1y").empty
+    yahoo.data = daily_bars(400)
+    assert len(sync("1y")) > 0
+    assert yahoo.calls == [{"period": "1y"}, {"period": "1y"}]
+
+def test_new_split_refetches_the_whole_series(yahoo):
+    yahoo.data = daily_bars(400).iloc[:-2]
+    sync("1y")
+    # A 2:1 split two sessions ago; Yahoo now serves the old bars halved
+    adjusted = daily_bars(400)
+    adjusted.iloc[:-2, :4] /= 2
+    adjusted.iloc[-2, adjusted.columns.get_loc("Stock Splits")] = 2.0
+    yahoo.data = adjusted
+    backdate_last_fetch(10 * 86400)
+
+    result = sync("1y")
+    assert yahoo.calls[1:] == [{"start": adjusted.index[-3]}, {"period": "1y"}]
+    expected = yahoo("AAPL", period="1y")
+    assert np.allclose(result["Close"].to_numpy(), expected["Close"].to_numpy())
+
+def test_old_dividend_in_the_tail_does_not_refetch(yahoo):
+    data = daily_bars(400)
+    data.iloc[-1, data.columns.get_loc("Dividends")] = 0.5
+    yahoo.data = data
+    sync("1y")
+    backdate_last_fetch(3600) # the dividend bar predates the last sync
+    sync("1y")
+    assert yahoo.calls == [{"period": "1y"}, {"start": data.index[-1]}]
+
+def test_session_count():
+    assert history_store.session_count("5d") == 5
+    assert history_store.session_count("ytd") is None
+    assert history_store.session_count("1mo") is None
+
+def test_has_corporate_action():
+    data = daily_bars(5)
+    since = int(data.index[2].timestamp())
+    assert not history_store._has_corporate_action(data, since)
+    data.iloc[1, data.columns.get_loc("Dividends")] = 0.3
+    assert not history_store._has_corporate_action(data, since)
+    data.iloc[3, data.columns.get_loc("Stock Splits")] = 4.0
+    assert history_store._has_corporate_action(data, since)
+    assert not history_store._has_corporate_action(data[["Close"]], 0)
@@ -0,0 +1,91 @@
+import asyncio
+import re
+import pytest
+from fastapi.testclient import TestClient
+from api.main import app
+from api.services import http_cache, market_service, snapshot_service, stock_service
+from api.services.cache import AsyncCache
+
+QUOTE = {"symbol": "AAPL", "price": 190.5, "change": 1.5}
+
+@pytest.fixture
+def client():
+    # No lifespan: no scheduler, sweeper or warm-up
+    return TestClient(app)
+
+@pytest.fixture
+def caches(monkeypatch):
+    quotes = AsyncCache(ttl_seconds=60, stale_ttl_seconds=900, name="test_quote_cache", shared=False)
+    degraded = AsyncCache(ttl_seconds=10, name="test_degraded_quote_cache", shared=False)
+    market = AsyncCache(ttl_seconds=300, stale_ttl_seconds=1800, name="test_market_cache", shared=False)
+    monkeypatch.setattr(stock_service, "quote_cache", quotes)
+    monkeypatch.setattr(stock_service, "degraded_quote_cache", degraded)
+    monkeypatch.setattr(market_service, "market_cache", market)
+    return quotes, degraded, market
+
+def max_age(response):
+    return int(re.search(r"max-age=(\d+)", response.headers["cache-control"]).group(1))
+
+def test_etag_is_weak_and_stable():
+    etag = http_cache.compute_etag(b'{"a":1}')
+    assert re.fullmatch(r'W/"[0-9a-f]{24}"', etag)
+    assert http_cache.compute_etag(b'{"a":1}') == etag
+    assert http_cache.compute_etag(b'{"a":2}') != etag
+
+def test_matching_if_none_match_gets_304(client, caches):
+    asyncio.run(caches[0].set("AAPL", QUOTE))
+    first = client.get("/api/stock/AAPL")
+    assert first.status_code == 200
+    assert first.json() == QUOTE
+    etag = first.headers["etag"]
+
+    for header in (etag, etag.removeprefix("W/"), f'"other", {etag}', "*"):
+        again = client.get("/api/stock/AAPL", headers={"If-None-Match": header})
+        assert again.status_code == 304, header
+        assert again.content == b""
+        assert again.headers["etag"] == etag
+    assert client.get("/api/stock/AAPL", headers={"If-None-Match": '"other"'}).status_code == 200
+
+def test_body_is_encoded_once_per_entry(client, caches):
+    asyncio.run(caches[0].set("AAPL", QUOTE))
+    client.get("/api/stock/AAPL")
+    entry = caches[0].peek("AAPL")
+    assert entry.body == http_cache.encode(QUOTE)
+    assert client.get("/api/stock/AAPL").headers["etag"] == entry.etag
+
+def test_cached_quote_headers_follow_the_entry(client, caches):
+    asyncio.run(caches[0].set("AAPL", QUOTE))
+    caches[0].peek("AAPL").timestamp -= 20
+    response = client.get("/api/stock/AAPL")
+    assert 39 <= max_age(response) <= 40
+    assert "stale-while-revalidate=840" in response.headers["cache-control"]
+
+def test_degraded_quote_gets_the_short_ttl(client, caches, monkeypatch):
+    asyncio.run(caches[1].set("AAPL", QUOTE))
+
+    async def get_quote(symbol):
+        return await caches[1].get(symbol)
+
+    monkeypatch.setattr(stock_service, "get_quote", get_quote)
+    response = client.get("/api/stock/AAPL")
+    assert 9 <= max_age(response) <= 10
+    assert "stale-while-revalidate" not in response.headers["cache-control"]
+
+def test_uncached_responses_must_revalidate(client, caches, monkeypatch):
+    async def get_quotes(symbols):
+        return {symbol: {"status": "ok", "data": QUOTE} for symbol in symbols}
+
+    async def get_history(*args):
+        return []
+
+    monkeypatch.setattr(stock_service, "get_quotes", get_quotes)
+    monkeypatch.setattr(stock_service, "get_history", get_history)
+    assert client.get("/api/stock/quotes?symbols=AAPL").headers["cache-control"] == "no-cache"
+    assert client.get("/api/stock/AAPL/history").headers["cache-control"] == "no-cache"
+
+def test_snapshot_view_gets_the_cache_ttls(client, caches, monkeypatch):
+    view = [{"symbol": "^GSPC", "price": 5000.0}]
+    monkeypatch.setattr(snapshot_service, "get", lambda key: view if key == "global_overview" else None)
+    response = client.get("/api/market/overview")
+    assert response.json() == view
+    assert response.headers["cache-control"] == "public, max-age=300, stale-while-revalidate=1500"
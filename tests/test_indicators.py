@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+from api.services import indicators
+
+NAMES = list(indicators.INDICATORS)
+
+def history(count, start="2024-01-02 09:15"):
+    # Intraday bars over several sessions, so VWAP resets are exercised
+    index = pd.date_range(start, periods=count, freq="2h", tz="Asia/Kolkata")
+    rng = np.random.default_rng(7)
+    close = 100 + np.cumsum(rng.normal(0, 1, count))
+    return pd.DataFrame({
+        "Open": close + rng.normal(0, 0.5, count), "High": close + 1, "Low": close - 1,
+        "Close": close, "Volume": rng.integers(100, 1000, count).astype(float),
+    }, index=index)
+
+def assert_same_series(a, b):
+    assert a.keys() == b.keys()
+    for name in a:
+        assert a[name].keys() == b[name].keys()
+        for field in a[name]:
+            assert np.allclose(a[name][field], b[name][field], equal_nan=True), (name, field)
+
+def test_appended_bars_match_full_compute():
+    full = history(120)
+    previous = indicators.compute(full.iloc[:100], NAMES, indicators.DEFAULT_PARAMS)
+    updated = indicators.compute(full, NAMES, indicators.DEFAULT_PARAMS, previous)
+    assert updated["updated_from"] == 99
+    assert_same_series(updated["series"], indicators.compute(full, NAMES, indicators.DEFAULT_PARAMS)["series"])
+
+def test_revised_last_bar_is_recomputed():
+    full = history(60)
+    previous = indicators.compute(full, NAMES, indicators.DEFAULT_PARAMS)
+    revised = full.copy()
+    revised.iloc[-1, revised.columns.get_loc("Close")] += 5
+    updated = indicators.compute(revised, NAMES, indicators.DEFAULT_PARAMS, previous)
+    assert updated["updated_from"] == 59
+    assert_same_series(updated["series"], indicators.compute(revised, NAMES, indicators.DEFAULT_PARAMS)["series"])
+
+def test_unchanged_history_returns_previous_state():
+    full = history(40)
+    previous = indicators.compute(full, NAMES, indicators.DEFAULT_PARAMS)
+    assert indicators.compute(full, NAMES, indicators.DEFAULT_PARAMS, previous) is previous
+
+def test_moved_window_resumes_from_the_stored_bars():
+    full = history(80)
+    previous = indicators.compute(full.iloc[:60], NAMES, indicators.DEFAULT_PARAMS)
+    # A rolling period: 10 bars dropped from the head, 20 new ones at the tail
+    updated = indicators.compute(full.iloc[10:], NAMES, indicators.DEFAULT_PARAMS, previous)
+    assert updated["updated_from"] == 49
+    # The kept bars were warmed up on the dropped ones, as in a compute over everything
+    expected = indicators.compute(full, NAMES, indicators.DEFAULT_PARAMS)["series"]
+    expected = {name: {field: values[10:] for field, values in fields.items()} for name, fields in expected.items()}
+    assert_same_series(updated["series"], expected)
+    assert len(updated["response"]["sma"]) == 70
+
+def test_window_moved_with_no_new_bars():
+    full = history(60)
+    previous = indicators.compute(full, NAMES, indicators.DEFAULT_PARAMS)
+    updated = indicators.compute(full.iloc[5:], NAMES, indicators.DEFAULT_PARAMS, previous)
+    assert updated["updated_from"] == 54
+    assert np.allclose(updated["series"]["ema"]["ema"], previous["series"]["ema"]["ema"][5:])
+
+def test_rebased_history_starts_over():
+    full = history(80)
+    previous = indicators.compute(full.iloc[10:], NAMES, indicators.DEFAULT_PARAMS)
+    assert indicators.compute(full, NAMES, indicators.DEFAULT_PARAMS, previous)["updated_from"] == 0
+    shifted = full.iloc[10:].copy()
+    shifted.index = shifted.index + pd.Timedelta(minutes=1)
+    assert indicators.compute(shifted, NAMES, indicators.DEFAULT_PARAMS, previous)["updated_from"] == 0
+
+def test_sma_and_bollinger_match_pandas():
+    full = history(50)
+    series = indicators.compute(full, ["sma", "bollinger"], indicators.DEFAULT_PARAMS)["series"]
+    rolling = full["Close"].rolling(20)
+    assert np.allclose(series["sma"]["sma"], rolling.mean(), equal_nan=True)
+    assert np.allclose(series["bollinger"]["upper"], rolling.mean() + 2 * rolling.std(ddof=0), equal_nan=True)
+
+def test_ema_and_rsi_match_pandas():
+    full = history(50)
+    series = indicators.compute(full, ["ema", "rsi"], indicators.DEFAULT_PARAMS)["series"]
+    assert np.allclose(series["ema"]["ema"], full["Close"].ewm(span=20, adjust=False).mean())
+    delta = full["Close"].diff()
+    gain = delta.clip(lower=0).iloc[1:].ewm(alpha=1 / 14, adjust=False).mean()
+    loss = (-delta).clip(lower=0).iloc[1:].ewm(alpha=1 / 14, adjust=False).mean()
+    expected = 100 - 100 / (1 + gain / loss)
+    assert np.isnan(series["rsi"]["rsi"][:14]).all()
+    assert np.allclose(series["rsi"]["rsi"][14:], expected.iloc[13:])
+
+def test_vwap_resets_each_session():
+    full = history(30)
+    vwap = indicators.compute(full, ["vwap"], indicators.DEFAULT_PARAMS)["series"]["vwap"]["vwap"]
+    typical = (full["High"] + full["Low"] + full["Close"]) / 3
+    day = full.index.normalize()
+    expected = (typical * full["Volume"]).groupby(day).cumsum() / full["Volume"].groupby(day).cumsum()
+    assert np.allclose(vwap, expected)
+
+def test_response_hides_internal_fields():
+    response = indicators.compute(history(30), ["rsi", "macd"], indicators.DEFAULT_PARAMS)["response"]
+    assert len(response["rsi"]) == 30
+    assert set(response["macd"]) == {"macd", "signal", "histogram"}
+    assert response["rsi"][0] is None
@@ -0,0 +1,57 @@
+from api.services import movers
+from api.services.movers import MoversUniverse
+
+def quote(percent):
+    return {"price": 100 + percent, "change": percent, "percent_change": percent}
+
+def universe(percents, monkeypatch, currency=None):
+    monkeypatch.setattr(movers, "registry", [])
+    u = MoversUniverse("test", [f"S{i}.NS" for i in range(len(percents))], currency)
+    u.update_many({f"S{i}.NS": quote(p) for i, p in enumerate(percents) if p is not None})
+    return u
+
+def symbols(rows):
+    return [row["symbol"] for row in rows]
+
+def test_top_gainers_and_losers_in_order(monkeypatch):
+    u = universe([1.5, -3.0, 4.0, -0.5, 2.0, -7.0, 0.0], monkeypatch)
+    assert symbols(u.top("gainers", 2)) == ["S2", "S4"]
+    assert symbols(u.top("losers", 2)) == ["S5", "S1"]
+
+def test_top_excludes_unquoted_and_flat_symbols(monkeypatch):
+    u = universe([None, 2.0, 0.0, None, -1.0], monkeypatch)
+    assert symbols(u.top("gainers")) == ["S1"]
+    assert symbols(u.top("losers")) == ["S4"]
+    assert u.quoted() == 3
+
+def test_top_with_fewer_candidates_than_count(monkeypatch):
+    u = universe([3.0, 1.0, 2.0], monkeypatch)
+    assert symbols(u.top("gainers", 10)) == ["S0", "S2", "S1"]
+    assert u.top("losers", 10) == []
+
+def test_top_with_non_positive_count(monkeypatch):
+    u = universe([3.0, -1.0], monkeypatch)
+    assert u.top("gainers", 0) == []
+    assert u.top("losers", -1) == []
+
+def test_rows_carry_names_and_currency(monkeypatch):
+    u = universe([5.0], monkeypatch, currency="INR")
+    u.update_names({"S0.NS": "Sample Ltd"})
+    assert u.top("gainers") == [{
+        "symbol": "S0", "name": "Sample Ltd", "price": 105.0, "change": 5.0, "percent_change": 5.0, "currency": "INR",
+    }]
+
+def test_observe_feeds_registered_universes(monkeypatch):
+    u = universe([None, None], monkeypatch)
+    movers.observe({"S1.NS": quote(2.5), "OTHER": quote(9.0)})
+    assert symbols(u.top("gainers")) == ["S1"]
+    assert u.updates == 1
+
+def test_duplicate_symbols_are_merged(monkeypatch):
+    monkeypatch.setattr(movers, "registry", [])
+    assert len(MoversUniverse("test", ["A", "B", "A"])) == 2
+
+def test_load_symbols_skips_blanks_and_comments(tmp_path):
+    path = tmp_path / "universe.txt"
+    path.write_text("# header\nAAPL\n\nMSFT  # software\n")
+    assert movers.load_symbols(str(path)) == ["AAPL", "MSFT"]
@@ -0,0 +1,86 @@
+import asyncio
+import time
+import pytest
+from api.services import stock_service, upstream
+
+@pytest.fixture
+def guards(monkeypatch):
+    monkeypatch.setattr(upstream, "registry", [])
+    monkeypatch.setattr(stock_service, "QUOTE_HEDGE_DEFAULT_DELAY", 0.05)
+    monkeypatch.setattr(stock_service, "quote_strategy_stats", {"races": 0, "hedges": 0, "wins": {}})
+    return upstream.Upstream("a", rate=100, burst=100), upstream.Upstream("b", rate=100, burst=100)
+
+def strategy(name, guard, delay, result, log):
+    """A strategy that answers result (or raises it) after delay, through guard."""
+    async def run():
+        log.append(("start", name))
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            log.append(("cancelled", name))
+            raise
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return (name, guard, lambda: guard.call(run, operation="quote"))
+
+def race(strategies):
+    async def main():
+        started = time.perf_counter()
+        try:
+            return await stock_service._race_strategies("TEST", strategies), time.perf_counter() - started
+        finally:
+            await asyncio.sleep(0) # let cancelled losers unwind
+    return asyncio.run(main())
+
+def test_fast_first_strategy_wins_without_a_hedge(guards):
+    log = []
+    quote, _ = race([strategy("a", guards[0], 0.01, {"price": 1}, log), strategy("b", guards[1], 0.01, {"price": 2}, log)])
+    assert quote == {"price": 1}
+    assert log == [("start", "a")]
+    assert stock_service.quote_strategy_stats["hedges"] == 0
+
+def test_slow_strategy_is_hedged_after_its_delay(guards):
+    log = []
+    quote, elapsed = race([strategy("a", guards[0], 1.0, {"price": 1}, log), strategy("b", guards[1], 0.01, {"price": 2}, log)])
+    assert quote == {"price": 2}
+    assert elapsed < 0.5
+    assert log == [("start", "a"), ("start", "b"), ("cancelled", "a")]
+    assert stock_service.quote_strategy_stats["hedges"] == 1
+    assert stock_service.quote_strategy_stats["wins"] == {"b": 1}
+
+def test_first_answer_wins_when_both_are_running(guards):
+    log = []
+    quote, _ = race([strategy("a", guards[0], 0.1, {"price": 1}, log), strategy("b", guards[1], 0.3, {"price": 2}, log)])
+    assert quote == {"price": 1}
+    assert log == [("start", "a"), ("start", "b"), ("cancelled", "b")]
+
+def test_failed_strategy_falls_through_at_once(guards, monkeypatch):
+    monkeypatch.setattr(stock_service, "QUOTE_HEDGE_DEFAULT_DELAY", 1.0)
+    log = []
+    quote, elapsed = race([strategy("a", guards[0], 0, ConnectionError("down"), log), strategy("b", guards[1], 0.01, {"price": 2}, log)])
+    assert quote == {"price": 2}
+    assert elapsed < 0.5
+    assert stock_service.quote_strategy_stats["hedges"] == 0
+
+def test_empty_answer_falls_through(guards):
+    log = []
+    quote, _ = race([strategy("a", guards[0], 0, None, log), strategy("b", guards[1], 0, {"price": 2}, log)])
+    assert quote == {"price": 2}
+
+def test_last_error_is_raised_when_every_strategy_fails(guards):
+    log = []
+    with pytest.raises(TimeoutError):
+        race([strategy("a", guards[0], 0, ConnectionError("down"), log), strategy("b", guards[1], 0, TimeoutError("slow"), log)])
+
+def test_cancelled_loser_records_how_long_it_ran(guards):
+    for _ in range(upstream.MIN_LATENCY_SAMPLES):
+        race([strategy("a", guards[0], 1.0, {"price": 1}, []), strategy("b", guards[1], 0.1, {"price": 2}, [])])
+    a = guards[0]
+    assert a.cancelled == upstream.MIN_LATENCY_SAMPLES
+    assert a.successes == 0
+    # Each loser ran until b answered, about 0.15s in
+    assert a.latency_percentile(50, operation="quote") >= 0.15
+    assert stock_service._hedge_delay(a) >= 0.15
+    assert a.breaker.state == "closed" and not a.breaker.probing
@@ -0,0 +1,77 @@
+import asyncio
+import pytest
+from api.services import batch_quotes, snapshot_service, stock_service
+
+def bulk_quote(price, previous_close=100.0):
+    change = price - previous_close
+    return {
+        "price": price, "previous_close": previous_close, "change": change,
+        "percent_change": change / previous_close * 100, "volume": 1000,
+        "open": previous_close, "day_high": price + 1, "day_low": previous_close - 1,
+    }
+
+@pytest.fixture
+def upstreams(monkeypatch):
+    """Fake bulk engine and per-symbol chain; records what each was asked for."""
+    calls = {"batch": [], "single": []}
+    bulk = {"AAPL": bulk_quote(110), "RELIANCE.NS": bulk_quote(95)}
+    metadata = {"AAPL": {"name": "Apple Inc.", "currency": "USD", "exchange": "NMS", "market_cap": 3e12, "pe_ratio": 30.5, "eps": 6.1}}
+
+    async def get_quotes(symbols):
+        calls["batch"].append(list(symbols))
+        return {symbol: bulk[symbol] for symbol in symbols if symbol in bulk}
+
+    async def get_metadata(symbols):
+        return {symbol: metadata[symbol] for symbol in symbols if symbol in metadata}
+
+    async def get_quote(symbol):
+        calls["single"].append(symbol)
+        if symbol == "MSFT":
+            return {"symbol": "MSFT", "price": 400.0}
+        raise ValueError(f"No data for {symbol}")
+
+    monkeypatch.setattr(batch_quotes, "get_quotes", get_quotes)
+    monkeypatch.setattr(batch_quotes, "get_metadata", get_metadata)
+    monkeypatch.setattr(stock_service, "get_quote", get_quote)
+    monkeypatch.setattr(stock_service, "quote_cache", stock_service.AsyncCache(name="test_quotes", shared=False))
+    monkeypatch.setattr(snapshot_service, "is_market_open", lambda region, now=None: region == "global")
+    return calls
+
+def test_batch_priced_quotes(upstreams):
+    results = asyncio.run(stock_service.get_quotes(["AAPL", "RELIANCE"]))
+    assert upstreams["batch"] == [["AAPL", "RELIANCE.NS"]]
+    assert upstreams["single"] == []
+
+    apple = results["AAPL"]["data"]
+    assert results["AAPL"]["status"] == "ok"
+    assert (apple["name"], apple["price"], apple["change"]) == ("Apple Inc.", 110, 10)
+    assert (apple["market_cap"], apple["pe_ratio"], apple["eps"]) == (3e12, 30.5, 6.1)
+    assert apple["market_state"] == "REGULAR"
+
+    reliance = results["RELIANCE"]["data"]
+    assert reliance["symbol"] == "RELIANCE"
+    assert (reliance["currency"], reliance["exchange"], reliance["market_cap"]) == ("INR", "NSE", 0)
+    assert reliance["market_state"] == "CLOSED"
+
+def test_leftovers_use_the_per_symbol_chain_and_errors_are_per_symbol(upstreams):
+    results = asyncio.run(stock_service.get_quotes(["AAPL", "MSFT", "NOPE"]))
+    assert list(results) == ["AAPL", "MSFT", "NOPE"]
+    assert upstreams["single"] == ["MSFT", "NOPE"]
+    assert results["MSFT"] == {"status": "ok", "data": {"symbol": "MSFT", "price": 400.0}}
+    assert results["NOPE"] == {"status": "error", "error": "No quote data for NOPE"}
+
+def test_batch_priced_quotes_are_cached(upstreams):
+    async def main():
+        await stock_service.get_quotes(["AAPL", "RELIANCE"])
+        return await stock_service.get_quotes(["RELIANCE", "AAPL"])
+
+    second = asyncio.run(main())
+    assert upstreams["batch"] == [["AAPL", "RELIANCE.NS"]]
+    assert list(second) == ["RELIANCE", "AAPL"]
+    assert second["AAPL"]["data"]["price"] == 110
+
+def test_symbol_list_is_validated():
+    with pytest.raises(ValueError):
+        asyncio.run(stock_service.get_quotes([" ", ""]))
+    with pytest.raises(ValueError):
+        asyncio.run(stock_service.get_quotes([f"S{i}" for i in range(stock_service.MAX_BATCH_SYMBOLS + 1)]))
@@ -0,0 +1,77 @@
+import asyncio
+import pytest
+from api.services.singleflight import SingleFlight
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight("test")
+    runs = 0
+
+    async def fetch():
+        nonlocal runs
+        runs += 1
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def main():
+        return await asyncio.gather(*(flight.do("key", fetch) for _ in range(10)))
+
+    assert asyncio.run(main()) == ["value"] * 10
+    assert runs == 1
+    assert flight.stats() == {"name": "test", "calls": 10, "executions": 1, "coalesced": 9, "inflight": 0}
+
+def test_different_keys_run_separately():
+    flight = SingleFlight("test")
+
+    async def main():
+        return await asyncio.gather(flight.do("a", lambda: asyncio.sleep(0, "a")), flight.do("b", lambda: asyncio.sleep(0, "b")))
+
+    assert asyncio.run(main()) == ["a", "b"]
+    assert flight.executions == 2
+
+def test_key_runs_again_once_finished():
+    flight = SingleFlight("test")
+
+    async def main():
+        await flight.do("key", lambda: asyncio.sleep(0, 1))
+        return await flight.do("key", lambda: asyncio.sleep(0, 2))
+
+    assert asyncio.run(main()) == 2
+    assert flight.executions == 2
+
+def test_errors_reach_every_waiter():
+    flight = SingleFlight("test")
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+
+    async def main():
+        return await asyncio.gather(*(flight.do("key", fail) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert flight.executions == 1
+    assert flight.inflight == {}
+
+def test_cancelled_caller_does_not_cancel_the_fetch():
+    flight = SingleFlight("test")
+
+    async def main():
+        done = asyncio.Event()
+
+        async def fetch():
+            await asyncio.sleep(0.02)
+            done.set()
+            return "value"
+
+        first = asyncio.ensure_future(flight.do("key", fetch))
+        second = asyncio.ensure_future(flight.do("key", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert await second == "value"
+        assert done.is_set()
+
+    asyncio.run(main())
+    assert flight.executions == 1
@@ -0,0 +1,93 @@
+import asyncio
+from datetime import datetime
+from types import MappingProxyType
+from zoneinfo import ZoneInfo
+import pytest
+from api.services import batch_quotes, market_service, snapshot_service
+
+NEW_YORK = ZoneInfo("America/New_York")
+KOLKATA = ZoneInfo("Asia/Kolkata")
+
+def at(tz, *args):
+    return datetime(*args, tzinfo=tz)
+
+def test_market_hours():
+    # 2024-01-08 is a Monday, 2024-01-06 a Saturday
+    assert snapshot_service.is_market_open("global", at(NEW_YORK, 2024, 1, 8, 9, 30))
+    assert not snapshot_service.is_market_open("global", at(NEW_YORK, 2024, 1, 8, 16, 0))
+    assert not snapshot_service.is_market_open("global", at(NEW_YORK, 2024, 1, 6, 12, 0))
+    assert snapshot_service.is_market_open("indian", at(KOLKATA, 2024, 1, 8, 9, 15))
+    # 10:00 in New York is 20:30 in Kolkata
+    assert not snapshot_service.is_market_open("indian", at(NEW_YORK, 2024, 1, 8, 10, 0))
+    assert snapshot_service.refresh_interval("global", at(NEW_YORK, 2024, 1, 8, 10, 0)) == snapshot_service.INTERVAL_OPEN
+    assert snapshot_service.refresh_interval("indian", at(NEW_YORK, 2024, 1, 8, 10, 0)) == snapshot_service.INTERVAL_CLOSED
+
+@pytest.fixture
+def state(monkeypatch):
+    """Fresh scheduler state and fake upstreams; quotes["value"] is what the next pass sees."""
+    monkeypatch.setattr(snapshot_service, "_views", MappingProxyType({}))
+    monkeypatch.setattr(snapshot_service, "_generated_at", MappingProxyType({}))
+    monkeypatch.setattr(snapshot_service, "_last_attempt", {})
+    monkeypatch.setattr(market_service, "market_cache", market_service.AsyncCache(name="test_snapshot", shared=False))
+    monkeypatch.setattr(market_service, "dashboard_symbols", lambda region: [f"{region}-1", f"{region}-2"])
+    upstream = {"quotes": {}}
+
+    async def get_quotes(symbols):
+        if isinstance(upstream["quotes"], Exception):
+            raise upstream["quotes"]
+        return {symbol: upstream["quotes"][symbol] for symbol in symbols if symbol in upstream["quotes"]}
+
+    async def get_names(symbols):
+        return {symbol: symbol for symbol in symbols}
+
+    async def build_views(region, quotes, names):
+        return {f"{region}_overview": [quote for symbol, quote in quotes.items() if symbol.startswith(region)]}
+
+    monkeypatch.setattr(batch_quotes, "get_quotes", get_quotes)
+    monkeypatch.setattr(batch_quotes, "get_names", get_names)
+    monkeypatch.setattr(market_service, "build_views", build_views)
+    return upstream
+
+def test_due_regions_follow_market_hours(state):
+    open_ny = at(NEW_YORK, 2024, 1, 8, 10, 0).timestamp() # Indian market closed
+    assert snapshot_service.due_regions(open_ny) == ["global", "indian"]
+
+    snapshot_service._last_attempt.update({"global": open_ny, "indian": open_ny})
+    snapshot_service._generated_at = MappingProxyType({"global": open_ny, "indian": open_ny})
+    assert snapshot_service.due_regions(open_ny + snapshot_service.INTERVAL_OPEN - 1) == []
+    assert snapshot_service.due_regions(open_ny + snapshot_service.INTERVAL_OPEN) == ["global"]
+    assert snapshot_service.due_regions(open_ny + snapshot_service.INTERVAL_CLOSED) == ["global", "indian"]
+
+def test_failed_pass_is_retried_sooner(state):
+    closed_ny = at(NEW_YORK, 2024, 1, 6, 12, 0).timestamp()
+    snapshot_service._last_attempt.update({"global": closed_ny, "indian": closed_ny})
+    snapshot_service._generated_at = MappingProxyType({"global": closed_ny - 1000, "indian": closed_ny})
+    assert snapshot_service.due_regions(closed_ny + snapshot_service.RETRY_INTERVAL) == ["global"]
+
+def test_refresh_publishes_views(state):
+    state["quotes"] = {"global-1": 1, "indian-2": 2}
+    asyncio.run(snapshot_service.refresh(["global", "indian"]))
+    assert snapshot_service.get("global_overview") == [1]
+    assert snapshot_service.get("indian_overview") == [2]
+    assert asyncio.run(market_service.market_cache.get("global_overview")) == [1]
+
+def test_failed_refresh_keeps_previous_snapshot(state):
+    state["quotes"] = {"global-1": 1}
+    asyncio.run(snapshot_service.refresh(["global"]))
+
+    # Nothing priced
+    state["quotes"] = {}
+    asyncio.run(snapshot_service.refresh(["global"]))
+    assert snapshot_service.get("global_overview") == [1]
+
+    # Upstream error
+    state["quotes"] = ConnectionError("down")
+    with pytest.raises(ConnectionError):
+        asyncio.run(snapshot_service.refresh(["global"]))
+    assert snapshot_service.get("global_overview") == [1]
+
+def test_old_snapshot_is_not_served(state, monkeypatch):
+    state["quotes"] = {"global-1": 1}
+    asyncio.run(snapshot_service.refresh(["global"]))
+    monkeypatch.setattr(snapshot_service, "MAX_AGE", 0)
+    assert snapshot_service.get("global_overview") is None
@@ -0,0 +1,18 @@
+import os
+import subprocess
+import sys
+from api.services import startup
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ["pandas", "yfinance", "nselib", "bs4", "scipy"]
+
+def test_app_import_leaves_heavy_modules_to_first_use():
+    code = f"import sys, api.main; print([m for m in {HEAVY!r} if m in sys.modules])"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    assert out.strip() == "[]"
+
+def test_lazy_module_imports_on_first_attribute():
+    module = startup.LazyModule("json")
+    assert "not loaded" in repr(module)
+    assert module.dumps([1]) == "[1]"
+    assert "loaded" in repr(module) and "not loaded" not in repr(module)
@@ -0,0 +1,135 @@
+import asyncio
+import pytest
+from api.services import stock_service, stream_service
+from api.services.stream_service import QuoteHub
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Fake refresh_quote answering from quotes[symbol], a list consumed one poll at a time."""
+    monkeypatch.setattr(stream_service, "CLOSED_INTERVAL", 0.01)
+    monkeypatch.setattr(stream_service, "ERROR_INTERVAL", 0.01)
+    state = {"quotes": {}, "polls": []}
+
+    async def refresh_quote(symbol, max_age):
+        state["polls"].append(symbol)
+        pending = state["quotes"][symbol]
+        quote = pending.pop(0) if len(pending) > 1 else pending[0]
+        if isinstance(quote, Exception):
+            raise quote
+        return dict(quote)
+
+    monkeypatch.setattr(stock_service, "refresh_quote", refresh_quote)
+    return state
+
+def drain(queue):
+    messages = []
+    while not queue.empty():
+        messages.append(queue.get_nowait())
+    return messages
+
+def test_one_poller_fans_out_to_every_subscriber(upstream):
+    upstream["quotes"]["AAPL"] = [{"price": 1.0}]
+
+    async def main():
+        hub = QuoteHub()
+        a, b = hub.new_queue(), hub.new_queue()
+        hub.subscribe(a, ["AAPL"])
+        hub.subscribe(b, ["AAPL"])
+        assert len(hub.pollers) == 1
+        first = await asyncio.wait_for(a.get(), 1)
+        second = await asyncio.wait_for(b.get(), 1)
+        hub.unsubscribe(a)
+        hub.unsubscribe(b)
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert first == second == {"type": "snapshot", "symbol": "AAPL", "data": {"price": 1.0}}
+    assert upstream["polls"][0] == "AAPL"
+
+def test_only_changes_are_sent(upstream):
+    upstream["quotes"]["AAPL"] = [{"price": 1.0, "volume": 10}, {"price": 1.0, "volume": 10}, {"price": 1.5, "volume": 10}]
+
+    async def main():
+        hub = QuoteHub()
+        queue = hub.new_queue()
+        hub.subscribe(queue, ["AAPL"])
+        while len(upstream["polls"]) < 5:
+            await asyncio.sleep(0.01)
+        hub.unsubscribe(queue)
+        return drain(queue)
+
+    assert asyncio.run(main()) == [
+        {"type": "snapshot", "symbol": "AAPL", "data": {"price": 1.0, "volume": 10}},
+        {"type": "update", "symbol": "AAPL", "data": {"price": 1.5}},
+    ]
+
+def test_poller_stops_with_the_last_subscriber(upstream):
+    upstream["quotes"]["AAPL"] = [{"price": 1.0}]
+
+    async def main():
+        hub = QuoteHub()
+        a, b = hub.new_queue(), hub.new_queue()
+        hub.subscribe(a, ["AAPL"])
+        hub.subscribe(b, ["AAPL"])
+        poller = hub.pollers["AAPL"]
+        await asyncio.sleep(0.03)
+        hub.unsubscribe(a, ["AAPL"])
+        await asyncio.sleep(0)
+        assert not poller.done()
+        hub.unsubscribe(b, ["AAPL"])
+        await asyncio.sleep(0)
+        polls = len(upstream["polls"])
+        await asyncio.sleep(0.05)
+        assert len(upstream["polls"]) == polls
+        return hub, poller
+
+    hub, poller = asyncio.run(main())
+    assert poller.cancelled()
+    assert hub.pollers == {} and hub.subscribers == {} and hub.last == {}
+
+def test_late_joiner_gets_the_current_snapshot(upstream):
+    upstream["quotes"]["AAPL"] = [{"price": 1.0}]
+
+    async def main():
+        hub = QuoteHub()
+        first = hub.new_queue()
+        hub.subscribe(first, ["AAPL"])
+        await asyncio.wait_for(first.get(), 1)
+        late = hub.new_queue()
+        hub.subscribe(late, ["AAPL"])
+        message = late.get_nowait()
+        hub.unsubscribe(first)
+        hub.unsubscribe(late)
+        return message
+
+    assert asyncio.run(main()) == {"type": "snapshot", "symbol": "AAPL", "data": {"price": 1.0}}
+
+def test_errors_are_published(upstream):
+    upstream["quotes"]["NOPE"] = [ValueError("No data for NOPE")]
+
+    async def main():
+        hub = QuoteHub()
+        queue = hub.new_queue()
+        hub.subscribe(queue, ["NOPE"])
+        message = await asyncio.wait_for(queue.get(), 1)
+        hub.unsubscribe(queue)
+        return message
+
+    assert asyncio.run(main()) == {"type": "error", "symbol": "NOPE", "error": "No data for NOPE"}
+
+def test_slow_consumer_loses_its_oldest_update(monkeypatch):
+    monkeypatch.setattr(stream_service, "QUEUE_SIZE", 2)
+    hub = QuoteHub()
+
+    async def main():
+        queue = hub.new_queue()
+        for i in range(3):
+            hub._put(queue, i)
+        return drain(queue)
+
+    assert asyncio.run(main()) == [1, 2]
+
+def test_diff_quote():
+    assert stream_service.diff_quote(None, {"price": 1}) == {"price": 1}
+    assert stream_service.diff_quote({"price": 1, "volume": 5}, {"price": 2, "volume": 5}) == {"price": 2}
+    assert stream_service.diff_quote({"price": 1}, {"price": 1}) == {}
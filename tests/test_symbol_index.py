@@ -0,0 +1,94 @@
+import asyncio
+from api.services.symbol_index import SymbolIndex, read_listing
+
+ENTRIES = [
+    {"symbol": "RELIANCE.NS", "name": "Reliance Industries Limited", "exchange": "NSI"},
+    {"symbol": "RELINFRA.NS", "name": "Reliance Infrastructure Limited", "exchange": "NSI"},
+    {"symbol": "TCS.NS", "name": "Tata Consultancy Services Limited", "exchange": "NSI"},
+    {"symbol": "TATAMOTORS.NS", "name": "Tata Motors Limited", "exchange": "NSI"},
+    {"symbol": "AAPL", "name": "Apple Inc.", "exchange": "NMS"},
+    {"symbol": "A", "name": "Agilent Technologies, Inc.", "exchange": "NYQ"},
+]
+
+def symbols(results):
+    return [result["symbol"] for result in results]
+
+def test_exact_ticker_ranks_first():
+    index = SymbolIndex(ENTRIES)
+    assert symbols(index.search("tcs")) == ["TCS.NS"]
+
+def test_ticker_prefix_ranks_before_name_match():
+    index = SymbolIndex(ENTRIES)
+    # TATAMOTORS starts with TATA; TCS only matches on its name
+    assert symbols(index.search("tata")) == ["TATAMOTORS.NS", "TCS.NS"]
+
+def test_every_query_word_must_match():
+    index = SymbolIndex(ENTRIES)
+    assert symbols(index.search("reliance infra")) == ["RELINFRA.NS"]
+    assert symbols(index.search("tata motors")) == ["TATAMOTORS.NS"]
+
+def test_single_letters_only_match_tickers():
+    index = SymbolIndex(ENTRIES)
+    # "Agilent", "Apple" start with A but only the tickers A and AAPL match
+    assert symbols(index.search("a")) == ["A", "AAPL"]
+
+def test_limit_and_empty_query():
+    index = SymbolIndex(ENTRIES)
+    assert len(index.search("limited", limit=2)) == 2
+    assert index.search("  ") == []
+
+def test_typos_fall_back_to_trigrams():
+    index = SymbolIndex(ENTRIES)
+    assert symbols(index.search("relaince"))[:2] == ["RELIANCE.NS", "RELINFRA.NS"]
+    assert index.search("zzzzzz") == []
+
+def test_add_indexes_only_new_symbols():
+    index = SymbolIndex(ENTRIES)
+    index.add([{"symbol": "INFY.NS", "name": "Infosys Limited"}, {"symbol": "TCS.NS", "name": "Duplicate"}])
+    assert len(index) == len(ENTRIES) + 1
+    assert symbols(index.search("infosys")) == ["INFY.NS"]
+    assert index.search("tcs")[0]["name"] == "Tata Consultancy Services Limited"
+
+def test_results_are_copies():
+    index = SymbolIndex(ENTRIES)
+    index.search("aapl")[0]["name"] = "changed"
+    assert index.search("aapl")[0]["name"] == "Apple Inc."
+
+def test_read_nse_equity_list(tmp_path):
+    path = tmp_path / "EQUITY_L.csv"
+    path.write_text("SYMBOL,NAME OF COMPANY, SERIES\nINFY,Infosys Limited,EQ\n")
+    assert read_listing(str(path)) == [{"symbol": "INFY.NS", "name": "Infosys Limited", "type": "EQUITY", "exchange": "NSI"}]
+
+def test_read_nasdaq_directory(tmp_path):
+    path = tmp_path / "otherlisted.txt"
+    path.write_text(
+        "ACT Symbol|Security Name|Exchange|CQS Symbol|ETF|Round Lot Size|Test Issue|NASDAQ Symbol\n"
+        "BRK.B|Berkshire Hathaway Inc. - Class B|N|BRK.B|N|100|N|BRK=B\n"
+        "SPY|SPDR S&P 500 ETF Trust|P|SPY|Y|100|N|SPY\n"
+        "ZTEST|Test Issue|N|ZTEST|N|100|Y|ZTEST\n"
+        "File Creation Time: 0102202418:00|||||||\n"
+    )
+    assert read_listing(str(path)) == [
+        {"symbol": "BRK-B", "name": "Berkshire Hathaway Inc.", "type": "EQUITY", "exchange": "NYQ"},
+        {"symbol": "SPY", "name": "SPDR S&P 500 ETF Trust", "type": "ETF", "exchange": "PCX"},
+    ]
+
+def test_search_asks_yahoo_only_on_a_local_miss(monkeypatch):
+    from api.services import stock_service, symbol_index
+    asked = []
+
+    async def fake_yahoo(query):
+        asked.append(query)
+        return [{"symbol": "ZZZ", "name": "Remote Only", "type": "EQUITY", "exchange": "NMS"}]
+
+    monkeypatch.setattr(symbol_index, "_index", SymbolIndex(ENTRIES))
+    monkeypatch.setattr(stock_service, "_search_yahoo", fake_yahoo)
+    monkeypatch.setattr(stock_service, "search_cache", stock_service.AsyncCache(name="test_search", shared=False))
+
+    async def main():
+        return await stock_service.search_stocks("tata"), await stock_service.search_stocks("  Remote  Only ")
+
+    local, remote = asyncio.run(main())
+    assert symbols(local) == ["TATAMOTORS.NS", "TCS.NS"]
+    assert symbols(remote) == ["ZZZ"]
+    assert asked == ["remote only"]
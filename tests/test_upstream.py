@@ -0,0 +1,155 @@
+import asyncio
+import pytest
+from api.services import upstream
+from api.services.executors import ExecutorOverloaded
+from api.services.upstream import CircuitBreaker, TokenBucket, UpstreamUnavailable
+
+@pytest.fixture
+def guard(monkeypatch):
+    monkeypatch.setattr(upstream, "registry", [])
+    return upstream.Upstream("test", rate=100, burst=100, failure_threshold=3, reset_timeout=30)
+
+def call(guard, result, **kwargs):
+    async def fn():
+        if isinstance(result, BaseException):
+            raise result
+        return result
+    return asyncio.run(guard.call(fn, **kwargs))
+
+def fail(guard, error=None):
+    with pytest.raises(type(error or ConnectionError())):
+        call(guard, error or ConnectionError("down"))
+
+def cool_down(breaker):
+    breaker.opened_at -= breaker.reset_timeout
+
+def test_breaker_opens_after_the_threshold():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.opens == 1
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+def test_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    cool_down(breaker)
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow() and breaker.allow()
+
+def test_failed_probe_opens_the_circuit_again():
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=30)
+    for _ in range(5):
+        breaker.record_failure()
+    cool_down(breaker)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.opens == 2
+
+def test_released_probe_frees_the_slot():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    cool_down(breaker)
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+
+def test_token_bucket_refills_at_its_rate():
+    bucket = TokenBucket(rate=10, burst=2)
+    assert bucket.try_acquire() and bucket.try_acquire()
+    assert not bucket.try_acquire()
+    bucket.updated -= 0.1 # one token's worth
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+
+def test_empty_bucket_refuses_with_upstream_unavailable(guard):
+    guard.bucket = TokenBucket(rate=0.001, burst=1)
+    assert call(guard, 1) == 1
+    with pytest.raises(UpstreamUnavailable):
+        call(guard, 2)
+    assert guard.rate_limited == 1
+    assert guard.breaker.state == "closed"
+
+def test_open_circuit_refuses_with_upstream_unavailable(guard):
+    for _ in range(3):
+        fail(guard)
+    with pytest.raises(UpstreamUnavailable):
+        call(guard, 1)
+    assert (guard.failures, guard.short_circuited) == (3, 1)
+    assert not guard.available()
+    cool_down(guard.breaker)
+    assert guard.available()
+    assert call(guard, 1) == 1
+    assert guard.breaker.state == "closed"
+
+class HTTPError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.response = type("Response", (), {"status_code": status_code})()
+
+class YFTickerMissingError(Exception):
+    pass
+
+class DelistedError(YFTickerMissingError):
+    pass
+
+def test_is_upstream_failure():
+    assert upstream.is_upstream_failure(ConnectionError())
+    assert upstream.is_upstream_failure(asyncio.TimeoutError())
+    assert upstream.is_upstream_failure(HTTPError(503))
+    assert upstream.is_upstream_failure(HTTPError(429))
+    assert upstream.is_upstream_failure(HTTPError(408))
+    assert not upstream.is_upstream_failure(HTTPError(404))
+    assert not upstream.is_upstream_failure(HTTPError(400))
+    assert not upstream.is_upstream_failure(YFTickerMissingError())
+    assert not upstream.is_upstream_failure(DelistedError())
+
+def test_request_errors_leave_the_breaker_alone(guard):
+    for _ in range(5):
+        fail(guard, HTTPError(404))
+        fail(guard, YFTickerMissingError("NOPE"))
+    assert guard.breaker.state == "closed"
+    assert (guard.failures, guard.request_errors) == (0, 10)
+
+def test_request_error_releases_a_half_open_probe(guard):
+    for _ in range(3):
+        fail(guard)
+    cool_down(guard.breaker)
+    fail(guard, HTTPError(404))
+    assert guard.breaker.state == "half_open"
+    assert guard.available()
+
+def test_shed_and_cancelled_calls_are_not_failures(guard):
+    fail(guard, ExecutorOverloaded("full"))
+    with pytest.raises(asyncio.CancelledError):
+        call(guard, asyncio.CancelledError())
+    assert guard.failures == 0
+    assert guard.breaker.failures == 0
+
+def test_timeouts_count_as_failures(guard):
+    async def slow():
+        await asyncio.sleep(1)
+
+    for _ in range(3):
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(guard.call(slow, timeout=0.01))
+    assert guard.breaker.state == "open"